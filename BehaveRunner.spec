@@ -5,6 +5,33 @@ from PyInstaller.utils.hooks import copy_metadata, collect_data_files
 datas = [
     ('app.py', '.'), 
     ('execution_manager.py', '.'), 
+    ('sharding.py', '.'),
+    ('feature_scanner.py', '.'),
+    ('runner_paths.py', '.'),
+    ('log_store.py', '.'),
+    ('allure_store.py', '.'),
+    ('live_results.py', '.'),
+    ('log_events.py', '.'),
+    ('session_teardown.py', '.'),
+    ('gherkin_model.py', '.'),
+    ('feature_index.py', '.'),
+    ('step_registry.py', '.'),
+    ('rerun.py', '.'),
+    ('behave_runner.py', '.'),
+    ('runner_api.py', '.'),
+    ('startup_profile.py', '.'),
+    ('startup_budget.json', '.'),
+    ('dependency_check.py', '.'),
+    ('allure_reports.py', '.'),
+    ('run_results.py', '.'),
+    ('resource_sampler.py', '.'),
+    ('run_events.py', '.'),
+    ('runner_formatter.py', '.'),
+    ('stream_reader.py', '.'),
+    ('run_stream.py', '.'),
+    ('caps_matrix.py', '.'),
+    ('runner_agent.py', '.'),
+    ('remote_agents.py', '.'),
     ('requirements.txt', '.'), 
     ('packages.txt', '.'),
     ('pwa_injector.py', '.'),
@@ -32,7 +59,12 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=[
+        # Never used at runtime; dropping them shrinks the bundle and the archive scanned at startup
+        "matplotlib", "scipy", "IPython", "ipykernel", "jupyter_client", "notebook", "pytest",
+        "pandas.tests", "numpy.tests", "numpy.f2py", "tkinter.test", "lib2to3", "pydoc_data",
+        "sphinx", "docutils",
+    ],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from runner_paths import runner_home
+
+# Generations allowed at the same time (each one is a JVM)
+MAX_GENERATIONS = int(os.environ.get("BEHAVE_RUNNER_MAX_REPORT_JOBS", "1"))
+# Generated reports kept on disk, oldest removed first
+KEEP_REPORTS = int(os.environ.get("BEHAVE_RUNNER_KEEP_REPORTS", "10"))
+GENERATE_TIMEOUT = 15 * 60
+REPORT_HOST = os.environ.get("BEHAVE_RUNNER_REPORT_HOST", "127.0.0.1")
+REPORT_PORT = int(os.environ.get("BEHAVE_RUNNER_REPORT_PORT", "0"))
+# Files up to this size are hashed by content; larger attachments by name, size and mtime
+HASH_CONTENT_LIMIT = 1024 * 1024
+
+READY = "ready"
+GENERATING = "generating"
+FAILED = "failed"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ReportManager:
+    """
+    Turns allure-results folders into static reports with `allure generate`, one report per
+    distinct content of the folder, and serves them from a single built-in HTTP server.
+    Generations run on a small pool so at most MAX_GENERATIONS JVMs exist at once, and
+    requests for a report that is already being generated share the same job.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReportManager, cls).__new__(cls)
+            cls._instance.lock = threading.RLock()
+            cls._instance.pool = ThreadPoolExecutor(max_workers=MAX_GENERATIONS, thread_name_prefix="allure-generate")
+            cls._instance.jobs = {}
+            cls._instance.file_hashes = {}
+            cls._instance.server = None
+            cls._instance.reports_dir = runner_home("reports")
+        return cls._instance
+
+    # --- Content key ---
+    def _file_digest(self, path, st_):
+        key = (path, st_.st_mtime_ns, st_.st_size)
+        cached = self.file_hashes.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        if st_.st_size <= HASH_CONTENT_LIMIT:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        else:
+            digest = f"{st_.st_size}:{st_.st_mtime_ns}"
+        self.file_hashes[path] = (key, digest)
+        return digest
+
+    def results_digest(self, results_dir):
+        """Content hash of a results folder; unchanged files are not read again."""
+        h = hashlib.sha1()
+        with os.scandir(results_dir) as it:
+            entries = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+        for entry in entries:
+            h.update(entry.name.encode("utf-8"))
+            h.update(self._file_digest(entry.path, entry.stat()).encode("ascii"))
+        return h.hexdigest()[:20]
+
+    # --- Generation ---
+    def _report_dir(self, digest):
+        return os.path.join(self.reports_dir, digest)
+
+    def _generate(self, allure_cmd, results_dir, digest, label):
+        target = self._report_dir(digest)
+        tmp = target + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        started = time.time()
+        proc = subprocess.run([allure_cmd, "generate", results_dir, "-o", tmp, "--clean"],
+                              capture_output=True, text=True, timeout=GENERATE_TIMEOUT)
+        if proc.returncode != 0 or not os.path.isfile(os.path.join(tmp, "index.html")):
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise RuntimeError((proc.stderr or proc.stdout or f"allure exited with {proc.returncode}").strip()[-2000:])
+        with open(os.path.join(tmp, "runner.json"), 'w', encoding='utf-8') as f:
+            json.dump({"results_dir": results_dir, "label": label, "generated_at": time.time(),
+                       "seconds": round(time.time() - started, 1)}, f)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        self._prune()
+        return target
+
+    def request(self, allure_cmd, results_dir, label=None):
+        """
+        Returns (state, digest, detail) and starts a generation when the folder's current
+        content has no report yet. `detail` is the error message for FAILED.
+        """
+        digest = self.results_digest(results_dir)
+        with self.lock:
+            if os.path.isfile(os.path.join(self._report_dir(digest), "index.html")):
+                return READY, digest, None
+            job = self.jobs.get(digest)
+            if job is None:
+                job = self.pool.submit(self._generate, allure_cmd, os.path.abspath(results_dir), digest, label)
+                self.jobs[digest] = job
+        if not job.done():
+            return GENERATING, digest, None
+        with self.lock:
+            # Finished jobs are forgotten, so a failed generation is retried on the next request
+            self.jobs.pop(digest, None)
+        error = job.exception()
+        if error is not None:
+            return FAILED, digest, str(error)
+        return READY, digest, None
+
+    def status(self, digest):
+        """
+        (state, detail) of a report requested earlier, without blocking or starting a generation.
+        A report that is neither generated nor being generated counts as FAILED.
+        """
+        with self.lock:
+            if os.path.isfile(os.path.join(self._report_dir(digest), "index.html")):
+                return READY, None
+            job = self.jobs.get(digest)
+            if job is None:
+                return FAILED, "The report is not being generated"
+            if not job.done():
+                return GENERATING, None
+            self.jobs.pop(digest, None)
+        error = job.exception()
+        return (FAILED, str(error)) if error is not None else (READY, None)
+
+    def _prune(self):
+        reports = []
+        for name in os.listdir(self.reports_dir):
+            path = os.path.join(self.reports_dir, name)
+            if os.path.isdir(path) and not name.endswith(".tmp"):
+                reports.append((os.path.getmtime(path), path))
+        for _, path in sorted(reports, reverse=True)[KEEP_REPORTS:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def list_reports(self):
+        """Generated reports, newest first: [{ 'digest', 'label', 'results_dir', 'generated_at', 'seconds' }]"""
+        reports = []
+        for name in os.listdir(self.reports_dir):
+            meta_file = os.path.join(self.reports_dir, name, "runner.json")
+            if os.path.isfile(meta_file):
+                try:
+                    with open(meta_file, 'r', encoding='utf-8') as f:
+                        reports.append(dict(json.load(f), digest=name))
+                except Exception:
+                    continue
+        return sorted(reports, key=lambda r: r.get("generated_at", 0), reverse=True)
+
+    def archive(self, digest):
+        """Zips a generated report for download. Returns the zip path."""
+        base = os.path.join(runner_home("reports_zip"), digest)
+        if not os.path.isfile(base + ".zip"):
+            shutil.make_archive(base, "zip", self._report_dir(digest))
+        return base + ".zip"
+
+    # --- Serving ---
+    def url(self, digest):
+        """Starts the static server on first use and returns the report's address."""
+        with self.lock:
+            if self.server is None:
+                handler = lambda *args, **kwargs: _QuietHandler(*args, directory=self.reports_dir, **kwargs)
+                self.server = ThreadingHTTPServer((REPORT_HOST, REPORT_PORT), handler)
+                threading.Thread(target=self.server.serve_forever, daemon=True, name="allure-report-server").start()
+            host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{digest}/index.html"
@@ -0,0 +1,266 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from runner_paths import runner_home
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    file TEXT PRIMARY KEY,
+    uuid TEXT,
+    name TEXT,
+    full_name TEXT,
+    status TEXT,
+    start INTEGER,
+    stop INTEGER,
+    duration REAL,
+    history_id TEXT,
+    feature TEXT,
+    message TEXT,
+    labels TEXT
+);
+CREATE TABLE IF NOT EXISTS labels (
+    file TEXT,
+    name TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_status ON results(status);
+CREATE INDEX IF NOT EXISTS idx_results_feature ON results(feature);
+CREATE INDEX IF NOT EXISTS idx_results_history ON results(history_id);
+CREATE INDEX IF NOT EXISTS idx_results_start ON results(start);
+CREATE INDEX IF NOT EXISTS idx_results_duration ON results(duration);
+CREATE INDEX IF NOT EXISTS idx_labels_file ON labels(file);
+CREATE INDEX IF NOT EXISTS idx_labels_name_value ON labels(name, value);
+"""
+
+STATUSES = ("passed", "failed", "broken", "skipped")
+# Columns the results explorer can sort on
+SORT_COLUMNS = ("start", "duration", "name", "status", "feature")
+ROW_COLUMNS = ("file", "name", "full_name", "status", "start", "duration", "feature", "history_id", "message")
+
+
+class AllureStore:
+    """
+    SQLite index of one allure-results folder.
+    Every *-result.json is parsed once; later calls to `ingest` only pick up files that are
+    new or changed (by mtime and size) and drop files that were deleted.
+    """
+
+    def __init__(self, results_dir, db_path=None):
+        self.results_dir = os.path.abspath(results_dir)
+        if db_path is None:
+            key = hashlib.sha1(self.results_dir.encode("utf-8")).hexdigest()[:16]
+            db_path = os.path.join(runner_home("allure_index"), f"{key}.sqlite")
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection so the store can be used from any thread."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _read_result(self, name):
+        with open(os.path.join(self.results_dir, name), 'r', encoding='utf-8') as f:
+            d = json.load(f)
+        labels = [(l.get('name'), l.get('value')) for l in d.get('labels', []) if l.get('name')]
+        start, stop = d.get('start'), d.get('stop')
+        duration = (stop - start) / 1000.0 if start and stop else None
+        feature = next((v for n, v in labels if n == 'feature'), None)
+        message = (d.get('statusDetails') or {}).get('message')
+        row = (name, d.get('uuid'), d.get('name'), d.get('fullName'), d.get('status'), start, stop, duration,
+               d.get('historyId'), feature, message, json.dumps(labels))
+        return row, labels
+
+    def ingest(self):
+        """Indexes new or modified result files. Returns the number of files parsed."""
+        if not os.path.isdir(self.results_dir):
+            return 0
+        on_disk = {}
+        with os.scandir(self.results_dir) as it:
+            for entry in it:
+                if entry.name.endswith("-result.json") and entry.is_file():
+                    st_ = entry.stat()
+                    on_disk[entry.name] = (st_.st_mtime, st_.st_size)
+        with self.lock, self._connect() as conn:
+            known = {name: (mtime, size) for name, mtime, size in conn.execute("SELECT name, mtime, size FROM files")}
+            gone = [name for name in known if name not in on_disk]
+            fresh = [name for name, stamp in on_disk.items() if known.get(name) != stamp]
+            for name in gone + fresh:
+                conn.execute("DELETE FROM results WHERE file = ?", (name,))
+                conn.execute("DELETE FROM labels WHERE file = ?", (name,))
+                conn.execute("DELETE FROM files WHERE name = ?", (name,))
+            parsed = 0
+            for name in fresh:
+                try:
+                    row, labels = self._read_result(name)
+                except Exception:
+                    # Probably still being written; retry on the next ingest
+                    continue
+                conn.execute("INSERT INTO results VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", row)
+                conn.executemany("INSERT INTO labels VALUES (?,?,?)", [(name, n, v) for n, v in labels])
+                conn.execute("INSERT INTO files VALUES (?,?,?)", (name, *on_disk[name]))
+                parsed += 1
+        return parsed
+
+    def counts(self, since=None):
+        """
+        Returns a dict: { 'Total', 'Passed', 'Failed', 'Broken', 'Skipped' }
+        `since` (epoch ms) limits the counts to results that started after it.
+        """
+        query, args = "SELECT status, COUNT(*) FROM results", []
+        if since:
+            query += " WHERE start >= ?"; args.append(int(since))
+        with self._connect() as conn:
+            rows = dict(conn.execute(query + " GROUP BY status", args).fetchall())
+        stats = {"Total": sum(rows.values())}
+        for status in STATUSES:
+            stats[status.title()] = rows.get(status, 0)
+        return stats
+
+    def _where(self, status=None, feature=None, since=None, tag=None, min_duration=None, max_duration=None, search=None):
+        where, args = [], []
+        if isinstance(status, (list, tuple, set)):
+            where.append(f"status IN ({','.join('?' * len(status))})"); args.extend(status)
+        elif status:
+            where.append("status = ?"); args.append(status)
+        if since:
+            where.append("start >= ?"); args.append(int(since))
+        if feature:
+            where.append("feature = ?"); args.append(feature)
+        if tag:
+            where.append("file IN (SELECT file FROM labels WHERE name = 'tag' AND value = ?)"); args.append(tag)
+        if min_duration is not None:
+            where.append("duration >= ?"); args.append(float(min_duration))
+        if max_duration is not None:
+            where.append("duration <= ?"); args.append(float(max_duration))
+        if search:
+            where.append("(name LIKE ? OR full_name LIKE ? OR message LIKE ?)"); args.extend([f"%{search}%"] * 3)
+        return (" WHERE " + " AND ".join(where) if where else ""), args
+
+    def list_results(self, status=None, feature=None, limit=None, since=None):
+        """
+        Returns result rows as dicts, newest first.
+        `status` can be a single status or a list of them.
+        """
+        where, args = self._where(status, feature, since)
+        query = f"SELECT {', '.join(ROW_COLUMNS)} FROM results{where} ORDER BY start DESC"
+        if limit:
+            query += " LIMIT ?"; args.append(int(limit))
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(r) for r in conn.execute(query, args)]
+
+    def query_results(self, sort="start", descending=True, offset=0, limit=50, **filters):
+        """
+        One page of results for the explorer, filtered and sorted in SQLite.
+        `filters`: status, feature, since, tag, min_duration, max_duration, search.
+        Returns (rows, total matching).
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort on {sort!r}")
+        where, args = self._where(**filters)
+        order = f"{sort} {'DESC' if descending else 'ASC'}, file"
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            total = conn.execute(f"SELECT COUNT(*) FROM results{where}", args).fetchone()[0]
+            rows = [dict(r) for r in conn.execute(f"SELECT {', '.join(ROW_COLUMNS)} FROM results{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                                                  args + [int(limit), int(offset)])]
+        return rows, total
+
+    def facets(self):
+        """Returns a dict: { 'features': [...], 'tags': [...] } for the explorer's filters."""
+        with self._connect() as conn:
+            features = [r[0] for r in conn.execute("SELECT DISTINCT feature FROM results WHERE feature IS NOT NULL ORDER BY feature")]
+            tags = [r[0] for r in conn.execute("SELECT DISTINCT value FROM labels WHERE name = 'tag' ORDER BY value")]
+        return {"features": features, "tags": tags}
+
+    def _step(self, d):
+        start, stop = d.get('start'), d.get('stop')
+        details = d.get('statusDetails') or {}
+        return {"name": d.get('name'), "status": d.get('status'),
+                "duration": (stop - start) / 1000.0 if start and stop else None,
+                "message": details.get('message'), "trace": details.get('trace'),
+                "attachments": [self._attachment(a) for a in d.get('attachments', [])],
+                "parameters": d.get('parameters', []),
+                "steps": [self._step(s) for s in d.get('steps', [])]}
+
+    def _attachment(self, a):
+        return {"name": a.get('name'), "type": a.get('type'), "path": os.path.join(self.results_dir, a.get('source', ''))}
+
+    def result_detail(self, file):
+        """
+        Steps, status details and attachments of one result, read from its file on demand
+        (the index keeps only the summary columns). Returns None if the file is gone.
+        """
+        try:
+            with open(os.path.join(self.results_dir, os.path.basename(file)), 'r', encoding='utf-8') as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            return None
+        detail = self._step(d)
+        detail["description"] = d.get('description')
+        detail["labels"] = [(l.get('name'), l.get('value')) for l in d.get('labels', [])]
+        return detail
+
+    def latest_results(self, since=None):
+        """
+        The most recent result of every scenario (grouped by Allure's historyId), as dicts.
+        A result that ran outranks a newer skipped one, which only says another shard ran it.
+        `since` (epoch ms) only considers results that started after it.
+        """
+        inner, args = "SELECT *, ROW_NUMBER() OVER (PARTITION BY history_id ORDER BY status != 'skipped' DESC, start DESC) AS pick " \
+                      "FROM results WHERE history_id IS NOT NULL", []
+        if since:
+            inner += " AND start >= ?"; args.append(int(since))
+        query = f"SELECT {', '.join(ROW_COLUMNS)} FROM ({inner}) WHERE pick = 1 ORDER BY start"
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(r) for r in conn.execute(query, args)]
+
+    def feature_durations(self):
+        """Returns a dict: { 'feature name': total seconds }"""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT feature, SUM(duration) FROM results WHERE feature IS NOT NULL AND duration IS NOT NULL GROUP BY feature"))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(results_dir):
+    """One shared store per results folder for the whole process."""
+    key = os.path.abspath(results_dir)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = AllureStore(key)
+        return _stores[key]
+
+
+def drop_store(results_dir):
+    """Forgets the store of a deleted results folder and removes its index."""
+    key = os.path.abspath(results_dir)
+    with _stores_lock:
+        store = _stores.pop(key, None)
+    db_path = store.db_path if store else os.path.join(
+        runner_home("allure_index"), f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.sqlite")
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(db_path + suffix)
+        except OSError:
+            pass
@@ -1,16 +1,16 @@
+import startup_profile
+startup_profile.install()
 import streamlit as st
 import os
-import glob
-import subprocess
-import json
-import pandas as pd
-# tkinter imports moved to local scope for optimization
+# tkinter, pandas, importlib.metadata and the run, results and report modules (psutil, sqlite3) are
+# imported where they are used, to keep startup fast
 import shutil
-import re
-import sys
-import importlib.metadata
 import time
-from execution_manager import ExecutionManager
+from feature_scanner import FeatureScanCache
+from gherkin_model import OUTLINE, location, runnable_items
+from feature_index import TagExpressionError, parse_tag_expression, tags_to_expression, combine_expressions
+
+startup_profile.mark("app imports")
 
 # --- 1. App Configuration ---
 st.set_page_config(page_title="Behave Runner", layout="wide")
@@ -26,13 +26,18 @@ except ImportError:
 if "features_data" not in st.session_state: st.session_state.features_data = []
 if "caps_files" not in st.session_state: st.session_state.caps_files = []
 if "unique_tags" not in st.session_state: st.session_state.unique_tags = []
+if "scope_selection" not in st.session_state: st.session_state.scope_selection = set()
 if "scan_done" not in st.session_state: st.session_state.scan_done = False
 if "proj_path" not in st.session_state: st.session_state.proj_path = os.getcwd()
 
-# Get the Singleton Manager
-exec_manager = ExecutionManager()
+scan_cache = FeatureScanCache()
 
 # --- 2. Helper Functions ---
+def get_exec_manager():
+    """The singleton ExecutionManager, imported on first use."""
+    from execution_manager import ExecutionManager
+    return ExecutionManager()
+
 def get_allure_path():
     allure_path = shutil.which("allure")
     if allure_path: return allure_path
@@ -51,113 +56,13 @@ def select_folder():
         print(f"Tkinter error: {e}")
         return None
 
-def parse_feature_file(file_path):
-    feature_name = os.path.basename(file_path)
-    scenarios = []; tags = set()
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                s = line.strip()
-                if s.startswith("@"):
-                    for t in s.split(): 
-                        if t.startswith("@"): tags.add(t)
-                if s.startswith("Feature:"): feature_name = s.replace("Feature:", "").strip()
-                elif s.startswith("Scenario:") or s.startswith("Scenario Outline:"): scenarios.append(s.split(":", 1)[1].strip())
-    except: pass
-    return {"feature_name": feature_name, "scenarios": scenarios, "tags": sorted(list(tags)), "path": file_path, "filename": os.path.basename(file_path)}
-
-def scan_project(project_path):
-    if not os.path.isdir(project_path): return None, None, None
-    f_path = os.path.join(project_path, "features", "**", "*.feature")
-    files = glob.glob(f_path, recursive=True)
-    parsed = []; all_tags = set()
-    for f in files:
-        d = parse_feature_file(f); parsed.append(d); all_tags.update(d['tags'])
-    c_path = os.path.join(project_path, "**", "*caps*.json")
-    caps = [os.path.basename(c) for c in glob.glob(c_path, recursive=True)]
-    return parsed, caps, sorted(list(all_tags))
-
-def scan_steps(project_path):
-    """
-    Scans the 'steps' directory for Python files and extracts Gherkin step definitions.
-    Returns a dict: { 'filename': [list of step strings] }
-    """
-    steps_path = os.path.join(project_path, "features", "steps", "*.py")
-    files = glob.glob(steps_path)
-    if not files:
-         files = glob.glob(os.path.join(project_path, "steps", "*.py"))
-
-    steps_data = {}
-    step_pattern = re.compile(r"^\s*@(given|when|then|step)\s*\(\s*['\"](.*)['\"]\s*\)")
-
-    for f_path in files:
-        filename = os.path.basename(f_path)
-        found_steps = []
-        try:
-            with open(f_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    match = step_pattern.search(line)
-                    if match:
-                        keyword = match.group(1).title() 
-                        text = match.group(2)
-                        found_steps.append(f"**{keyword}** {text}")
-        except Exception as e:
-            print(f"Error parsing {f_path}: {e}")
-            
-        if found_steps:
-            steps_data[filename] = found_steps
-            
-    return steps_data
-
 def parse_allure_results(results_dir):
     if not os.path.exists(results_dir): return None
-    total=passed=failed=broken=skipped=0
-    for jf in glob.glob(os.path.join(results_dir, "*-result.json")):
-        try:
-            with open(jf,'r') as f:
-                d=json.load(f); s=d.get('status')
-                total+=1
-                if s=='passed': passed+=1
-                elif s=='failed': failed+=1
-                elif s=='broken': broken+=1
-                elif s=='skipped': skipped+=1
-        except: continue
-    return {"Total": total, "Passed": passed, "Failed": failed, "Broken": broken, "Skipped": skipped}
-
-def get_installed_version(pkg):
-    try: return importlib.metadata.version(pkg)
-    except: return None
-
-def install_package(pkg, output_container=None):
-    """
-    Installs a package and streams output to a Streamlit container if provided.
-    """
-    try:
-        process = subprocess.Popen(
-            [sys.executable, "-m", "pip", "install", pkg],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        full_output = ""
-        for line in process.stdout:
-            full_output += line
-            if output_container:
-                output_container.code(full_output, language="bash")
-        
-        process.wait()
-        
-        if process.returncode == 0:
-            return True, "Installed successfully"
-        else:
-            return False, f"Return Code {process.returncode}"
-            
-    except Exception as e:
-        return False, str(e)
-    
+    from allure_store import get_store
+    store = get_store(results_dir)
+    store.ingest()
+    return store.counts()
+
 # Required environment variables for this project
 REQUIRED_ENV_VARS = [
     "LAMBDA_USER_NAME",
@@ -194,10 +99,120 @@ def save_env_file(env_path, env_dict):
 
 
 # --- 3. Persistent Footer Logic ---
+# Feature rows rendered per page of the scope list
+SCOPE_PAGE_SIZE = 50
+# Output kept per browser session; the full history stays in the run's log file
+FOOTER_TAIL_CHARS = 200_000
+# Run queue priorities offered on the Execution page
+PRIORITIES = {"Low": -1, "Normal": 0, "High": 1}
+# Default seconds between terminal refreshes while a run is active
+FOOTER_REFRESH_SECONDS = float(os.environ.get("BEHAVE_RUNNER_REFRESH_SECONDS", "1"))
+
+def read_new_output(run):
+    """Pulls only the output appended since this session's last read and returns the visible tail."""
+    sub = st.session_state.get("log_sub")
+    if sub is None or sub.run is not run:
+        if sub is not None:
+            sub.close()
+        text, cursor = run.logs.tail(FOOTER_TAIL_CHARS)
+        st.session_state.log_sub = get_exec_manager().subscribe(run.run_id, cursor)
+        st.session_state.log_tail = text
+    else:
+        while True:
+            new = sub.next(0)["text"]
+            if not new:
+                break
+            st.session_state.log_tail = (st.session_state.log_tail + new)[-FOOTER_TAIL_CHARS:]
+    return st.session_state.log_tail
+
+def followed_run():
+    """The run shown in the footer: the one picked in the run queue, else the latest submitted."""
+    return get_exec_manager().get_run(st.session_state.get("follow_run"))
+
+def render_terminal():
+    """Terminal region of the footer. While a run is active only this fragment refreshes, not the whole app."""
+    from execution_manager import ACTIVE_STATES, QUEUED, RUNNING
+    run = followed_run()
+    if st.session_state.get("footer_live") and run.status not in ACTIVE_STATES:
+        # The run just finished: one full rerun refreshes the page controls and stops the polling
+        st.session_state.footer_live = False
+        st.rerun(scope="app")
+    state_icon = {QUEUED: "⏳ Queued", RUNNING: "🟢 Running..."}.get(run.status, f"🔴 Stopped ({run.status})")
+    watching = f" · 👁 {len(run.viewers)}" if len(run.viewers) > 1 else ""
+    with st.expander(f"📟 Terminal Output · {run.label} ({state_icon}){watching}", expanded=True):
+        now_running = run.progress.snapshot()['workers'] if run.progress else {}
+        if len(run.workers) > 1:
+            cols = st.columns(len(run.workers))
+            for col, w in zip(cols, run.worker_progress()):
+                ratio = min(w['done'] / w['expected'], 1.0) if w['expected'] else 0.0
+                col.progress(ratio, text=f"w{w['id']} · {w['status']} · {w['done']}/{w['expected']}")
+                current = now_running.get(str(w['id']), {})
+                if current.get('scenario'):
+                    col.caption(f"▶ {current['scenario']}" + (f" › {current['step']}" if current.get('step') else ""))
+        elif run.status == RUNNING:
+            current = now_running.get("1", {})
+            if current.get('scenario'):
+                st.caption(f"▶ {current['scenario']}" + (f" › {current['step']}" if current.get('step') else ""))
+        if run.live:
+            col_term, col_live = st.columns([3, 1])
+            with col_live:
+                render_live_results(run)
+                render_resources(run)
+        else:
+            col_term = st.container()
+        with col_term:
+            st.code(read_new_output(run), language="bash", height=300)
+        st.markdown("""
+            <script>
+                const codeBlocks = window.parent.document.querySelectorAll('.terminal-footer div[data-testid="stCodeBlock"] pre');
+                if (codeBlocks.length > 0) {
+                     const terminal = codeBlocks[codeBlocks.length - 1];
+                     terminal.scrollBottom = terminal.scrollHeight;
+                }
+            </script>
+            """, unsafe_allow_html=True)
+
+def render_live_results(run):
+    """Live pass/fail counters and the failures seen so far in the run."""
+    counts, failures = run.live.snapshot()
+    c1, c2 = st.columns(2)
+    c1.metric("✅ Passed", counts['Passed'])
+    c2.metric("❌ Failed", counts['Failed'])
+    c1.metric("💥 Broken", counts['Broken'])
+    c2.metric("⏭ Skipped", counts['Skipped'])
+    if run.progress:
+        slowest = run.progress.snapshot()['slowest_steps']
+        with st.popover("Slowest steps", use_container_width=True, disabled=not slowest):
+            for s in slowest:
+                st.markdown(f"**{s['max']:.2f}s** max · {s['avg']:.2f}s avg ×{s['count']} · {s['name']}")
+    with st.popover(f"Failures so far ({len(failures)})", use_container_width=True, disabled=not failures):
+        for r in failures:
+            st.markdown(f"**{r['status'].upper()}** · {r['feature'] or ''} · {r['name']}")
+            if r['message']:
+                st.caption(r['message'].strip().splitlines()[0][:300])
+
+def render_resources(run):
+    """CPU / memory timeline of the run's process trees, with threshold warnings."""
+    if not run.resources or not run.resources.enabled:
+        return
+    samples, warnings, peaks = run.resources.snapshot()
+    if not samples:
+        st.caption("📈 Sampling resources...")
+        return
+    last = samples[-1]
+    st.caption(f"📈 CPU {last['cpu_percent']:.0f}% · RSS {last['rss_mb']:.0f} MB · {last['processes']} procs · "
+               f"{last['threads']} threads · {last['fds']} fds")
+    st.line_chart({"CPU %": [x['cpu_percent'] for x in samples], "RSS MB": [x['rss_mb'] for x in samples]}, height=120)
+    for w in warnings[-3:]:
+        st.warning(f"{w['metric']} {w['value']:g} > {w['limit']:g} at {time.strftime('%H:%M:%S', time.localtime(w['t']))}")
+    with st.popover("Processes", use_container_width=True):
+        for name, g in last['top'].items():
+            st.markdown(f"**{name}** ×{g['count']} · {g['cpu_percent']:.0f}% · {g['rss_mb']:.0f} MB")
+        st.caption(f"Peak CPU {peaks['cpu_percent']:.0f}% · peak RSS {peaks['rss_mb']:.0f} MB · "
+                   f"sampling cost {last['overhead_ms']:.1f} ms every {run.resources.interval:g}s")
+
 def render_footer():
     """Renders the persistent terminal footer with auto-scroll and fixed height."""
-    new_logs = exec_manager.get_new_logs()
-    
     with st.container():
         st.markdown("""
             <style>
@@ -213,24 +228,80 @@ def render_footer():
             </style>
             """, unsafe_allow_html=True)
 
-        if exec_manager.full_logs:
-            state_icon = "🟢 Running..." if exec_manager.is_running else "🔴 Stopped"
+        run = followed_run()
+        if run:
+            from execution_manager import ACTIVE_STATES
+            # Poll only while the followed run is queued or running; the interval is set from the sidebar
+            live = run.status in ACTIVE_STATES
+            st.session_state.footer_live = live
+            interval = st.session_state.get("footer_interval", FOOTER_REFRESH_SECONDS) if live else None
             st.markdown('<div class="terminal-footer">', unsafe_allow_html=True)
-            with st.expander(f"📟 Terminal Output ({state_icon})", expanded=True):
-                st.code(exec_manager.full_logs, language="bash", height=300)
-                st.markdown("""
-                    <script>
-                        const codeBlocks = window.parent.document.querySelectorAll('.terminal-footer div[data-testid="stCodeBlock"] pre');
-                        if (codeBlocks.length > 0) {
-                             const terminal = codeBlocks[codeBlocks.length - 1];
-                             terminal.scrollBottom = terminal.scrollHeight;
-                        }
-                    </script>
-                    """, unsafe_allow_html=True)
-                if exec_manager.is_running:
-                    time.sleep(1); st.rerun()
+            st.fragment(render_terminal, run_every=interval)()
+            # Outside the refreshing fragment, and the log is only read when the button is clicked
+            st.download_button("💾 Download full log", data=run.logs.getvalue, on_click="ignore",
+                               file_name=os.path.basename(run.logs.path), mime="text/plain")
             st.markdown('</div>', unsafe_allow_html=True)
 
+def render_run_queue():
+    """Lists queued, running and finished runs with follow and cancel actions."""
+    from execution_manager import ACTIVE_STATES, QUEUED, RUNNING
+    exec_manager = get_exec_manager()
+    c_limit, c_info = st.columns([1, 3])
+    with c_limit:
+        limit = st.number_input("Max concurrent workers", min_value=1, max_value=64, value=exec_manager.max_concurrent, step=1,
+                                help="Worker processes allowed to run at once across all users of this runner.")
+        if limit != exec_manager.max_concurrent:
+            exec_manager.set_max_concurrent(limit)
+    runs = exec_manager.list_runs()
+    with c_info:
+        active = [r for r in runs if r.status in ACTIVE_STATES]
+        st.caption(f"{sum(r.status == RUNNING for r in active)} running · {sum(r.status == QUEUED for r in active)} queued · {len(runs)} total")
+        if exec_manager.stop_metrics:
+            m = exec_manager.stop_metrics[-1]
+            st.caption(f"Last stop ({m['run_id']}): local kill {m['kill_seconds']:.2f}s · remote teardown {m['teardown_seconds']:.2f}s · "
+                       f"{m['stopped']} session(s) stopped, {m['failed']} failed")
+    render_agents()
+    if not runs:
+        st.info("No runs yet.")
+        return
+    following = followed_run()
+    with st.container(height=260):
+        for r in runs:
+            c_name, c_status, c_follow, c_cancel = st.columns([4, 2, 1, 1], vertical_alignment="center")
+            marker = "👁 " if following and r.run_id == following.run_id else ""
+            c_name.markdown(f"{marker}**{r.label}**  \n`{r.run_id}` · priority {r.priority} · {r.slots} worker(s)")
+            c_status.write(r.status)
+            if c_follow.button("Follow", key=f"follow_{r.run_id}"):
+                st.session_state.follow_run = r.run_id; st.rerun()
+            if r.status in ACTIVE_STATES and c_cancel.button("Cancel", key=f"cancel_{r.run_id}"):
+                if exec_manager.cancel(r.run_id): st.toast(f"Cancelled {r.label}", icon="⏹️")
+                else: st.error("Cancel failed.")
+                time.sleep(1); st.rerun()
+
+def render_agents():
+    """Runner agents on other hosts that workers can be placed on, with a field to add one by URL."""
+    from remote_agents import AgentRegistry
+    registry = AgentRegistry()
+    agents = registry.list_agents()
+    alive = [a for a in agents if a['alive']]
+    with st.expander(f"🖧 Runner agents: {len(alive)} of {len(agents)} reachable · {sum(a['capacity'] for a in alive)} extra worker slots"):
+        for a in agents:
+            c_info, c_remove = st.columns([5, 1], vertical_alignment="center")
+            state = f"🟢 {a['busy']}/{a['capacity']} busy" if a['alive'] else f"🔴 {a.get('error') or 'not heard from'}"
+            c_info.markdown(f"**{a['name']}** · `{a['url']}` · {state}" + (f"  \n{a['project']}" if a.get('project') else ""))
+            if c_remove.button("Remove", key=f"agent_rm_{a['url']}"):
+                registry.remove(a['url']); st.rerun()
+        c_url, c_add = st.columns([5, 1], vertical_alignment="bottom")
+        url = c_url.text_input("Agent URL", placeholder="http://build-host-2:8771",
+                               help="Start one with: python runner_agent.py --project <checkout> --capacity N. "
+                                    "Agents started with --coordinator register themselves with the runner API. "
+                                    "Set BEHAVE_RUNNER_AGENT_TOKEN to the same value on both hosts.")
+        if c_add.button("Add") and url:
+            try:
+                registry.add(url); st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+
 def reset_execution_filters():
     """Callback to reset all filters in the Execution Run page."""
     # 1. Reset the search box
@@ -239,14 +310,98 @@ def reset_execution_filters():
     # 2. Reset the tag multiselect
     st.session_state.selected_tags = []
     
+    st.session_state.tag_expression = ""
+
     # 3. Uncheck all feature checkboxes
-    # We look for all keys starting with 'chk_' and set them to False
-    for key in st.session_state.keys():
-        if key.startswith("chk_"):
-            st.session_state[key] = False
+    # The selection is kept in scope_selection; the 'chk_' widgets are re-created from it
+    st.session_state.scope_selection = set()
+    for key in [k for k in st.session_state.keys() if k.startswith("chk_")]:
+        del st.session_state[key]
+
+def toggle_scope(path, key):
+    """Checkbox callback keeping scope_selection in step with a feature / scenario checkbox."""
+    if st.session_state[key]:
+        st.session_state.scope_selection.add(path)
+    else:
+        st.session_state.scope_selection.discard(path)
+
+def find_broken_targets(project_path, selected_paths, tag_filter, index):
+    """Returns [(file:line, scenario name)] of the selected scenarios that use an undefined step."""
+    features = st.session_state.features_data
+    if not features or (not selected_paths and not tag_filter):
+        return []
+    from step_registry import StepRegistry
+    broken = StepRegistry().report(project_path, features)['broken']
+    if not broken:
+        return []
+    picked = set(selected_paths)
+    targets = []
+    for feat in features:
+        lines = broken.get(feat['path'])
+        if not lines:
+            continue
+        rel = os.path.relpath(feat['path'], project_path)
+        for item in runnable_items(feat):
+            if item['line'] not in lines:
+                continue
+            loc = location(rel, item)
+            chosen = (rel in picked or loc in picked) if picked else True
+            if chosen and (not tag_filter or tag_filter.matches(item['tags'])):
+                targets.append((loc, item['name']))
+    return targets
+
+def last_failures(project_path):
+    """Failed / broken scenarios of the latest run of this project as file:line: (locations, unmatched, source)."""
+    from execution_manager import ACTIVE_STATES
+    from rerun import failed_locations
+    from run_results import latest_results_dir
+    since = None
+    for run in get_exec_manager().list_runs():
+        if run.cwd == project_path and run.status not in ACTIVE_STATES and run.started_at:
+            since = run.started_at * 1000
+            break
+    return failed_locations(project_path, st.session_state.features_data, latest_results_dir(project_path), since)
+
+def queue_shards(shards, caps, tags, project_path, priority, label, max_parallel=0):
+    """Submits one worker per shard (or a single plain run) and follows the new run. A list of caps files queues a matrix."""
+    if not shards or not any(s['paths'] for s in shards) and not tags:
+        st.warning("Nothing to run for this selection.")
+        return
+    from execution_manager import build_behave_command, behave_job
+    if isinstance(caps, list):
+        from caps_matrix import submit_matrix
+        matrix_id, run_ids = submit_matrix(project_path, shards, caps, tags, priority, label, max_parallel)
+        st.session_state.follow_run = next(iter(run_ids.values()))
+        st.session_state.results_matrix = matrix_id
+        st.toast(f"Queued a matrix of {len(run_ids)} caps runs!", icon="🚀"); st.rerun()
+    if len(shards) == 1:
+        shard = {"command": build_behave_command(caps, tags, shards[0]['paths']), "job": behave_job(caps, tags, shards[0]['paths'])}
+        run_id = get_exec_manager().submit([shard], project_path, os.environ.copy(), priority=priority, label=label)
+        st.session_state.follow_run = run_id
+        st.toast("Queued!", icon="🚀"); st.rerun()
+    shard_cmds = []
+    for i, shard in enumerate(shards, 1):
+        results_dir = os.path.join("allure-results", f"worker-{i}")
+        shard_cmds.append({"command": build_behave_command(caps, tags, shard['paths'], results_dir),
+                           "results_dir": results_dir, "expected": shard['expected'], "job": behave_job(caps, tags, shard['paths'])})
+    run_id = get_exec_manager().start_parallel_execution(shard_cmds, project_path, os.environ.copy(), priority=priority, label=label)
+    st.session_state.follow_run = run_id
+    st.toast(f"Queued {len(shard_cmds)} workers!", icon="🚀"); st.rerun()
+
+def apply_scan_results(project_path, features, caps, tags, revision):
+    """Points the session at the shared scan results instead of keeping a private copy."""
+    st.session_state.features_data = features
+    st.session_state.caps_files = caps
+    st.session_state.unique_tags = tags
+    st.session_state.scan_done = True
+    st.session_state.scan_rev = (project_path, revision)
 
 # --- 4. Page Definitions ---
 def page_execution_run():
+    from sharding import STRATEGIES, build_shards, shard_locations, load_feature_durations
+    from rerun import failed_first
+    from run_results import latest_results_dir
+    from caps_matrix import MATRIX_MAX_PARALLEL
     st.header("🚀 Execution Run")
     st.subheader("1. Project Location")
     col1, col2, col3, col4 = st.columns([1, 4, 1, 1])
@@ -256,30 +411,50 @@ def page_execution_run():
             if s: st.session_state.proj_path = s; st.rerun()
     with col2:
         project_path_input = st.text_input("Path", value=st.session_state.proj_path, label_visibility="collapsed")
+    # Pick up the shared scan cache (filled by any session or by the watcher) without rescanning
+    cache_rev = scan_cache.revision(project_path_input) if os.path.isdir(project_path_input) else None
+    if cache_rev and st.session_state.get("scan_rev") != (project_path_input, cache_rev):
+        d, c, t = scan_cache.get(project_path_input)
+        if d:
+            apply_scan_results(project_path_input, d, c, t, cache_rev)
     with col3:
         if st.button("Scan", icon="🔍"):
-            d, c, t = scan_project(project_path_input)
+            with st.spinner("Scanning..."):
+                d, c, t = scan_cache.scan(project_path_input)
             if d:
-                st.session_state.features_data = d
-                st.session_state.caps_files = c
-                st.session_state.unique_tags = t
-                st.session_state.scan_done = True
+                apply_scan_results(project_path_input, d, c, t, scan_cache.revision(project_path_input))
                 st.session_state.proj_path = project_path_input  # Persist manual entry
                 st.toast("Scan Complete", icon="✅")
-                with st.spinner("Scanning..."):
-                    time.sleep(1)
-                st.success("Scan Complete!")
                 st.rerun()
         with col4:
                 st.text(f"Features Found \n {len(st.session_state.features_data)}", text_alignment="center")
+    if os.path.isdir(project_path_input):
+        watching = st.toggle("👀 Watch for feature changes", value=scan_cache.is_watching(project_path_input),
+                             help="Keeps the shared scan cache current in the background for every user.")
+        if watching and not scan_cache.is_watching(project_path_input):
+            scan_cache.start_watching(project_path_input)
+        elif not watching and scan_cache.is_watching(project_path_input):
+            scan_cache.stop_watching(project_path_input)
 
     if st.session_state.scan_done:
         st.divider()
         st.subheader("2. Configuration")
         selected_caps = None
+        max_parallel = 0
         if st.session_state.caps_files:
             st.write("**Select Capabilities (Mandatory):**")
-            selected_caps = st.radio("Caps File", st.session_state.caps_files, horizontal=True)
+            matrix_mode = st.toggle("🧮 Matrix mode", key="matrix_mode",
+                                    help="Runs the same selection once per caps file, each with its own results folder.")
+            if matrix_mode:
+                c_caps, c_parallel = st.columns([3, 1])
+                with c_caps:
+                    selected_caps = st.multiselect("Caps Files", st.session_state.caps_files, key="matrix_caps")
+                with c_parallel:
+                    max_parallel = st.number_input("Caps runs at once", min_value=0, max_value=64, value=MATRIX_MAX_PARALLEL,
+                                                   step=1, help="How many caps files run at the same time, e.g. the parallel "
+                                                                "sessions of your grid plan. 0 = only the runner's worker limit.")
+            else:
+                selected_caps = st.radio("Caps File", st.session_state.caps_files, horizontal=True)
         else:
             st.error("No caps files found.")
 
@@ -289,12 +464,28 @@ def page_execution_run():
         with col_reset:
             st.button("🔄 Reset Scope", on_click=reset_execution_filters, use_container_width=True)
 
+        index = scan_cache.index(project_path_input)
+
         # 1. Tags Multiselect (with Key)
         selected_tags = st.multiselect(
             "Filter by Tags:", 
             options=st.session_state.unique_tags,
             key="selected_tags" # <--- Added key for reset
         )
+        tag_text = st.text_input("Tag expression", key="tag_expression",
+                                 placeholder="@smoke and not (@slow or @wip)",
+                                 help="Same syntax as behave --tags. Combined with the tags picked above using 'and'.")
+        tag_expression = combine_expressions(tags_to_expression(selected_tags), tag_text)
+        tag_filter = None
+        if tag_expression:
+            try:
+                tag_filter = parse_tag_expression(tag_expression)
+            except TagExpressionError as e:
+                st.error(f"Invalid tag expression: {e}")
+            else:
+                if index:
+                    n_scenarios, n_features = index.count(tag_filter)
+                    st.caption(f"`{tag_expression}` matches **{n_scenarios}** scenarios in **{n_features}** features")
         
         st.write("--- OR Select Features ---")
 
@@ -305,25 +496,22 @@ def page_execution_run():
             placeholder="Search by name, filename, or tag..."
         ).lower()
         
-        # Filter logic (same as before)
-        filtered_features = []
-        if search_query:
-            for feat in st.session_state.features_data:
-                in_name = search_query in feat['feature_name'].lower()
-                in_file = search_query in feat['filename'].lower()
-                in_tags = any(search_query in t.lower() for t in feat['tags'])
-                if in_name or in_file or in_tags:
-                    filtered_features.append(feat)
-        else:
-            filtered_features = st.session_state.features_data
+        # Filter logic: served from the index built at scan time
+        filtered_features = index.search(search_query) if index else st.session_state.features_data
 
         # 3. Feature Selection List
-        selected_feature_paths = []
+        # Only one page of rows is rendered, so the selection lives in session state rather than in the widgets
+        selection = st.session_state.scope_selection
+        pages = max(1, -(-len(filtered_features) // SCOPE_PAGE_SIZE))
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages}, {len(filtered_features)} features)", min_value=1, max_value=pages, value=1, step=1)
+        visible = filtered_features[(page - 1) * SCOPE_PAGE_SIZE:page * SCOPE_PAGE_SIZE]
         with st.container(height=400):
             if not filtered_features:
                 st.info("No features match your search.")
             
-            for feat in filtered_features:
+            for feat in visible:
                 # IMPORTANT: Use 'chk_' prefix as expected by the reset callback
                 chk_key = f"chk_{feat['filename']}"
                 path_rel = os.path.relpath(feat['path'], project_path_input)
@@ -331,49 +519,145 @@ def page_execution_run():
                 
                 col_chk, col_exp = st.columns([0.8, 0.2], gap=None, vertical_alignment='center')
                 with col_chk:
-                    # Checkbox now uses the persistent chk_key
-                    if st.checkbox(label, key=chk_key, help=path_rel): 
-                        selected_feature_paths.append(path_rel)
+                    whole_feature = st.checkbox(label, key=chk_key, help=path_rel, value=path_rel in selection,
+                                                on_change=toggle_scope, args=(path_rel, chk_key))
+                    if feat.get('error'):
+                        st.caption(f"⚠️ {feat['error']}")
                 with col_exp:
                     with st.popover("Scenarios"):
-                         if feat['scenarios']: 
-                            for s in feat['scenarios']: st.markdown(f"- {s}")
+                        # Individual scenarios / example rows run as file:line
+                        for item in feat.get('items', []):
+                            if item['kind'] == OUTLINE:
+                                st.markdown(f"**{item['name']}** (outline)")
+                                continue
+                            item_label = item['name']
+                            if item['examples']: item_label += f" · {item['examples']}"
+                            if item['rule']: item_label += f" · Rule: {item['rule']}"
+                            if item['tags']: item_label += "  `" + " ".join(item['tags']) + "`"
+                            loc = location(path_rel, item)
+                            item_key = f"chk_{loc}"
+                            st.checkbox(item_label, key=item_key, value=loc in selection, disabled=whole_feature,
+                                        on_change=toggle_scope, args=(loc, item_key))
                 st.divider()
 
+        # A whole feature wins over scenarios picked inside it
+        selected_feature_paths = [p for p in sorted(selection) if p.rsplit(":", 1)[0] not in selection or ":" not in p]
+        if selected_feature_paths:
+            st.caption(f"{len(selected_feature_paths)} features / scenarios selected")
+
         st.divider()
         st.subheader("4. Execution")
         
-        # --- Run / Stop Logic ---
-        if exec_manager.is_running:
-            if st.button("⏹️ Stop Execution", type="primary"):
-                if exec_manager.stop_execution():
-                    st.warning("Stopped by user.")
-                    time.sleep(1); st.rerun()
-                else: st.error("Stop failed.")
-        else:
-            if st.button("▶ Run Tests", type="primary"):
-                if not selected_caps: st.error("Select Caps file.")
-                elif not selected_feature_paths and not selected_tags: st.warning("Select features or tags.")
+        # --- Run Logic ---
+        c_workers, c_strategy, c_priority = st.columns(3)
+        with c_workers:
+            workers = st.number_input("Parallel Workers", min_value=1, max_value=32, value=1, step=1)
+        with c_strategy:
+            strategy = st.selectbox("Sharding Strategy", list(STRATEGIES), format_func=STRATEGIES.get, disabled=workers == 1)
+        with c_priority:
+            priority = st.select_slider("Priority", options=list(PRIORITIES), value="Normal")
+        run_label = st.text_input("Run label", placeholder="Optional name shown in the run queue")
+        failed_first_on = st.toggle("⏫ Failed first", help="Runs the scenarios that failed last time before everything else.")
+        # Catch scenarios with undefined steps before they take up grid time
+        broken_targets = find_broken_targets(project_path_input, selected_feature_paths, tag_filter, index)
+        if broken_targets:
+            with st.expander(f"⚠️ {len(broken_targets)} selected scenarios have undefined steps and will fail"):
+                for loc, name in broken_targets: st.markdown(f"- `{loc}` {name}")
+        col_run, col_rerun = st.columns(2)
+        with col_run:
+            run_clicked = st.button("▶ Run Tests", type="primary")
+        with col_rerun:
+            rerun_clicked = st.button("🔁 Rerun failures", help="Runs only the failed and broken scenarios of the last run, as file:line.")
+        tags_arg = tag_expression if tag_filter else None
+        if rerun_clicked:
+            failed, unmatched, source = last_failures(project_path_input)
+            if not selected_caps: st.error("Select Caps file.")
+            elif not failed: st.info("No failed or broken scenarios found in the last results.")
+            else:
+                if unmatched:
+                    st.warning(f"{len(unmatched)} failed results could not be mapped to a scenario (renamed or deleted?).")
+                st.toast(f"Rerunning {len(failed)} failed scenarios from {source}", icon="🔁")
+                queue_shards(shard_locations(failed, workers), selected_caps, None, project_path_input,
+                             PRIORITIES[priority], run_label or f"Rerun {len(failed)} failures", max_parallel)
+        if run_clicked:
+            if not selected_caps: st.error("Select Caps file.")
+            elif tag_expression and tag_filter is None: st.error("Fix the tag expression first.")
+            elif not selected_feature_paths and not tag_filter: st.warning("Select features or tags.")
+            else:
+                failed = last_failures(project_path_input)[0] if failed_first_on else []
+                # Narrowed to the scenarios the tag expression selects, so counts and scenario shards match what runs
+                pool = index.filter_features(tag_filter) if tag_filter and index else st.session_state.features_data
+                if workers > 1:
+                    # Shard the selected features, or every feature carrying one of the selected tags
+                    if any(":" in p for p in selected_feature_paths):
+                        # Individual scenarios were picked: deal the exact locations out as they are
+                        shards = shard_locations(failed_first(selected_feature_paths, failed), workers)
+                    else:
+                        if selected_feature_paths:
+                            candidates = [f for f in pool if os.path.relpath(f['path'], project_path_input) in selected_feature_paths]
+                        else:
+                            candidates = pool
+                        durations = load_feature_durations(latest_results_dir(project_path_input)) if strategy == "duration" else None
+                        shards = build_shards(candidates, workers, strategy, project_path_input, durations)
+                    for shard in shards:
+                        shard['paths'] = failed_first(shard['paths'], failed)
                 else:
-                    tags_arg = f"--tags={','.join(selected_tags)} " if selected_tags else ""
-                    features_arg = " ".join(f"\"{p}\"" for p in selected_feature_paths) if selected_feature_paths else ""
-                    cmd = f"\"{sys.executable}\" -m behave --no-logcapture -D property_file=configs/config.properties -D endpoint_file=endpoints.json -D caps_file={selected_caps} {tags_arg}--no-capture --no-capture-stderr --no-color -f allure_behave.formatter:AllureFormatter -o allure-results {features_arg}"
-                    if exec_manager.start_execution(cmd, project_path_input, os.environ.copy()):
-                        st.toast("Started!", icon="🚀"); st.rerun()
-                    else: st.warning("Busy.")
+                    paths = selected_feature_paths
+                    if failed and not paths:
+                        # behave keeps the order of explicit paths, so list the tagged features to reorder them
+                        paths = [os.path.relpath(f['path'], project_path_input) for f in pool]
+                    shards = [{"paths": failed_first(paths, failed), "expected": 0}]
+                queue_shards(shards, selected_caps, tags_arg, project_path_input, PRIORITIES[priority], run_label or None, max_parallel)
+
+        st.divider()
+        st.subheader("5. Run Queue")
+        render_run_queue()
 
 def page_steps_viewer():
     st.header("👣 Step Definitions Viewer")
     project_path = st.session_state.get("proj_path", os.getcwd())
-    steps_data = scan_steps(project_path)
-    if not steps_data:
+    from step_registry import StepRegistry
+    step_registry = StepRegistry()
+    definitions = step_registry.definitions(project_path)
+    if not definitions:
         st.warning("No step files found.")
         return
-    st.success(f"Found {len(steps_data)} Step Files.")
+    features, _, _ = scan_cache.get(project_path)
+    if features is None:
+        features, _, _ = scan_cache.scan(project_path)
+    report = step_registry.report(project_path, features or [])
+    files = {}
+    for d in definitions: files.setdefault(os.path.relpath(d.path, project_path), []).append(d)
+    st.success(f"Found {len(definitions)} step definitions in {len(files)} Step Files.")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Definitions", len(definitions))
+    m2.metric("Undefined steps", len(report['undefined']))
+    m3.metric("Ambiguous steps", len(report['ambiguous']))
+    m4.metric("Unused definitions", len(report['unused']))
+    for path, error in report['errors']:
+        st.error(f"`{os.path.relpath(path, project_path)}`: {error}")
     st.divider()
-    for filename, steps in steps_data.items():
-        with st.expander(f"📄 {filename} ({len(steps)} steps)"):
-            for step in steps: st.markdown(f"- {step}")
+
+    tab_defs, tab_undefined, tab_ambiguous, tab_unused = st.tabs(["Definitions", "Undefined", "Ambiguous", "Unused"])
+    with tab_defs:
+        for filename, defs in files.items():
+            with st.expander(f"📄 {filename} ({len(defs)} steps)"):
+                for d in defs:
+                    uses = report['usage'].get(id(d), 0)
+                    st.markdown(f"- **{d.step_type.title()}** `{d.pattern}` — `{d.function}` line {d.line} · {uses} uses")
+    with tab_undefined:
+        if not report['undefined']: st.success("Every step has a definition.")
+        for feat, (_type, keyword, text, line) in report['undefined']:
+            st.markdown(f"- `{os.path.relpath(feat['path'], project_path)}:{line}` **{keyword}** {text}")
+    with tab_ambiguous:
+        st.caption("Steps matched by more than one definition; behave uses the first one it loads.")
+        for feat, (_type, keyword, text, line), defs in report['ambiguous']:
+            st.markdown(f"- `{os.path.relpath(feat['path'], project_path)}:{line}` **{keyword}** {text} → "
+                        + ", ".join(f"`{d.location}`" for d in defs))
+    with tab_unused:
+        if not report['unused']: st.success("Every definition is used by at least one step.")
+        for d in report['unused']:
+            st.markdown(f"- `{d.location}` **{d.step_type.title()}** `{d.pattern}`")
 
 def page_requirements():
     st.header("📦 Requirements Verification")
@@ -493,42 +777,257 @@ def page_requirements():
     # --- 3. Python Dependencies ---
     st.subheader("3. Python Dependencies")
     if os.path.exists(req_file):
-        with open(req_file, 'r', encoding="utf-8") as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            pkg = re.split(r'[=<>!]', line)[0].strip()
-            ver = get_installed_version(pkg)
-            c1, c2, c3 = st.columns([3, 2, 2])
-            with c1:
-                st.code(line, language="text")
-            with c2:
-                st.write(f"Installed: {ver}" if ver else "Missing")
-            with c3:
-                if not ver:
-                    if st.button("Install", key=f"install_{pkg}"):
-                        with st.status(f"Installing {pkg}...", expanded=True) as status:
-                            log_box = st.empty()
-                            ok, msg = install_package(line, output_container=log_box)
-                            if ok:
-                                status.update(label=f"✅ {pkg} Installed!", state="complete", expanded=False)
-                                time.sleep(1)
-                                st.rerun()
-                            else:
-                                status.update(label=f"❌ Failed {pkg}", state="error", expanded=True)
-                                st.error(msg)
+        from dependency_check import check_requirements, install_requirements, default_wheelhouse, NEEDS_INSTALL, OK
+        rows = check_requirements(req_file)
+        to_install = [r['line'] for r in rows if r['state'] in NEEDS_INSTALL]
+        c_ok, c_missing = st.columns(2)
+        c_ok.metric("Satisfied", sum(1 for r in rows if r['state'] == OK))
+        c_missing.metric("Missing / wrong version", len(to_install))
+        st.dataframe([{"Requirement": r['line'], "Installed": r['installed'] or "—", "State": r['state'], "Detail": r['detail']}
+                      for r in rows], use_container_width=True, hide_index=True)
+        if to_install:
+            c_wheels, c_offline = st.columns([3, 1], vertical_alignment="bottom")
+            with c_wheels:
+                wheelhouse = st.text_input("Wheelhouse folder (optional)", value=default_wheelhouse(project_path),
+                                           help="Local folder of .whl files passed to pip as --find-links.")
+            with c_offline:
+                offline = st.checkbox("Offline", disabled=not wheelhouse, help="Install only from the wheelhouse (--no-index).")
+            if st.button(f"⬇️ Install all missing ({len(to_install)})", type="primary"):
+                with st.status(f"Installing {len(to_install)} packages...", expanded=True) as status:
+                    log_box = st.empty()
+                    output = []
+
+                    def show(line):
+                        output.append(line)
+                        log_box.code("".join(output[-40:]), language="bash")
+                    ok, msg = install_requirements(to_install, wheelhouse or None, offline, on_line=show)
+                    if ok:
+                        status.update(label=f"✅ {msg}", state="complete", expanded=False)
+                        time.sleep(1)
+                        st.rerun()
+                    else:
+                        status.update(label=f"❌ {msg}", state="error", expanded=True)
     else:
         st.warning("No requirements.txt found.")
 
 
 
+def report_zip(reports, digest):
+    """The report as zip bytes; the archive is only built when a download is clicked."""
+    with open(reports.archive(digest), 'rb') as f:
+        return f.read()
+
+def show_report(reports, digest, open_browser=False, key=None):
+    """Link to the built-in report server, or a zip download in Cloud mode where no local port is reachable."""
+    if os.getenv("STREAMLIT_SHARING_MODE"):
+        st.download_button("⬇️ Download Report", data=lambda: report_zip(reports, digest), on_click="ignore",
+                           file_name=f"allure-report-{digest}.zip", mime="application/zip", key=f"dl_report_{key}")
+        return
+    url = reports.url(digest)
+    if open_browser:
+        import webbrowser
+        webbrowser.open(url)
+    if key:
+        st.link_button("🌐 Open", url)
+    else:
+        st.link_button(f"🌐 {url}", url)
+
+
+STATUS_ICONS = {"passed": "✅", "failed": "❌", "broken": "💥", "skipped": "⏭️"}
+RESULTS_PAGE_SIZES = [25, 50, 100]
+ATTACHMENT_TEXT_LIMIT = 200 * 1024
+
+
+def reset_results_page():
+    st.session_state.results_page = 1
+
+
+def render_attachment(att):
+    if not os.path.isfile(att['path']):
+        st.caption(f"📎 {att['name']} (missing)")
+        return
+    kind = att.get('type') or ""
+    if kind.startswith("image/"):
+        st.image(att['path'], caption=att['name'])
+    elif kind.startswith("text/") or kind in ("application/json", "application/xml"):
+        with open(att['path'], 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read(ATTACHMENT_TEXT_LIMIT)
+        st.caption(f"📎 {att['name']}")
+        st.code(text, language="json" if kind == "application/json" else None)
+    else:
+        with open(att['path'], 'rb') as f:
+            st.download_button(f"📎 {att['name']}", f.read(), file_name=os.path.basename(att['path']), mime=kind or None,
+                               key=f"att_{att['path']}")
+
+
+def render_steps(steps, depth=0):
+    for step in steps:
+        duration = f" · {step['duration']:.2f}s" if step['duration'] is not None else ""
+        st.markdown(f"{'&nbsp;' * 4 * depth}{STATUS_ICONS.get(step['status'], '❔')} {step['name']}{duration}")
+        if step['message'] and step['status'] != "passed":
+            st.code(step['message'].strip(), language=None)
+        for att in step['attachments']:
+            render_attachment(att)
+        render_steps(step['steps'], depth + 1)
+
+
+def render_result_detail(store, file):
+    """Reads one result file when its row is opened."""
+    detail = store.result_detail(file)
+    if detail is None:
+        st.warning("Result file no longer exists.")
+        return
+    tags = [v for n, v in detail['labels'] if n == "tag"]
+    if tags:
+        st.caption(" ".join(f"@{t}" for t in tags))
+    if detail['parameters']:
+        st.caption(", ".join(f"{p.get('name')}={p.get('value')}" for p in detail['parameters']))
+    if detail['message']:
+        st.error(detail['message'].strip())
+    if detail['trace']:
+        st.code(detail['trace'], language=None)
+    render_steps(detail['steps'])
+    for att in detail['attachments']:
+        render_attachment(att)
+
+
+def results_explorer(store):
+    """One page of results at a time, filtered and sorted by the store; rows load their steps when expanded."""
+    facets = store.facets()
+    f1, f2, f3, f4 = st.columns([2, 2, 2, 2])
+    statuses = f1.multiselect("Status", list(STATUS_ICONS), key="res_status", on_change=reset_results_page)
+    feature = f2.selectbox("Feature", ["All"] + facets['features'], key="res_feature", on_change=reset_results_page)
+    tag = f3.selectbox("Tag", ["All"] + facets['tags'], key="res_tag", on_change=reset_results_page)
+    search = f4.text_input("Search", key="res_search", placeholder="name or error", on_change=reset_results_page)
+    d1, d2, d3, d4, d5 = st.columns([1, 1, 2, 1, 1])
+    min_duration = d1.number_input("Min duration (s)", min_value=0.0, value=0.0, step=1.0, key="res_min", on_change=reset_results_page)
+    max_duration = d2.number_input("Max duration (s)", min_value=0.0, value=0.0, step=1.0, key="res_max", on_change=reset_results_page,
+                                   help="0 = no limit")
+    from allure_store import SORT_COLUMNS
+    sort = d3.selectbox("Sort by", SORT_COLUMNS, key="res_sort")
+    descending = d4.toggle("Descending", value=True, key="res_desc")
+    page_size = d5.selectbox("Per page", RESULTS_PAGE_SIZES, key="res_page_size", on_change=reset_results_page)
+
+    filters = {"status": statuses or None, "feature": None if feature == "All" else feature,
+               "tag": None if tag == "All" else tag, "search": search.strip() or None,
+               "min_duration": min_duration or None, "max_duration": max_duration or None}
+    page = st.session_state.get("results_page", 1)
+    rows, total = store.query_results(sort, descending, (page - 1) * page_size, page_size, **filters)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        st.session_state.results_page = page = pages
+        rows, total = store.query_results(sort, descending, (page - 1) * page_size, page_size, **filters)
+
+    c_count, c_page = st.columns([4, 1])
+    c_count.caption(f"{total} results · page {page} of {pages}")
+    c_page.number_input("Page", min_value=1, max_value=pages, step=1, key="results_page", label_visibility="collapsed")
+    for r in rows:
+        duration = f"{r['duration']:.1f}s" if r['duration'] is not None else "-"
+        label = f"{STATUS_ICONS.get(r['status'], '❔')} {r['feature'] or ''}: {r['name']} · {duration}"
+        row = st.expander(label, key=f"res_row_{r['file']}", on_change="rerun")
+        if row.open:
+            with row:
+                render_result_detail(store, r['file'])
+
+
+def results_disk_usage(project_path):
+    """Disk used by each run's results folder, with a button to apply the retention policy now."""
+    from run_results import list_runs, total_disk_usage, apply_retention
+    runs = list_runs(project_path)
+    if not runs:
+        return
+    total = total_disk_usage(project_path)
+    with st.expander(f"💾 Disk usage: {len(runs)} runs, {total / 1048576:.1f} MB"):
+        st.dataframe([{"Run": r['run_id'], "Label": r.get('label'), "Status": r.get('status'), "Results": r.get('results'),
+                       "Size (MB)": round((r.get('bytes') or 0) / 1048576, 2),
+                       "Attachments (MB)": round((r.get('attachment_bytes') or 0) / 1048576, 2),
+                       "Deduped (MB)": round((r.get('deduped_bytes') or 0) / 1048576, 2),
+                       "Compacted": bool(r.get('compacted'))} for r in runs],
+                     use_container_width=True, hide_index=True)
+        st.caption("Limits: BEHAVE_RUNNER_KEEP_RUNS, BEHAVE_RUNNER_MAX_RUN_AGE_DAYS, BEHAVE_RUNNER_MAX_RESULTS_MB, BEHAVE_RUNNER_COMPACT_AFTER")
+        if st.button("🧹 Apply retention now"):
+            from execution_manager import ACTIVE_STATES
+            active = [r.results_dir for r in get_exec_manager().list_runs(states=ACTIVE_STATES)]
+            actions = apply_retention(project_path, active=active)
+            for a in actions:
+                st.toast(f"{a['run_id']} {a['action']} ({a['reason']}, {a['bytes'] / 1048576:.1f} MB)", icon="🧹")
+            if not actions:
+                st.toast("Nothing to clean up", icon="🧹")
+            st.rerun()
+
+
+def render_matrix(project_path):
+    """Scenario x capability grid of a matrix run; refreshes itself while any of its caps runs is active."""
+    from caps_matrix import list_matrices
+    from execution_manager import ACTIVE_STATES
+    matrices = list_matrices(project_path)
+    if not matrices:
+        return
+    ids = [m['matrix'] for m in matrices]
+    if st.session_state.get("results_matrix") not in ids:
+        st.session_state.results_matrix = ids[0]
+    with st.expander(f"🧮 Capabilities matrix ({len(matrices)})", expanded=True):
+        labels = {m['matrix']: f"{m['label']} · {len(m['runs'])} caps · {time.strftime('%Y-%m-%d %H:%M', time.localtime(m['created_at']))}"
+                  for m in matrices}
+        picked = st.selectbox("Matrix", ids, key="results_matrix", format_func=labels.get)
+        matrix = next(m for m in matrices if m['matrix'] == picked)
+        live = any(r['status'] in ACTIVE_STATES for r in matrix['runs'])
+        st.fragment(render_matrix_table, run_every=FOOTER_REFRESH_SECONDS * 2 if live else None)(project_path, picked)
+
+def render_matrix_table(project_path, matrix_id):
+    from caps_matrix import list_matrices, matrix_table, differing_rows
+    matrix = next((m for m in list_matrices(project_path) if m['matrix'] == matrix_id), None)
+    if matrix is None:
+        return
+    columns, rows, totals = matrix_table(matrix)
+    cols = st.columns(len(columns))
+    for col, name in zip(cols, columns):
+        t = totals[name]
+        col.markdown(f"**{name}** · {t['run_status']}")
+        col.caption(" · ".join(f"{STATUS_ICONS.get(k, '❔')} {v}" for k, v in t.items() if k != "run_status") or "no results yet")
+    only_diff = st.toggle("Only scenarios that differ between capabilities", key="matrix_only_diff")
+    shown = differing_rows(rows) if only_diff else rows
+    if not shown:
+        st.info("Every capability agrees." if only_diff and rows else "No results yet.")
+        return
+    st.dataframe([dict({"Feature": r['feature'], "Scenario": r['scenario']},
+                       **{c: f"{STATUS_ICONS.get(v, '❔')} {v}" if v else "·" for c, v in r['cells'].items()}) for r in shown],
+                 use_container_width=True, hide_index=True)
+
+def render_report_request(reports):
+    """Progress of the report asked for with Open Report. While it generates only this fragment refreshes."""
+    from allure_reports import READY as REPORT_READY, GENERATING as REPORT_GENERATING
+    request = st.session_state.report_request
+    state, detail = reports.status(request['digest'])
+    if state == REPORT_GENERATING:
+        st.info("⏳ Generating Allure Report...")
+        return
+    if request['polling']:
+        # Done: one full rerun shows the result and stops the polling
+        request['polling'] = False
+        st.rerun(scope="app")
+    if state == REPORT_READY:
+        show_report(reports, request['digest'], open_browser=not request['opened'])
+        request['opened'] = True
+    else:
+        st.error(f"Report generation failed: {detail}")
+
 def page_allure_results():
+    from run_results import latest_results_dir, results_dirs
+    from allure_reports import ReportManager, GENERATING as REPORT_GENERATING
+    from allure_store import get_store
     st.header("📊 Results")
     project_path = st.session_state.get("proj_path", os.getcwd())
-    allure_dir = os.path.join(project_path, "allure-results")
     allure_cmd = get_allure_path()
+    choices = results_dirs(project_path)
+    if choices:
+        labels = [label for label, _ in choices]
+        picked = st.selectbox("Run", labels, key="results_run", on_change=reset_results_page)
+        allure_dir = dict(choices)[picked]
+        results_disk_usage(project_path)
+        render_matrix(project_path)
+    else:
+        allure_dir = latest_results_dir(project_path)
     
     if os.path.exists(allure_dir):
         stats = parse_allure_results(allure_dir)
@@ -538,27 +1037,29 @@ def page_allure_results():
             m2.metric("Passed", stats['Passed'])
             m3.metric("Failed", stats['Failed'])
             m4.metric("Other", stats['Broken']+stats['Skipped'])
+            reports = ReportManager()
             if st.button("🌐 Open Report"):
-                if allure_cmd: 
-                    if os.getenv("STREAMLIT_SHARING_MODE"):
-                        st.warning("Allure Serve is not supported in Cloud mode. Please download the 'allure-results' folder and run 'allure serve' locally.")
-                    else:
-                        with st.spinner("Opening Allure Report..."):
-                            time.sleep(1)
-                        subprocess.Popen([allure_cmd, "serve", allure_dir], cwd=project_path, env=os.environ.copy())
-                        st.success("Allure Report Opened!")
-                        st.rerun()
+                if allure_cmd:
+                    _, digest, _ = reports.request(allure_cmd, allure_dir, label=os.path.basename(project_path))
+                    st.session_state.report_request = {"results_dir": allure_dir, "digest": digest, "opened": False}
                 else: st.error("Allure missing.")
-            results_list = []
-            for jf in glob.glob(os.path.join(allure_dir, "*-result.json")):
-                try:
-                    with open(jf,'r') as f:
-                        d=json.load(f)
-                        results_list.append({"Test": d.get("name"), "Status": d.get("status")})
-                except: pass
-            if results_list: st.dataframe(pd.DataFrame(results_list), use_container_width=True)
+            request = st.session_state.get("report_request")
+            if request and request['results_dir'] == allure_dir:
+                # Polled from a fragment instead of blocking the script until the JVM is done
+                request['polling'] = reports.status(request['digest'])[0] == REPORT_GENERATING
+                st.fragment(render_report_request, run_every=1.0 if request['polling'] else None)(reports)
+            previous = reports.list_reports()
+            if previous:
+                with st.expander(f"🗂️ Generated reports ({len(previous)})"):
+                    for r in previous:
+                        c_info, c_open = st.columns([4, 1])
+                        c_info.caption(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(r.get('generated_at', 0)))} · "
+                                       f"{r.get('label') or ''} · {r.get('seconds', 0)}s · {r['digest']}")
+                        with c_open:
+                            show_report(reports, r['digest'], key=r['digest'])
+            results_explorer(get_store(allure_dir))
         else: st.warning("No results.")
-    else: st.error("No allure-results folder.")
+    else: st.error("No results yet.")
 
 # --- 5. Navigation & Footer ---
 pg = st.navigation({
@@ -575,5 +1076,7 @@ st.sidebar.markdown("---")
 st.sidebar.caption("Developed by **Gaurav Wardhekar**")
 st.sidebar.markdown("---")
 st.sidebar.caption("Developed for **🚀YAN IT Solutions**")
+st.sidebar.number_input("Terminal refresh (s)", min_value=0.5, max_value=30.0, value=FOOTER_REFRESH_SECONDS, step=0.5, key="footer_interval")
 pg.run()
 render_footer()
+startup_profile.report_once("first render")
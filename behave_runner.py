@@ -0,0 +1,338 @@
+"""
+Headless entry point: the runner's scan, selection, execution and results logic without Streamlit.
+
+    python -m behave_runner scan    <project> [--json]
+    python -m behave_runner run     <project> [paths ...] --caps my_caps.json [--tags EXPR] [--workers N]
+    python -m behave_runner run     <project> [paths ...] --caps chrome_caps.json --caps ios_caps.json [--max-parallel N]
+    python -m behave_runner results <project> [--status failed] [--limit 20] [--json]
+    python -m behave_runner serve   [--host 127.0.0.1] [--port 8765]
+    python -m behave_runner agent   --project <checkout> [--capacity N] [--coordinator http://host:8765]
+
+Every command imports only the modules it needs; add --timing to see the cold-start cost.
+"""
+import time
+_STARTED = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+
+# Modules the UI pulls in; a headless command should never load them
+HEAVY_MODULES = ("streamlit", "pandas", "numpy", "pyarrow", "altair")
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _print_json(data):
+    print(json.dumps(data, indent=2, default=str))
+
+
+def scan(project_path):
+    """Returns (features, caps, tags) from the shared scan cache, rescanning changed files."""
+    from feature_scanner import FeatureScanCache
+    features, caps, tags = FeatureScanCache().scan(project_path)
+    if features is None:
+        raise SystemExit(f"Not a directory: {project_path}")
+    return features, caps, tags
+
+
+def check_caps(project_path, caps):
+    """Raises ValueError unless every caps file (one name or a list) is one the project scan found."""
+    _, known, _ = scan(project_path)
+    for name in [caps] if isinstance(caps, str) else caps:
+        if name not in known:
+            raise ValueError(f"Unknown caps file {name!r}; the project has: {', '.join(known) or 'none'}")
+
+
+def plan_shards(project_path, tags=None, paths=None, workers=1, strategy="file", failed_first_on=False, rerun_failed=False):
+    """
+    Turns a selection into the paths each worker runs, the same way the Execution page does.
+    Returns (shards, tags): shards are dicts { 'paths', 'expected' } (one entry = a plain run; empty =
+    nothing to rerun), tags the filter the workers still apply (None when rerunning failures).
+    """
+    from sharding import build_shards, shard_locations, load_feature_durations
+    from run_results import latest_results_dir
+    features, _, _ = scan(project_path)
+    paths = list(paths or [])
+    tag_filter = None
+    if tags:
+        from feature_index import FeatureIndex, parse_tag_expression
+        tag_filter = parse_tag_expression(tags)
+    failed = []
+    if rerun_failed or failed_first_on:
+        from rerun import failed_locations
+        failed = failed_locations(project_path, features, latest_results_dir(project_path))[0]
+    if rerun_failed:
+        if not failed:
+            return [], None
+        paths, tags, tag_filter = failed, None, None
+
+    if int(workers) > 1:
+        if not paths or any(":" in p for p in paths):
+            if paths:
+                shards = shard_locations(paths, workers)
+            else:
+                pool = FeatureIndex(features).filter_features(tag_filter) if tag_filter else features
+                shards = build_shards(pool, workers, strategy, project_path,
+                                      load_feature_durations(latest_results_dir(project_path)) if strategy == "duration" else None)
+        else:
+            chosen = {os.path.normpath(p) for p in paths}
+            pool = [f for f in features if os.path.normpath(os.path.relpath(f['path'], project_path)) in chosen]
+            if tag_filter:
+                pool = FeatureIndex(pool).filter_features(tag_filter)
+            shards = build_shards(pool, workers, strategy, project_path,
+                                  load_feature_durations(latest_results_dir(project_path)) if strategy == "duration" else None)
+    else:
+        if failed and not paths:
+            pool = FeatureIndex(features).filter_features(tag_filter) if tag_filter else features
+            paths = [os.path.relpath(f['path'], project_path) for f in pool]
+        shards = [{"paths": paths, "expected": 0}]
+
+    if failed_first_on and failed:
+        from rerun import failed_first
+        for shard in shards:
+            shard['paths'] = failed_first(shard['paths'], failed)
+    return shards, tags
+
+
+def plan_run(project_path, caps, tags=None, paths=None, workers=1, strategy="file",
+             failed_first_on=False, rerun_failed=False, results_dir="allure-results"):
+    """
+    Turns a selection into worker shards for one caps file.
+    Returns a list of dicts: { 'command', 'results_dir', 'expected', 'job' } (one entry = a plain run).
+    """
+    from execution_manager import build_behave_command, behave_job
+    check_caps(project_path, caps)
+    shards, tags = plan_shards(project_path, tags, paths, workers, strategy, failed_first_on, rerun_failed)
+    if not shards:
+        return []
+    if len(shards) == 1:
+        return [{"command": build_behave_command(caps, tags, shards[0]['paths'], results_dir), "results_dir": None,
+                 "expected": shards[0]['expected'], "job": behave_job(caps, tags, shards[0]['paths'])}]
+    planned = []
+    for i, shard in enumerate(shards, 1):
+        worker_dir = os.path.join(results_dir, f"worker-{i}")
+        planned.append({"command": build_behave_command(caps, tags, shard['paths'], worker_dir),
+                        "results_dir": worker_dir, "expected": shard['expected'], "job": behave_job(caps, tags, shard['paths'])})
+    return planned
+
+
+def submit(project_path, shards, priority=0, label=None, results_dir="allure-results"):
+    """Queues planned shards on the ExecutionManager. Returns the run id."""
+    from execution_manager import ExecutionManager
+    manager = ExecutionManager()
+    if len(shards) == 1:
+        return manager.submit(shards, project_path, os.environ.copy(), results_dir=results_dir, priority=priority, label=label)
+    return manager.start_parallel_execution(shards, project_path, os.environ.copy(), results_dir=results_dir,
+                                            priority=priority, label=label)
+
+
+# --- Commands ---
+def cmd_scan(args):
+    features, caps, tags = scan(args.project)
+    if args.json:
+        _print_json({"features": [{"path": f['path'], "name": f['feature_name'], "tags": f['tags'],
+                                   "scenarios": len([i for i in f.get('items', []) if i['kind'] != "outline"]),
+                                   "error": f.get('error')} for f in features],
+                     "caps": caps, "tags": tags})
+        return 0
+    scenarios = sum(len([i for i in f.get('items', []) if i['kind'] != "outline"]) for f in features)
+    print(f"{len(features)} features, {scenarios} scenarios, {len(tags)} tags, {len(caps)} caps files")
+    for f in features:
+        if f.get('error'):
+            print(f"  ! {os.path.relpath(f['path'], args.project)}: {f['error']}")
+    return 0
+
+
+def cmd_run(args):
+    project = os.path.abspath(args.project)
+    if len(args.caps) > 1:
+        return run_matrix(args, project)
+    try:
+        shards = plan_run(project, args.caps[0], args.tags, args.paths, args.workers, args.strategy,
+                          args.failed_first, args.rerun_failed, args.results_dir)
+    except ValueError as e:
+        print(f"Invalid selection: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not shards:
+        print("Nothing to run.")
+        return 0
+    if args.dry_run:
+        from execution_manager import format_command
+        for s in shards: print(format_command(s['command']))
+        return 0
+    from execution_manager import ExecutionManager, ACTIVE_STATES, FINISHED
+    manager = ExecutionManager()
+    run_id = submit(project, shards, args.priority, args.label, args.results_dir)
+    run = manager.get_run(run_id)
+    print(f"Run {run_id} queued with {len(shards)} worker(s)", file=sys.stderr)
+    from run_stream import follow
+    try:
+        for text in follow(run):
+            sys.stdout.write(text); sys.stdout.flush()
+    except KeyboardInterrupt:
+        print("\nStopping run...", file=sys.stderr)
+        manager.cancel(run_id)
+        while run.status in ACTIVE_STATES:
+            time.sleep(0.2)
+    print(f"Run {run_id} {run.status}", file=sys.stderr)
+    return 0 if run.status == FINISHED else EXIT_FAILED
+
+
+def run_matrix(args, project):
+    """One run per caps file over the same selection; streams them interleaved, then prints the scenario x caps table."""
+    try:
+        check_caps(project, args.caps)
+        shards, tags = plan_shards(project, args.tags, args.paths, args.workers, args.strategy, args.failed_first, args.rerun_failed)
+    except ValueError as e:
+        print(f"Invalid selection: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not shards:
+        print("Nothing to run.")
+        return 0
+    from caps_matrix import caps_shards, caps_name, submit_matrix, list_matrices, matrix_table, MATRIX_MAX_PARALLEL
+    if args.dry_run:
+        from execution_manager import format_command
+        for caps in args.caps:
+            for s in caps_shards(shards, caps, tags, args.results_dir)[0]: print(format_command(s['command']))
+        return 0
+    import threading
+    from execution_manager import ExecutionManager, ACTIVE_STATES, FINISHED
+    from run_stream import follow
+    manager = ExecutionManager()
+    max_parallel = MATRIX_MAX_PARALLEL if args.max_parallel is None else args.max_parallel
+    matrix_id, run_ids = submit_matrix(project, shards, args.caps, tags, args.priority, args.label,
+                                       max_parallel, results_dir=args.results_dir)
+    runs = {caps: manager.get_run(run_id) for caps, run_id in run_ids.items()}
+    print(f"Matrix {matrix_id} queued: {len(runs)} caps files, at most {max_parallel or len(runs)} at once", file=sys.stderr)
+    out_lock = threading.Lock()
+
+    def stream(caps, run):
+        prefix = f"[{caps_name(caps)}] "
+        for text in follow(run):
+            with out_lock:
+                sys.stdout.write("".join(prefix + line + "\n" for line in text.splitlines())); sys.stdout.flush()
+
+    threads = [threading.Thread(target=stream, args=item, daemon=True) for item in runs.items()]
+    for t in threads: t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            for t in threads: t.join(0.2)
+    except KeyboardInterrupt:
+        print("\nStopping matrix...", file=sys.stderr)
+        for run_id in run_ids.values():
+            manager.cancel(run_id)
+        while any(r.status in ACTIVE_STATES for r in runs.values()):
+            time.sleep(0.2)
+    matrix = next(m for m in list_matrices(project) if m['matrix'] == matrix_id)
+    columns, rows, totals = matrix_table(matrix)
+    width = max([len("Scenario")] + [len(r['scenario']) for r in rows])
+    print("\n" + "Scenario".ljust(width) + "  " + "  ".join(columns))
+    for r in rows:
+        print(r['scenario'].ljust(width) + "  " + "  ".join((r['cells'][c] or "-").ljust(len(c)) for c in columns))
+    for caps, run in runs.items():
+        print(f"{caps_name(caps)}: run {run.run_id} {run.status}", file=sys.stderr)
+    return 0 if all(r.status == FINISHED for r in runs.values()) else EXIT_FAILED
+
+
+def cmd_results(args):
+    from allure_store import get_store
+    if args.results_dir:
+        results_dir = os.path.join(args.project, args.results_dir)
+    else:
+        from run_results import latest_results_dir
+        results_dir = latest_results_dir(args.project)
+    if not os.path.isdir(results_dir):
+        print(f"No results folder: {results_dir}", file=sys.stderr)
+        return EXIT_FAILED
+    store = get_store(results_dir)
+    store.ingest()
+    counts = store.counts()
+    rows = store.list_results(status=args.status, limit=args.limit)
+    if args.json:
+        _print_json({"counts": counts, "results": rows})
+    else:
+        print("  ".join(f"{k}: {v}" for k, v in counts.items()))
+        for r in rows:
+            print(f"{(r['status'] or '?'):<8} {r['duration'] or 0:8.1f}s  {r['feature'] or ''}: {r['name']}")
+    return 0 if not counts.get("Failed") and not counts.get("Broken") else EXIT_FAILED
+
+
+def cmd_serve(args):
+    from runner_api import serve
+    serve(args.host, args.port)
+    return 0
+
+
+def cmd_agent(args):
+    from runner_agent import main as agent_main
+    return agent_main(args.agent_args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="behave_runner", description="Headless Behave Runner")
+    parser.add_argument("--timing", action="store_true", default=bool(os.environ.get("BEHAVE_RUNNER_TIMING")),
+                        help="Report cold-start and command time on stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="Scan a project's features and caps files")
+    p.add_argument("project", nargs="?", default=os.getcwd())
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("run", help="Run a selection and stream its output")
+    p.add_argument("project")
+    p.add_argument("paths", nargs="*", help="Feature files or file:line locations (default: everything)")
+    p.add_argument("--caps", required=True, action="append",
+                   help="Caps file passed to behave as -D caps_file; repeat it to run a capabilities matrix")
+    p.add_argument("--max-parallel", type=int, default=None,
+                   help="Matrix only: caps runs allowed at once (default BEHAVE_RUNNER_MATRIX_PARALLEL, 0 = no limit)")
+    p.add_argument("--tags", help="behave tag expression, e.g. \"@smoke and not @wip\"")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--strategy", default="file", choices=["file", "scenario", "duration"])
+    p.add_argument("--priority", type=int, default=0)
+    p.add_argument("--label")
+    p.add_argument("--results-dir", default="allure-results",
+                   help="Results folder; each run gets its own sub-folder of allure-runs unless BEHAVE_RUNNER_PER_RUN_RESULTS=0")
+    p.add_argument("--failed-first", action="store_true", help="Run what failed last time first")
+    p.add_argument("--rerun-failed", action="store_true", help="Run only the failed and broken scenarios of the last results")
+    p.add_argument("--dry-run", action="store_true", help="Print the behave commands instead of running them")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("results", help="Summarise an allure-results folder")
+    p.add_argument("project", nargs="?", default=os.getcwd())
+    p.add_argument("--status", action="append", help="Only list results with this status (repeatable)")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--results-dir", help="Results folder (default: the latest run's)")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_results)
+
+    p = sub.add_parser("serve", help="Start the local HTTP API")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("agent", help="Run this host as a runner agent; takes runner_agent.py's options", add_help=False)
+    p.set_defaults(func=cmd_agent)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # Everything after "agent" belongs to runner_agent's own parser
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command != "agent":
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    args.agent_args = extra
+    ready = time.perf_counter()
+    code = args.func(args)
+    if args.timing:
+        heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+        print(f"[timing] startup {(ready - _STARTED) * 1000:.1f}ms, {args.command} {(time.perf_counter() - ready) * 1000:.1f}ms, "
+              f"{len(sys.modules)} modules loaded, heavy: {', '.join(heavy) or 'none'}", file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
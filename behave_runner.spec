@@ -25,6 +25,33 @@ datas += [
     ("app.py", "."),
     ("static", "static"),
     ("execution_manager.py", "."),
+    ("sharding.py", "."),
+    ("feature_scanner.py", "."),
+    ("runner_paths.py", "."),
+    ("log_store.py", "."),
+    ("allure_store.py", "."),
+    ("live_results.py", "."),
+    ("log_events.py", "."),
+    ("session_teardown.py", "."),
+    ("gherkin_model.py", "."),
+    ("feature_index.py", "."),
+    ("step_registry.py", "."),
+    ("rerun.py", "."),
+    ("behave_runner.py", "."),
+    ("runner_api.py", "."),
+    ("startup_profile.py", "."),
+    ("startup_budget.json", "."),
+    ("dependency_check.py", "."),
+    ("allure_reports.py", "."),
+    ("run_results.py", "."),
+    ("resource_sampler.py", "."),
+    ("run_events.py", "."),
+    ("runner_formatter.py", "."),
+    ("stream_reader.py", "."),
+    ("run_stream.py", "."),
+    ("caps_matrix.py", "."),
+    ("runner_agent.py", "."),
+    ("remote_agents.py", "."),
     ("pwa_injector.py", "."),
     # Include other helpers if needed
     ("verify_lt_regex.py", "."),
@@ -56,6 +83,32 @@ a = Analysis(
         
         # Project modules
         "execution_manager",
+        "sharding",
+        "feature_scanner",
+        "runner_paths",
+        "log_store",
+        "allure_store",
+        "live_results",
+        "log_events",
+        "session_teardown",
+        "gherkin_model",
+        "feature_index",
+        "step_registry",
+        "rerun",
+        "behave_runner",
+        "runner_api",
+        "startup_profile",
+        "dependency_check",
+        "allure_reports",
+        "run_results",
+        "resource_sampler",
+        "run_events",
+        "runner_formatter",
+        "stream_reader",
+        "run_stream",
+        "caps_matrix",
+        "runner_agent",
+        "remote_agents",
         "pwa_injector",
         
         # Missing Streamlit internals
@@ -70,7 +123,12 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=[
+        # Never used at runtime; dropping them shrinks the bundle and the archive scanned at startup
+        "matplotlib", "scipy", "IPython", "ipykernel", "jupyter_client", "notebook", "pytest",
+        "pandas.tests", "numpy.tests", "numpy.f2py", "tkinter.test", "lib2to3", "pydoc_data",
+        "sphinx", "docutils",
+    ],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def cold_start(args, repeat=5):
+    """Median wall time (ms) of a fresh interpreter running `args`."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+if __name__ == "__main__":
+    project = sys.argv[1] if len(sys.argv) > 1 else HERE
+    cases = [
+        ("python (empty)", ["-c", "pass"]),
+        ("behave_runner --help", ["-m", "behave_runner", "--help"]),
+        ("behave_runner scan", ["-m", "behave_runner", "scan", project]),
+        ("behave_runner results", ["-m", "behave_runner", "results", project]),
+        ("import streamlit+pandas (UI)", ["-c", "import streamlit, pandas"]),
+    ]
+    for name, args in cases:
+        print(f"{name:<30} {cold_start(args):8.0f}ms")
+    # One run with --timing to show what got imported
+    subprocess.run([sys.executable, "-m", "behave_runner", "--timing", "scan", project], cwd=HERE, stdout=subprocess.DEVNULL)
@@ -0,0 +1,67 @@
+import sys
+import time
+import random
+from feature_index import FeatureIndex, parse_tag_expression
+
+TAGS = ["@smoke", "@regression", "@slow", "@wip", "@android", "@ios", "@payments", "@login", "@search", "@profile"]
+WORDS = ["checkout", "login", "cart", "profile", "search", "payment", "refund", "wishlist", "settings", "onboarding"]
+
+
+def synthetic_features(count, scenarios_per_feature=10, seed=1):
+    rng = random.Random(seed)
+    features = []
+    for n in range(count):
+        feature_tags = rng.sample(TAGS, 1)
+        items = []
+        for s in range(scenarios_per_feature):
+            tags = sorted(set(feature_tags) | set(rng.sample(TAGS, 2)))
+            items.append({"kind": "scenario", "name": f"{rng.choice(WORDS)} scenario {n}-{s}", "line": 3 + s * 5,
+                          "tags": tags, "rule": None, "outline_line": None, "examples": None})
+        features.append({
+            "feature_name": f"{rng.choice(WORDS).title()} flow {n}", "filename": f"{rng.choice(WORDS)}_{n}.feature",
+            "path": f"/proj/features/{n}.feature", "feature_tags": feature_tags,
+            "tags": sorted({t for i in items for t in i['tags']}), "items": items, "error": None,
+        })
+    return features
+
+
+def linear_search(features, query):
+    """The previous per-keystroke loop of page_execution_run, for comparison."""
+    out = []
+    for feat in features:
+        if query in feat['feature_name'].lower() or query in feat['filename'].lower() or any(query in t.lower() for t in feat['tags']):
+            out.append(feat)
+    return out
+
+
+def linear_match(features, expression):
+    return [(f, i) for f in features for i in f['items'] if expression.matches(i['tags'])]
+
+
+def timed(func, *args, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    features = synthetic_features(count)
+    start = time.perf_counter()
+    index = FeatureIndex(features)
+    print(f"Indexed {count:,} features / {len(index.items):,} scenarios in {time.perf_counter() - start:.2f}s")
+
+    for query in ["flow 42", "refund", "payments", "zz"]:
+        linear_ms, expected = timed(linear_search, features, query)
+        index_ms, found = timed(index.search, query)
+        # The index also searches scenario names, so it may find more than the old loop
+        assert {f['path'] for f in expected} <= {f['path'] for f in found}, query
+        print(f"search {query!r:<12} linear {linear_ms:8.2f}ms  index {index_ms:8.2f}ms  ({len(found)} features)")
+
+    for text in ["@smoke and not @slow", "(@android or @ios) and @payments and not @wip"]:
+        expression = parse_tag_expression(text)
+        linear_ms, expected = timed(linear_match, features, expression, repeat=5)
+        index_ms, found = timed(index.match_items, expression, repeat=5)
+        assert len(expected) == len(found), text
+        print(f"tags {text!r:<50} linear {linear_ms:8.2f}ms  index {index_ms:8.2f}ms  ({len(found)} scenarios)")
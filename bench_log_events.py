@@ -0,0 +1,67 @@
+import re
+import sys
+import time
+import random
+from log_events import LogEventExtractor
+from verify_lt_regex import verify
+
+# A typical chatty run: mostly noise, some scenario/step lines, rare session ids and tracebacks
+TEMPLATES = [
+    (800, "[appium] {n} Proxying [POST /element] to [POST http://127.0.0.1:8200/session/abc/element] with body: {{\"using\":\"id\"}}\n"),
+    (100, "    Given the user opens screen {n} ... passed in 0.{n}s\n"),
+    (50, "  Scenario: Checkout flow {n}  # features/checkout.feature:{n}\n"),
+    (30, "    When the user taps pay {n} ... failed in 1.2s\n"),
+    (10, "SessionId: {n}-3f3f-42b7-994c-someguid\n"),
+    (10, "Traceback (most recent call last):\n"),
+    (10, "AssertionError: expected {n}\n"),
+]
+
+
+def synthetic_log(count, seed=1):
+    rng = random.Random(seed)
+    weights = [w for w, _ in TEMPLATES]
+    templates = [t for _, t in TEMPLATES]
+    picks = rng.choices(templates, weights=weights, k=count)
+    return [t.format(n=i) for i, t in enumerate(picks)]
+
+
+def legacy_scan(lines):
+    """The previous per-line logic of run_proc, for comparison."""
+    ids = set()
+    for line in lines:
+        try:
+            match = re.search(r"SessionId:\s*([a-zA-Z0-9-]+)", line, re.IGNORECASE)
+            if match: ids.add(match.group(1))
+            match = re.search(r"session_id=([a-zA-Z0-9-]+)", line, re.IGNORECASE)
+            if match: ids.add(match.group(1))
+        except: pass
+    return ids
+
+
+def extractor_scan(lines):
+    extractor = LogEventExtractor()
+    count = 0
+    for line in lines:
+        count += len(extractor.feed(line))
+    return count + len(extractor.close())
+
+
+def bench(name, func, lines):
+    start = time.perf_counter()
+    func(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {len(lines):>10,} lines  {elapsed:7.2f}s  {len(lines) / elapsed:>12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    failures = verify()
+    if failures:
+        for f in failures: print(f"FAILURE: {f}")
+        raise SystemExit(1)
+    print("Correctness: verify_lt_regex cases passed.")
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    print(f"Generating {count:,} synthetic log lines...")
+    lines = synthetic_log(count)
+    bench("legacy", legacy_scan, lines)
+    bench("extractor", extractor_scan, lines)
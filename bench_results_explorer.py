@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import tempfile
+import tracemalloc
+from allure_store import AllureStore
+
+STATUSES = ["passed"] * 8 + ["failed", "broken", "skipped"]
+TAGS = ["smoke", "regression", "slow", "payments", "login"]
+
+
+def synthetic_results(results_dir, count, steps=8, seed=1):
+    rng = random.Random(seed)
+    start = int(time.time() * 1000)
+    for n in range(count):
+        status = rng.choice(STATUSES)
+        step_list = [{"name": f"Given step {s}", "status": "passed", "start": start, "stop": start + 50} for s in range(steps)]
+        d = {"uuid": str(uuid.uuid4()), "name": f"scenario {n}", "fullName": f"Feature {n % 300}: scenario {n}",
+             "status": status, "start": start + n, "stop": start + n + rng.randint(100, 60000),
+             "historyId": f"h{n}", "steps": step_list,
+             "statusDetails": {"message": "AssertionError: boom" if status != "passed" else None},
+             "labels": [{"name": "feature", "value": f"Feature {n % 300}"}] + [{"name": "tag", "value": t} for t in rng.sample(TAGS, 2)]}
+        with open(os.path.join(results_dir, f"{d['uuid']}-result.json"), 'w', encoding='utf-8') as f:
+            json.dump(d, f)
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    value = fn()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:8.1f}ms")
+    return value
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 15000
+    with tempfile.TemporaryDirectory() as tmp:
+        results_dir = os.path.join(tmp, "allure-results")
+        os.makedirs(results_dir)
+        synthetic_results(results_dir, count)
+        store = AllureStore(results_dir, db_path=os.path.join(tmp, "index.sqlite"))
+        timed(f"first ingest ({count} results)", store.ingest)
+        timed("ingest again (nothing changed)", store.ingest)
+        tracemalloc.start()
+        rows, total = timed("page 1, newest first", lambda: store.query_results(limit=50))
+        timed("page 200, slowest first", lambda: store.query_results("duration", True, 199 * 50, 50))
+        timed("failed+broken, tag, min 30s", lambda: store.query_results(status=["failed", "broken"], tag="payments", min_duration=30))
+        timed("search 'scenario 14'", lambda: store.query_results(search="scenario 14"))
+        timed("facets", store.facets)
+        timed("open one row (steps)", lambda: store.result_detail(rows[0]['file']))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{total} results, peak memory while browsing: {peak / 1024:.0f} KiB")
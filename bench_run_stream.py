@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import http.client
+
+# Load test for the per-viewer log fan-out: one chatty run, dozens of concurrent viewers
+# (in-process subscriptions and SSE clients of runner_api), a share of them deliberately slow.
+# Every viewer must receive the exact same complete log, and the writer must not slow down.
+SUBSCRIBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+HTTP_SUBSCRIBERS = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+LINES = int(sys.argv[3]) if len(sys.argv) > 3 else 200_000
+SLOW_EVERY = 4              # every 4th viewer is slow
+SLOW_DELAY = 0.02           # seconds a slow viewer spends on each update
+SLOW_MAX_CHARS = 8_000      # and it takes small bites
+BATCH_LINES = 200
+
+LINE = "[appium] {} Proxying [POST /element] to [POST http://127.0.0.1:8200/session/abc/element] ✓\n"
+
+
+def make_run(manager, run_id):
+    from execution_manager import Run, RUNNING
+    run = Run(run_id, [], os.getcwd(), None, "allure-results")
+    run.status = RUNNING
+    with manager.lock:
+        manager.runs[run_id] = run
+    return run
+
+
+def produce(manager, run, lines):
+    """Writes the log the way worker readers do (batches of lines) and returns the seconds it took."""
+    from execution_manager import FINISHED
+    start = time.perf_counter()
+    for i in range(0, lines, BATCH_LINES):
+        manager._log(run, "".join(LINE.format(n) for n in range(i, min(i + BATCH_LINES, lines))))
+    run.status = FINISHED
+    manager._log(run, "### Run finished\n")
+    run.logs.close()
+    return time.perf_counter() - start
+
+
+def subscriber(manager, run_id, slow, out):
+    from run_stream import Subscription
+    sub = Subscription(manager.get_run(run_id), 0, SLOW_MAX_CHARS if slow else 256_000)
+    parts, start = [], time.perf_counter()
+    for update in sub:
+        parts.append(update["text"])
+        if slow:
+            time.sleep(SLOW_DELAY)
+    sub.close()
+    out.append({"kind": "slow" if slow else "fast", "text": "".join(parts), "updates": sub.updates,
+                "seconds": time.perf_counter() - start, "done_at": time.perf_counter()})
+
+
+def sse_subscriber(port, run_id, slow, out):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request("GET", f"/runs/{run_id}/stream?offset=0")
+    resp = conn.getresponse()
+    parts, event, updates, start = [], None, 0, time.perf_counter()
+    for raw in resp:
+        line = raw.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+            if event == "log":
+                parts.append(data["text"]); updates += 1
+                if slow:
+                    time.sleep(SLOW_DELAY)
+            elif event == "end":
+                break
+    conn.close()
+    out.append({"kind": "sse-slow" if slow else "sse", "text": "".join(parts), "updates": updates,
+                "seconds": time.perf_counter() - start, "done_at": time.perf_counter()})
+
+
+def main():
+    os.environ["BEHAVE_RUNNER_HOME"] = tempfile.mkdtemp(prefix="fanout-")
+    from execution_manager import ExecutionManager
+    from runner_api import make_server
+    manager = ExecutionManager()
+
+    baseline = produce(manager, make_run(manager, "baseline"), LINES)
+
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    run = make_run(manager, "fanout")
+    results, threads = [], []
+    for i in range(SUBSCRIBERS):
+        threads.append(threading.Thread(target=subscriber, args=(manager, run.run_id, i % SLOW_EVERY == 0, results)))
+    for i in range(HTTP_SUBSCRIBERS):
+        threads.append(threading.Thread(target=sse_subscriber,
+                                        args=(server.server_port, run.run_id, i % SLOW_EVERY == 0, results)))
+    for t in threads:
+        t.start()
+    time.sleep(0.2)
+    loaded = produce(manager, run, LINES)
+    written_at = time.perf_counter()
+    for t in threads:
+        t.join()
+
+    # A late viewer replays the whole finished run from offset 0
+    late = []
+    subscriber(manager, run.run_id, False, late)
+    server.shutdown()
+
+    expected = run.logs.getvalue()
+    print(f"{LINES:,} lines, {len(expected) / 1e6:.1f}M chars, {SUBSCRIBERS} subscriptions + {HTTP_SUBSCRIBERS} SSE clients")
+    print(f"writer: {baseline:.2f}s alone, {loaded:.2f}s with viewers attached")
+    ok = True
+    for kind in ("fast", "slow", "sse", "sse-slow"):
+        group = [r for r in results if r["kind"] == kind]
+        if not group:
+            continue
+        intact = sum(r["text"] == expected for r in group)
+        ok &= intact == len(group)
+        lag = max(r["done_at"] - written_at for r in group)
+        print(f"{kind:<9} {len(group):>3} viewers  {intact}/{len(group)} complete and identical  "
+              f"{sum(r['updates'] for r in group) / len(group):8.0f} updates each  caught up {max(lag, 0):.2f}s after the writer")
+    ok &= late[0]["text"] == expected
+    print(f"late replay from offset 0: {'identical' if late[0]['text'] == expected else 'MISMATCH'} "
+          f"in {late[0]['seconds']:.2f}s")
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import queue
+import tempfile
+import threading
+import subprocess
+from log_store import LogStore
+from log_events import LogEventExtractor
+from stream_reader import read_line_batches
+
+# Synthetic chatty driver: writes `count` lines unbuffered as fast as it can, then reports
+# on stderr how long its writes took (they block whenever the reader falls behind)
+PRODUCER = r'''
+import sys, time
+count = int(sys.argv[1])
+line = "[appium] {} Proxying [POST /element] to [POST http://127.0.0.1:8200/session/abc/element] \u2713\n"
+out = sys.stdout.buffer
+start = time.perf_counter()
+for i in range(count):
+    out.write(line.format(i).encode("utf-8"))
+    out.flush()
+sys.stderr.write(str(time.perf_counter() - start))
+'''
+DRAIN_EVERY = 0.05
+
+
+def producer(count):
+    return subprocess.Popen([sys.executable, "-c", PRODUCER, str(count)], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+
+
+def drainer(drain, stop):
+    """Stands in for the footer / CLI polling the shared queue."""
+    while not stop.is_set():
+        drain()
+        time.sleep(DRAIN_EVERY)
+    drain()
+
+
+def legacy(count, log_path):
+    """The previous reader: text mode, one queue item per line, drained one item at a time with +=."""
+    q = queue.Queue()
+
+    def drain():
+        new_lines = ""
+        while not q.empty():
+            try:
+                new_lines += q.get_nowait()
+            except queue.Empty:
+                break
+        return new_lines
+
+    proc = subprocess.Popen([sys.executable, "-c", PRODUCER, str(count)], stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True, bufsize=1, universal_newlines=True)
+    store, extractor, stop = LogStore(log_path), LogEventExtractor(), threading.Event()
+    t = threading.Thread(target=drainer, args=(drain, stop)); t.start()
+    for line in proc.stdout:
+        q.put(line); store.append(line); extractor.feed(line)
+    return proc, stop, t
+
+
+def chunked(count, log_path):
+    """The current reader: binary chunks, one log append per batch; viewers read the log at their own offset."""
+    proc = producer(count)
+    store, extractor, stop = LogStore(log_path), LogEventExtractor(), threading.Event()
+    cursor = [0]
+
+    def drain():
+        text, cursor[0] = store.read(cursor[0])
+        return text
+
+    t = threading.Thread(target=drainer, args=(drain, stop)); t.start()
+    for lines in read_line_batches(proc.stdout):
+        for line in lines:
+            extractor.feed(line)
+        store.append("\n".join(lines) + "\n")
+    return proc, stop, t
+
+
+def measure(name, reader, count):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        proc, stop, t = reader(count, os.path.join(tmp, "run.log"))
+        producer_seconds = float(proc.stderr.read() or 0)
+        proc.wait()
+        read_seconds = time.perf_counter() - start
+        stop.set(); t.join()
+        total = time.perf_counter() - start
+    print(f"{name:<10} {count / read_seconds:>12,.0f} lines/s  read {read_seconds:6.2f}s  "
+          f"producer writes {producer_seconds:6.2f}s  incl. final drain {total:6.2f}s")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    measure("chunked", chunked, count)
+    measure("legacy", legacy, count)
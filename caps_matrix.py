@@ -0,0 +1,139 @@
+import os
+import sqlite3
+from execution_manager import ExecutionManager, build_behave_command, behave_job, new_run_id, ACTIVE_STATES
+from allure_store import get_store, drop_store
+from run_results import LEGACY_RESULTS, list_runs
+
+# Caps runs of one matrix allowed to run at once (0 = only the runner's worker limit applies).
+# Set it to the number of parallel sessions your grid plan allows.
+MATRIX_MAX_PARALLEL = int(os.environ.get("BEHAVE_RUNNER_MATRIX_PARALLEL", "0"))
+
+# Shown for a scenario that has no result for a caps file (not run yet, or not selected there)
+MISSING = None
+
+
+def caps_name(caps_file):
+    """
+    Name of a caps file for column headers and results folders: 'android_caps.json' -> 'android_caps'.
+    A caps file given by path keeps its folders ('ios/caps.json' -> 'ios/caps'), so files with the
+    same name in different folders never share a column or a results folder.
+    """
+    return os.path.splitext(os.path.normpath(caps_file))[0].replace(os.sep, "/")
+
+
+def caps_shards(shards, caps_file, tags=None, results_dir=LEGACY_RESULTS):
+    """
+    Planned selection shards ({ 'paths', 'expected' }) as runnable shards for one caps file.
+    Each caps file writes to its own results folder, with worker sub-folders when sharded.
+    """
+    results_dir = os.path.join(results_dir, caps_name(caps_file))
+    if len(shards) == 1:
+        return [{"command": build_behave_command(caps_file, tags, shards[0]['paths'], results_dir),
+                 "results_dir": None, "expected": shards[0].get('expected', 0),
+                 "job": behave_job(caps_file, tags, shards[0]['paths'])}], results_dir
+    planned = []
+    for i, shard in enumerate(shards, 1):
+        worker_dir = os.path.join(results_dir, f"worker-{i}")
+        planned.append({"command": build_behave_command(caps_file, tags, shard['paths'], worker_dir),
+                        "results_dir": worker_dir, "expected": shard.get('expected', 0),
+                        "job": behave_job(caps_file, tags, shard['paths'])})
+    return planned, results_dir
+
+
+def submit_matrix(project_path, shards, caps_files, tags=None, priority=0, label=None, max_parallel=MATRIX_MAX_PARALLEL,
+                  env=None, results_dir=LEGACY_RESULTS):
+    """
+    Queues one run per caps file over the same selection, all in one matrix group.
+    Returns (matrix id, { caps file: run id }).
+    """
+    manager = ExecutionManager()
+    matrix_id = f"matrix-{new_run_id()}"
+    run_ids = {}
+    # The same caps file twice would be one run writing over the other
+    for caps_file in dict.fromkeys(caps_files):
+        planned, caps_dir = caps_shards(shards, caps_file, tags, results_dir)
+        run_ids[caps_file] = manager.submit(planned, project_path, dict(env or os.environ), caps_dir, priority,
+                                            f"{label or 'Matrix'} · {caps_name(caps_file)}", merge_results=len(planned) > 1,
+                                            group=matrix_id, group_limit=max_parallel or None, caps=caps_file)
+    return matrix_id, run_ids
+
+
+def list_matrices(project_path):
+    """
+    Matrix runs of a project, newest first, from the runs in memory and the manifests of earlier ones:
+    [{ 'matrix', 'label', 'created_at', 'runs': [{ 'run_id', 'caps', 'status', 'results_dir' }] }]
+    """
+    runs = {}
+    for r in list_runs(project_path):
+        if r.get('group'):
+            runs[r['run_id']] = {"run_id": r['run_id'], "matrix": r['group'], "caps": r.get('caps'), "label": r.get('label'),
+                                 "status": r.get('status'), "results_dir": r['path'], "created_at": r['created_at'],
+                                 "workers": []}
+    for run in ExecutionManager().list_runs():
+        if run.group and os.path.abspath(run.cwd) == os.path.abspath(project_path):
+            runs[run.run_id] = {"run_id": run.run_id, "matrix": run.group, "caps": run.caps, "label": run.label,
+                                "status": run.status, "results_dir": run.results_dir, "created_at": run.created_at,
+                                "workers": [w['results_dir'] for w in run.workers if w['results_dir']]}
+    matrices = {}
+    for r in sorted(runs.values(), key=lambda r: (r['created_at'], r['run_id'])):
+        m = matrices.setdefault(r['matrix'], {"matrix": r['matrix'], "label": (r['label'] or "").rsplit(" · ", 1)[0],
+                                              "created_at": r['created_at'], "runs": []})
+        m['runs'].append(r)
+    return sorted(matrices.values(), key=lambda m: m['created_at'], reverse=True)
+
+
+def _latest_by_scenario(results_dirs):
+    """
+    Latest result per (feature, scenario) across folders. A scenario that one shard ran and the
+    others only reported as skipped (behave skips what is outside its file:line selection) keeps
+    the result of the shard that ran it.
+    """
+    latest = {}
+    for folder in results_dirs:
+        if not os.path.isdir(folder):
+            continue
+        try:
+            store = get_store(folder)
+            store.ingest()
+            rows = store.list_results()
+        except (OSError, sqlite3.Error):
+            # A worker folder merged (and its index dropped) while it was being read
+            rows = []
+        for row in rows:
+            key = (row['feature'] or "", row['name'])
+            seen = latest.get(key)
+            rank = (row['status'] != "skipped", row['start'] or 0)
+            if seen is None or rank > (seen['status'] != "skipped", seen['start'] or 0):
+                latest[key] = row
+        if not os.path.isdir(folder):
+            drop_store(folder)
+    return latest
+
+
+def matrix_table(matrix):
+    """
+    Scenario x capability view of one matrix (an entry of list_matrices).
+    Returns (columns, rows, totals):
+      columns: caps names in submission order
+      rows:    [{ 'feature', 'scenario', 'cells': { caps name: status or MISSING } }] sorted by feature and scenario
+      totals:  { caps name: { status: count, 'run_status': the run's state } }
+    Running caps runs are read from their worker folders too, so cells fill in while the matrix runs.
+    """
+    columns, cells, totals = [], {}, {}
+    for r in matrix['runs']:
+        name = caps_name(r['caps'] or r['run_id'])
+        columns.append(name)
+        folders = [r['results_dir']] + (r['workers'] if r['status'] in ACTIVE_STATES else [])
+        counts = {"run_status": r['status']}
+        for key, row in _latest_by_scenario(folders).items():
+            cells.setdefault(key, {})[name] = row['status']
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        totals[name] = counts
+    rows = [{"feature": feature, "scenario": scenario, "cells": {c: found.get(c, MISSING) for c in columns}}
+            for (feature, scenario), found in sorted(cells.items())]
+    return columns, rows, totals
+
+
+def differing_rows(rows):
+    """Rows whose capabilities disagree, e.g. passing on Chrome but failing on Safari."""
+    return [r for r in rows if len(set(r['cells'].values())) > 1]
@@ -0,0 +1,38 @@
+import os
+import sys
+import json
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Renders app.py once in a fresh interpreter with the startup profiler on
+PROBE = """
+import os, sys, json
+sys.path.insert(0, {here!r}); os.chdir({here!r})
+import startup_profile
+startup_profile.install()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join({here!r}, "app.py"), default_timeout=120)
+at.run()
+print("REPORT " + json.dumps(startup_profile.build_report()))
+"""
+
+
+def measure():
+    env = dict(os.environ, BEHAVE_RUNNER_PROFILE_STARTUP="1")
+    out = subprocess.run([sys.executable, "-c", PROBE.format(here=HERE)], env=env, capture_output=True, text=True).stdout
+    for line in out.splitlines():
+        if line.startswith("REPORT "):
+            return json.loads(line[len("REPORT "):])
+    raise SystemExit("The probe did not produce a startup report")
+
+
+if __name__ == "__main__":
+    import startup_profile
+    report = measure()
+    print(startup_profile.format_report(report))
+    over = [label for label, check in report["budget"].items() if not check["ok"]]
+    if over:
+        print(f"FAILURE: over the startup budget for {', '.join(over)} (see {startup_profile.BUDGET_FILE})")
+        raise SystemExit(1)
+    print("SUCCESS: startup within budget.")
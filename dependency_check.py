@@ -0,0 +1,167 @@
+import os
+import re
+import sys
+import threading
+import subprocess
+
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    Requirement = None
+
+# Row states shown on the Requirements page
+OK = "ok"
+MISSING = "missing"
+MISMATCH = "mismatch"
+NOT_APPLICABLE = "not applicable"
+UNPARSED = "unparsed"
+NEEDS_INSTALL = (MISSING, MISMATCH)
+
+# Offline wheel folder used when the page does not name one
+WHEELHOUSE_ENV = "BEHAVE_RUNNER_WHEELHOUSE"
+
+_lock = threading.Lock()
+_snapshot = {"stamp": None, "versions": {}}
+_parsed = {}
+
+
+def _canonical(name):
+    if Requirement is not None:
+        return canonicalize_name(name)
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _path_stamp():
+    """Installing or removing a distribution touches its site-packages folder."""
+    stamp = []
+    for p in sys.path:
+        try:
+            stamp.append((p, os.stat(p).st_mtime))
+        except OSError:
+            continue
+    return tuple(stamp)
+
+
+def environment_snapshot(force=False):
+    """{canonical name: version} of every installed distribution, read in one pass and cached until sys.path changes."""
+    import importlib.metadata
+    stamp = _path_stamp()
+    with _lock:
+        if force or _snapshot["stamp"] != stamp:
+            versions = {}
+            for dist in importlib.metadata.distributions():
+                name = dist.metadata["Name"]
+                if name and _canonical(name) not in versions:
+                    versions[_canonical(name)] = dist.version
+            _snapshot.update(stamp=stamp, versions=versions)
+        return _snapshot["versions"]
+
+
+def invalidate():
+    import importlib
+    importlib.invalidate_caches()
+    with _lock:
+        _snapshot["stamp"] = None
+
+
+def _parse_line(line):
+    if Requirement is None:
+        name = re.split(r"[\s=<>!~;\[]", line, 1)[0].strip()
+        return {"line": line, "name": name, "key": _canonical(name), "requirement": None, "error": None}
+    try:
+        req = Requirement(line)
+    except InvalidRequirement as e:
+        return {"line": line, "name": line, "key": None, "requirement": None, "error": str(e)}
+    return {"line": line, "name": req.name, "key": _canonical(req.name), "requirement": req, "error": None}
+
+
+def parse_requirements(path):
+    """Parses requirements.txt once per modification. Options (-r, -e, --index-url, ...) are reported as unparsed."""
+    st_ = os.stat(path)
+    cached = _parsed.get(path)
+    if cached and cached[0] == (st_.st_mtime, st_.st_size):
+        return cached[1]
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for raw in f:
+            line = raw.split(" #", 1)[0].strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("-"):
+                entries.append({"line": line, "name": line, "key": None, "requirement": None, "error": "pip option, not checked"})
+                continue
+            entries.append(_parse_line(line))
+    _parsed[path] = ((st_.st_mtime, st_.st_size), entries)
+    return entries
+
+
+def check_requirements(path):
+    """
+    Checks every requirement against the environment snapshot.
+    Returns a list of dicts: { 'line', 'name', 'installed', 'state', 'detail' }
+    """
+    versions = environment_snapshot()
+    rows = []
+    for entry in parse_requirements(path):
+        req = entry["requirement"]
+        installed = versions.get(entry["key"]) if entry["key"] else None
+        state, detail = OK, ""
+        if entry["error"]:
+            state, detail = UNPARSED, entry["error"]
+        elif req is not None and req.marker is not None and not req.marker.evaluate():
+            state, detail = NOT_APPLICABLE, f"marker: {req.marker}"
+        elif installed is None:
+            state = MISSING
+        elif req is not None and req.specifier:
+            try:
+                satisfied = req.specifier.contains(Version(installed), prereleases=True)
+            except InvalidVersion:
+                satisfied = False
+            if not satisfied:
+                state, detail = MISMATCH, f"needs {req.specifier}"
+        rows.append({"line": entry["line"], "name": entry["name"], "installed": installed, "state": state, "detail": detail})
+    return rows
+
+
+def install_command(requirements, wheelhouse=None, offline=False):
+    """One pip invocation for every requirement, so the resolver sees them all at once."""
+    cmd = [sys.executable, "-m", "pip", "install", "--progress-bar", "off", "--disable-pip-version-check"]
+    if wheelhouse:
+        cmd += ["--find-links", wheelhouse]
+        if offline:
+            cmd.append("--no-index")
+    return cmd + list(requirements)
+
+
+def install_requirements(requirements, wheelhouse=None, offline=False, on_line=None):
+    """
+    Installs `requirements` (requirement strings) in a single pip run, calling `on_line(text)`
+    for every output line. Returns (ok, message).
+    """
+    if not requirements:
+        return True, "Nothing to install"
+    cmd = install_command(requirements, wheelhouse, offline)
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        for line in process.stdout:
+            if on_line:
+                on_line(line)
+        process.wait()
+    except Exception as e:
+        return False, str(e)
+    finally:
+        invalidate()
+    if process.returncode == 0:
+        return True, f"Installed {len(requirements)} requirements"
+    return False, f"pip exited with code {process.returncode}"
+
+
+def default_wheelhouse(project_path):
+    """BEHAVE_RUNNER_WHEELHOUSE, or a 'wheelhouse' folder in the project."""
+    configured = os.environ.get(WHEELHOUSE_ENV)
+    if configured:
+        return configured
+    local = os.path.join(project_path, "wheelhouse")
+    return local if os.path.isdir(local) else ""
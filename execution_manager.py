@@ -1,128 +1,644 @@
 import threading
 import subprocess
-import queue
+import shlex
 import os
 import signal
 import sys
+import glob
+import shutil
+import time
+import uuid
 import re
-import requests
+import heapq
+import weakref
+from collections import deque
+from log_store import LogStore
+from live_results import LiveResults
+from allure_store import drop_store
+from log_events import LogEventExtractor, LT_SESSION, BS_SESSION
+from session_teardown import teardown_run_sessions
+from runner_paths import runner_home
+from resource_sampler import ResourceSampler
+from stream_reader import read_line_batches
+from run_events import EventChannel, RunProgress
+from run_results import PER_RUN_RESULTS, run_results_dir, finalize_run, apply_retention
+from remote_agents import AgentRegistry, RemoteJob, AgentUnavailable, RESULTS_SYNC_SECONDS
+
+# Bundled formatter streaming structured events next to the text output (see runner_formatter.py)
+EVENT_FORMATTER = "runner_formatter:RunnerEventFormatter"
+ALLURE_FORMATTER = "allure_behave.formatter:AllureFormatter"
+# allure-behave's formatter that also reports scenarios inside Rule blocks, swapped in at launch
+RULE_ALLURE_FORMATTER = "runner_formatter:RuleAllureFormatter"
+# A feature path narrowed to one scenario ("features/a.feature:12")
+LOCATION = re.compile(r":\d+$")
+RUNNER_DIR = os.path.dirname(os.path.abspath(__file__))
+# Where behave workers send their events; set it to an address agents on other hosts can reach
+EVENTS_HOST = os.environ.get("BEHAVE_RUNNER_EVENTS_HOST", "127.0.0.1")
+
+def build_behave_command(caps_file, tags=None, feature_paths=None, results_dir="allure-results"):
+    """
+    Builds the behave command used for every run, as an argument list. It is started without a
+    shell, so tag expressions, caps names and paths reach behave exactly as given.
+    """
+    argv = [sys.executable, "-m", "behave", "--no-logcapture", "-D", "property_file=configs/config.properties",
+            "-D", "endpoint_file=endpoints.json", "-D", f"caps_file={caps_file}"]
+    # A string is a tag expression ("@a and not @b"); a list keeps the legacy comma form
+    if isinstance(tags, str):
+        if tags.strip():
+            argv.append(f"--tags={tags}")
+    elif tags:
+        argv.append(f"--tags={','.join(tags)}")
+    argv += ["--no-capture", "--no-capture-stderr", "--no-color"]
+    feature_paths = list(feature_paths or [])
+    # With file:line locations allure-behave writes every other scenario of those files as
+    # skipped; scenario shards would then report each other's scenarios once more
+    if any(LOCATION.search(p) for p in feature_paths):
+        argv.append("--no-skipped")
+    argv += ["-f", ALLURE_FORMATTER, "-o", results_dir]
+    return argv + feature_paths
+
+
+def behave_job(caps_file, tags=None, feature_paths=None):
+    """
+    The selection a shard runs, as sent to runner agents: an agent only accepts this and builds
+    the behave command itself (see runner_agent.RunnerAgent.submit), never a command line.
+    """
+    return {"caps": caps_file, "tags": tags, "paths": list(feature_paths or [])}
+
+
+def with_event_formatter(argv):
+    """
+    `argv` plus the runner's event formatter, which only imports with the runner's folder on
+    PYTHONPATH; it is added at launch while the run's event channel is up, never to shown commands.
+    """
+    at = argv.index("-o") + 2
+    return argv[:at] + ["-f", EVENT_FORMATTER] + argv[at:]
+
+
+def with_rule_results(argv):
+    """`argv` writing Allure results for Rule scenarios too; like the event formatter, only at launch."""
+    return [RULE_ALLURE_FORMATTER if a == ALLURE_FORMATTER else a for a in argv]
+
+
+def format_command(argv):
+    """A command as it would be typed in this platform's shell, for logs and --dry-run."""
+    return subprocess.list2cmdline(argv) if os.name == 'nt' else shlex.join(argv)
+
+
+def merge_allure_results(source_dirs, target_dir):
+    """Moves every file from the worker result folders into `target_dir`. Returns the number of result files merged."""
+    os.makedirs(target_dir, exist_ok=True)
+    merged = 0
+    for src in source_dirs:
+        if not src or not os.path.isdir(src):
+            continue
+        for name in os.listdir(src):
+            src_file = os.path.join(src, name)
+            if not os.path.isfile(src_file):
+                continue
+            # Allure names its files by uuid, so collisions only happen for shared files like categories.json
+            shutil.move(src_file, os.path.join(target_dir, name))
+            if name.endswith("-result.json"):
+                merged += 1
+        shutil.rmtree(src, ignore_errors=True)
+        # Live results and the matrix view index worker folders while they run
+        drop_store(src)
+    return merged
+
+
+def retarget_results(shards, results_dir, target_dir):
+    """
+    Points shard commands built for `results_dir` at `target_dir` instead, keeping worker sub-folders.
+    Returns (shards, target_dir).
+    """
+    moved = []
+    for shard in shards:
+        old = shard.get('results_dir') or results_dir
+        new = target_dir
+        if shard.get('results_dir'):
+            rel = os.path.relpath(old, results_dir)
+            new = os.path.join(target_dir, os.path.basename(old) if rel.startswith("..") else rel)
+        command = list(shard['command'])
+        command[command.index("-o") + 1] = new
+        moved.append(dict(shard, command=command, results_dir=new if shard.get('results_dir') else None))
+    return moved, target_dir
+
+
+# Run states
+QUEUED, RUNNING, FINISHED, FAILED, CANCELLED = "queued", "running", "finished", "failed", "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Worker slots (behave processes) that may run at the same time across all runs
+DEFAULT_MAX_CONCURRENT = int(os.environ.get("BEHAVE_RUNNER_MAX_CONCURRENT", "2"))
+
+
+def new_run_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+class Run:
+    """State of one queued, running or finished execution."""
+
+    def __init__(self, run_id, shards, cwd, env, results_dir, priority=0, label=None, merge_results=False,
+                 group=None, group_limit=None, caps=None):
+        self.run_id = run_id
+        self.label = label or run_id
+        self.priority = priority
+        # Runs of one capabilities matrix share a group; at most group_limit of them run at once
+        self.group = group
+        self.group_limit = group_limit
+        self.caps = caps
+        self.cwd = cwd
+        self.env = env
+        self.status = QUEUED
+        self.results_dir = os.path.join(cwd, results_dir)
+        self.merge_results = merge_results
+        self.workers = [_new_worker(i, s['command'], os.path.join(cwd, s['results_dir']) if s.get('results_dir') else None, s.get('expected', 0),
+                                    s.get('job'))
+                        for i, s in enumerate(shards, 1)]
+        self.logs = LogStore(os.path.join(runner_home("logs"), f"run-{run_id}.log"))
+        self.lt_session_ids = set()
+        self.bs_session_ids = set()
+        self.events = deque(maxlen=1000)
+        self.teardown_reports = []
+        self.live = None
+        self.resources = None
+        self.progress = None
+        self.channel = None
+        self.event_token = uuid.uuid4().hex
+        self.thread = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.per_run = False
+        self.disk_usage = None
+        # Running run this one waits for because both write to the same results folder
+        self.held_by = None
+        # Open run_stream.Subscription objects, i.e. who is watching this run right now
+        self.viewers = weakref.WeakSet()
+
+    @property
+    def is_running(self):
+        return self.status == RUNNING
+
+    @property
+    def slots(self):
+        return len(self.workers)
+
+    def worker_progress(self):
+        """
+        Returns per-worker progress for the footer.
+        Finished scenarios come from the formatter's events; without them they are counted from
+        the result files each worker has written so far.
+        """
+        progress = []
+        for w in self.workers:
+            done = self.progress.done(w['id']) if self.progress else None
+            if done is None:
+                done = w['done']
+                if w['results_dir'] and os.path.isdir(w['results_dir']):
+                    done = len(glob.glob(os.path.join(w['results_dir'], "*-result.json")))
+            progress.append({"id": w['id'], "status": w['status'], "done": done, "expected": w['expected']})
+        return progress
+
+    def summary(self):
+        return {"run_id": self.run_id, "label": self.label, "status": self.status, "priority": self.priority,
+                "workers": self.slots, "created_at": self.created_at, "started_at": self.started_at,
+                "finished_at": self.finished_at, "results_dir": self.results_dir, "log": self.logs.path,
+                "disk_usage": self.disk_usage, "resources": self.resources.summary() if self.resources else None,
+                "progress": self.progress.snapshot() if self.progress else None,
+                "log_size": len(self.logs), "viewers": len(self.viewers), "group": self.group, "caps": self.caps}
+
+
+def _new_worker(worker_id, command, results_dir, expected, job=None):
+    return {"id": worker_id, "command": command, "results_dir": results_dir, "expected": expected, "job": job,
+            "status": "pending", "returncode": None, "process": None, "done": 0, "agent": None, "remote": None}
+
 
 class ExecutionManager:
+    """
+    Process-wide queue of runs. Runs are started in priority order (then submission order)
+    while the number of busy worker slots stays within `max_concurrent`.
+    """
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ExecutionManager, cls).__new__(cls)
-            cls._instance.process = None
-            cls._instance.output_queue = queue.Queue()
-            cls._instance.is_running = False
-            cls._instance.full_logs = ""
-            cls._instance.thread = None
-            cls._instance.lt_session_ids = set()
+            cls._instance.lock = threading.RLock()
+            cls._instance.runs = {}
+            cls._instance.pending = []
+            cls._instance.sequence = 0
+            cls._instance.max_concurrent = DEFAULT_MAX_CONCURRENT
+            # An agent coming up adds worker slots, which may let queued runs start
+            AgentRegistry().listeners.append(cls._instance._schedule)
+            cls._instance.latest_run_id = None
+            cls._instance.event_subscribers = []
+            cls._instance.stop_metrics = deque(maxlen=100)
         return cls._instance
 
-    def start_execution(self, command, cwd, env):
-        if self.is_running:
-            return False
+    # --- Queue ---
+    def submit(self, shards, cwd, env, results_dir="allure-results", priority=0, label=None, merge_results=False,
+               group=None, group_limit=None, caps=None):
+        """
+        Queues a run and returns its run id.
+        `shards` is a list of dicts: { 'command', 'results_dir', 'expected', 'job' }; one behave process per shard.
+        Only shards with a 'job' (see behave_job) can be placed on runner agents.
+        Runs submitted with the same `group` start at most `group_limit` at a time (see caps_matrix).
+        """
+        if not shards:
+            return None
+        run_id = new_run_id()
+        if PER_RUN_RESULTS:
+            # Every run gets its own results folder so runs never mix; retention cleans up old ones
+            shards, results_dir = retarget_results(shards, results_dir, run_results_dir(run_id))
+        run = Run(run_id, shards, cwd, env, results_dir, priority, label, merge_results, group, group_limit, caps)
+        run.per_run = PER_RUN_RESULTS
+        if len(shards) > 1:
+            run.logs.append(f"### Queued Parallel Execution ({len(shards)} workers)...\n")
+            for w in run.workers:
+                run.logs.append(f"$ [w{w['id']}] {format_command(w['command'])}\n")
+        else:
+            run.logs.append(f"### Queued Execution...\n$ {format_command(run.workers[0]['command'])}\n")
+        with self.lock:
+            self.runs[run.run_id] = run
+            self.sequence += 1
+            heapq.heappush(self.pending, (-priority, self.sequence, run.run_id))
+            self.latest_run_id = run.run_id
+        self._schedule()
+        return run.run_id
 
-        self.full_logs = f"### Starting Execution...\n$ {command}\n"
-        self.is_running = True
-        self.lt_session_ids.clear()
-        
-        def run_proc():
-            try:
-                # On Unix, setsid creates a new process group so we can kill the whole group
-                preexec = os.setsid if os.name == 'posix' else None
-                
-                self.process = subprocess.Popen(
-                    command,
-                    cwd=cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    shell=True,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    env=env,
-                    preexec_fn=preexec
-                )
-                
-                for line in self.process.stdout:
-                    self.output_queue.put(line)
-                    self.full_logs += line
-                    
-                    # Capture LambdaTest Session ID
-                    # Common patterns: "SessionId: <guid>", "session_id=<guid>"
-                    try:
-                        # Pattern 1: SessionId: <guid>
-                        match = re.search(r"SessionId:\s*([a-zA-Z0-9-]+)", line, re.IGNORECASE)
-                        if match: self.lt_session_ids.add(match.group(1))
-                        
-                        # Pattern 2: session_id=<guid> (e.g. in URLs)
-                        match = re.search(r"session_id=([a-zA-Z0-9-]+)", line, re.IGNORECASE)
-                        if match: self.lt_session_ids.add(match.group(1))
-                    except: pass
-                
-                self.process.wait()
-            except Exception as e:
-                self.full_logs += f"\n[ERROR] Process Exception: {e}\n"
-            finally:
-                self.is_running = False
-                self.process = None
-
-        self.thread = threading.Thread(target=run_proc, daemon=True)
-        self.thread.start()
-        return True
-    def stop_execution(self):
-        """Terminates the running process tree."""
-        if self.process and self.is_running:
-            try:
-                self.full_logs += "\n[INFO] Stopping execution...\n"
-                
-                # Check for cloud provider environment variables and attempt to stop session
-                # This is a best-effort attempt to stop remote sessions if the local process is killed
-                if os.environ.get('LT_USERNAME') and os.environ.get('LT_ACCESS_KEY'):
-                    username = os.environ.get('LT_USERNAME')
-                    access_key = os.environ.get('LT_ACCESS_KEY')
-                    
-                    if self.lt_session_ids:
-                        self.full_logs += f"\n[INFO] Found LambdaTest Sessions to stop: {self.lt_session_ids}\n"
-                        for session_id in self.lt_session_ids:
-                            try:
-                                url = f"https://api.lambdatest.com/automation/api/v1/sessions/{session_id}/stop"
-                                response = requests.put(url, auth=(username, access_key))
-                                if response.status_code == 200:
-                                    self.full_logs += f"[INFO] Successfully stopped session {session_id}\n"
-                                else:
-                                    self.full_logs += f"[WARN] Failed to stop session {session_id}: {response.text}\n"
-                            except Exception as e:
-                                self.full_logs += f"[ERROR] Error stopping session {session_id}: {e}\n"
-                    else:
-                        self.full_logs += "\n[INFO] No LambdaTest Session IDs found in logs to stop.\n"
-
-                elif os.environ.get('BROWSERSTACK_USERNAME') and os.environ.get('BROWSERSTACK_ACCESS_KEY'):
-                    # Logic for BrowserStack session termination could go here
-                    pass
-
-                if os.name == 'nt': # Windows
-                    # /F = Force, /T = Tree (kill children like behave.exe)
-                    subprocess.call(['taskkill', '/F', '/T', '/PID', str(self.process.pid)])
-                else: # Linux/Mac
-                    # Kill the process group
-                    os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-                
-                self.is_running = False
+    def set_max_concurrent(self, value):
+        with self.lock:
+            self.max_concurrent = max(1, int(value))
+        self._schedule()
+
+    def _busy_slots(self):
+        return sum(r.slots for r in self.runs.values() if r.status == RUNNING)
+
+    def _capacity(self):
+        """Worker slots on this host plus those of the runner agents currently reachable."""
+        return self.max_concurrent + sum(a['capacity'] for a in AgentRegistry().available())
+
+    def _place(self, run):
+        """Assigns each worker of a starting run to this host (agent None) or to the agent with the most free slots."""
+        agents = AgentRegistry().available()
+        if not agents:
+            return
+        busy = {}
+        for r in self.runs.values():
+            if r.status == RUNNING and r is not run:
+                for w in r.workers:
+                    busy[w['agent']] = busy.get(w['agent'], 0) + 1
+        free = {None: self.max_concurrent - busy.get(None, 0)}
+        free.update({a['url']: a['capacity'] - busy.get(a['url'], 0) for a in agents})
+        for w in run.workers:
+            if not w['job']:
+                # A bare command line only ever runs on this host
+                free[None] -= 1
+                continue
+            # Ties go to this host, then to agents in registration order
+            host = max(free, key=lambda h: free[h])
+            w['agent'] = host
+            free[host] -= 1
+
+    def _results_busy(self, run):
+        """
+        The running run that writes to the results folder of `run` (or a folder inside it), if any.
+        Only possible with per-run results folders turned off: starting both would wipe each other's worker folders.
+        """
+        mine = os.path.abspath(run.results_dir)
+        for r in self.runs.values():
+            if r.status == RUNNING and r is not run:
+                theirs = os.path.abspath(r.results_dir)
+                if mine == theirs or mine.startswith(theirs + os.sep) or theirs.startswith(mine + os.sep):
+                    return r
+        return None
+
+    def _group_running(self, group):
+        return sum(1 for r in self.runs.values() if r.group == group and r.status == RUNNING)
+
+    def _schedule(self):
+        """
+        Starts queued runs while there are free worker slots. A run bigger than the limit still starts once the host is idle.
+        A run whose group is at its own limit, or whose results folder a running run writes to, is passed over
+        without holding up the runs queued behind it.
+        """
+        with self.lock:
+            for entry in sorted(self.pending):
+                run = self.runs.get(entry[2])
+                if run is None or run.status != QUEUED:
+                    self.pending.remove(entry)
+                    continue
+                if run.group_limit and self._group_running(run.group) >= run.group_limit:
+                    continue
+                writer = self._results_busy(run)
+                if writer:
+                    if run.held_by != writer.run_id:
+                        run.held_by = writer.run_id
+                        run.logs.append(f"[INFO] Waiting for {writer.run_id}, it writes to the same results folder\n")
+                    continue
+                busy = self._busy_slots()
+                if busy and busy + run.slots > self._capacity():
+                    break
+                self.pending.remove(entry)
+                self._place(run)
+                self._start(run)
+            heapq.heapify(self.pending)
+
+    def _start(self, run):
+        run.status = RUNNING
+        run.started_at = time.time()
+        run.logs.append(f"### Started at {time.strftime('%H:%M:%S')}\n")
+        run.live = LiveResults([w['results_dir'] for w in run.workers] if run.merge_results else [run.results_dir])
+        run.live.start()
+        run.resources = ResourceSampler(run.run_id, lambda: [w['process'] for w in run.workers if w['process']],
+                                        log=lambda text: self._log(run, text))
+        run.resources.start()
+        run.progress = RunProgress()
+        try:
+            run.channel = EventChannel(run.event_token, run.progress.handle, EVENTS_HOST).start()
+        except OSError as e:
+            run.logs.append(f"[WARN] Structured events unavailable, falling back to the text output: {e}\n")
+        run.thread = threading.Thread(target=self._execute, args=(run,), daemon=True)
+        run.thread.start()
+
+    def _execute(self, run):
+        try:
+            if run.merge_results:
+                for w in run.workers:
+                    if os.path.isdir(w['results_dir']):
+                        shutil.rmtree(w['results_dir'], ignore_errors=True)
+                    os.makedirs(w['results_dir'], exist_ok=True)
+            prefix = (lambda w: f"[w{w['id']}] ") if run.slots > 1 else (lambda w: "")
+            threads = [threading.Thread(target=self._run_worker, args=(run, w, prefix(w)), daemon=True) for w in run.workers]
+            for t in threads: t.start()
+            for t in threads: t.join()
+            if run.merge_results:
+                for w, p in zip(run.workers, run.worker_progress()):
+                    w['done'] = p['done']
+                # Live results stop reading the worker folders before they are merged away
+                run.live.stop()
+                merged = merge_allure_results([w['results_dir'] for w in run.workers], run.results_dir)
+                self._log(run, f"\n[INFO] Merged {merged} result files into {run.results_dir}\n")
+        except Exception as e:
+            self._log(run, f"\n[ERROR] Execution Exception: {e}\n")
+        finally:
+            if run.channel:
+                self._teardown(run, "event channel", run.channel.close)
+            self._teardown(run, "resource sampler", run.resources.stop)
+            self._teardown(run, "live results", lambda: run.live.stop([run.results_dir]))
+            if run.cancel_requested:
+                run.status = CANCELLED
+            else:
+                run.status = FINISHED if all(w['status'] == "passed" for w in run.workers) else FAILED
+            run.finished_at = time.time()
+            if run.per_run:
+                self._finalize_results(run)
+            run.logs.append(f"\n### Run {run.status} at {time.strftime('%H:%M:%S')}\n")
+            run.logs.close()
+            self._schedule()
+
+    def _teardown(self, run, name, stop):
+        """One teardown step of a finished run; a failure is logged so the run still gets its final status."""
+        try:
+            stop()
+        except Exception as e:
+            self._log(run, f"[ERROR] Stopping the {name} failed: {e}\n")
+
+    def _finalize_results(self, run):
+        """Dedupes the run's attachments, records its disk usage and applies the retention policy."""
+        try:
+            run.disk_usage = finalize_run(run.cwd, run.results_dir, label=run.label, status=run.status,
+                                          created_at=run.created_at, started_at=run.started_at, finished_at=run.finished_at,
+                                          group=run.group, caps=run.caps)
+            active = [r.results_dir for r in self.list_runs(states=ACTIVE_STATES)]
+            for action in apply_retention(run.cwd, active=active):
+                run.logs.append(f"[INFO] Results of {action['run_id']} {action['action']} ({action['reason']}, {action['bytes'] / 1048576:.1f} MB)\n")
+        except Exception as e:
+            run.logs.append(f"[ERROR] Results retention failed: {e}\n")
+
+    def _new_extractor(self, run):
+        """One extractor per worker stream; session ids are collected on the run, every event goes to subscribers."""
+        extractor = LogEventExtractor()
+        extractor.subscribe(LT_SESSION, lambda e: run.lt_session_ids.add(e.value))
+        extractor.subscribe(BS_SESSION, lambda e: run.bs_session_ids.add(e.value))
+        extractor.subscribe(None, run.events.append)
+        for callback in self.event_subscribers:
+            extractor.subscribe(None, lambda e, cb=callback: cb(run, e))
+        return extractor
+
+    def subscribe_events(self, callback):
+        """Calls `callback(run, event)` for every log event of every run started afterwards."""
+        self.event_subscribers.append(callback)
+
+    def _log(self, run, text):
+        run.logs.append(text)
+
+    def _worker_env(self, run, worker):
+        """The run's environment plus where the event formatter should connect, and the path to import it from."""
+        env = dict(run.env or os.environ)
+        if run.channel:
+            env.update(BEHAVE_RUNNER_EVENTS=run.channel.address, BEHAVE_RUNNER_EVENT_TOKEN=run.event_token,
+                       BEHAVE_RUNNER_WORKER=str(worker['id']))
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (RUNNER_DIR, env.get("PYTHONPATH")) if p)
+        # Output is read as bytes and decoded as UTF-8, whatever the console code page is
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        return env
+
+    def _launch_command(self, run, worker):
+        command = with_rule_results(worker['command'])
+        return with_event_formatter(command) if run.channel else command
+
+    def _remote_env(self, run, worker):
+        """What an agent adds to its own environment for a worker: the run's overrides and the event settings."""
+        env = self._worker_env(run, worker)
+        return {k: v for k, v in env.items() if k != "PYTHONPATH" and os.environ.get(k) != v}
+
+    def _feed(self, run, extractor, lines, prefix):
+        for line in lines:
+            extractor.feed(line)
+        if prefix:
+            self._log(run, "".join(f"{prefix}{line}\n" for line in lines))
+        else:
+            self._log(run, "\n".join(lines) + "\n")
+
+    def _run_remote_worker(self, run, worker, prefix):
+        """
+        Runs a worker on its agent: the log is long-polled into the run's log and the result files
+        are copied into the worker's results folder as they appear, so live results, merging and
+        the Allure views work as for a local worker. Falls back to this host if the agent is full or gone.
+        """
+        job = RemoteJob(worker['agent'], f"{run.run_id}-w{worker['id']}")
+        target = worker['results_dir'] or run.results_dir
+        try:
+            job.start(dict(worker['job'], events=run.channel is not None), self._remote_env(run, worker))
+        except AgentUnavailable as e:
+            self._log(run, f"[WARN] {prefix}{e}; running on this host instead\n")
+            worker['agent'] = None
+            return self._run_worker(run, worker, prefix)
+        try:
+            worker['status'] = "running"
+            worker['remote'] = job
+            self._log(run, f"[INFO] {prefix}Running on agent {job.agent}\n")
+            extractor = self._new_extractor(run)
+            offset, partial, synced = 0, "", 0.0
+            while True:
+                update = job.log(offset)
+                offset = update['offset']
+                if update['text']:
+                    lines = (partial + update['text']).split("\n")
+                    partial = lines.pop()
+                    if lines:
+                        self._feed(run, extractor, lines, prefix)
+                finished = update['status'] != "running"
+                if finished or time.time() - synced >= RESULTS_SYNC_SECONDS:
+                    job.sync_results(target)
+                    synced = time.time()
+                if finished and not update['text']:
+                    break
+            if partial:
+                self._feed(run, extractor, [partial], prefix)
+            extractor.close()
+            worker['returncode'] = update['returncode']
+            worker['status'] = update['status']
+        except Exception as e:
+            worker['status'] = "error"
+            self._log(run, f"\n[ERROR] {prefix}Agent {job.agent}: {e}\n")
+        finally:
+            worker['remote'] = None
+            job.purge()
+
+    def _run_worker(self, run, worker, prefix):
+        """Runs a single behave process, streaming its output with an optional worker prefix."""
+        if worker['agent']:
+            return self._run_remote_worker(run, worker, prefix)
+        try:
+            # On Unix, setsid creates a new process group so we can kill the whole group
+            preexec = os.setsid if os.name == 'posix' else None
+            
+            worker['status'] = "running"
+            worker['process'] = subprocess.Popen(
+                self._launch_command(run, worker),
+                cwd=run.cwd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=self._worker_env(run, worker),
+                preexec_fn=preexec
+            )
+            
+            # Binary chunks, one log append per batch of lines
+            extractor = self._new_extractor(run)
+            for lines in read_line_batches(worker['process'].stdout):
+                self._feed(run, extractor, lines, prefix)
+            extractor.close()
+            
+            worker['returncode'] = worker['process'].wait()
+            worker['status'] = "passed" if worker['returncode'] == 0 else "failed"
+        except Exception as e:
+            worker['status'] = "error"
+            self._log(run, f"\n[ERROR] {prefix}Process Exception: {e}\n")
+        finally:
+            worker['process'] = None
+
+    # --- Queries ---
+    def get_run(self, run_id=None):
+        """Returns the given run, or the most recently submitted one."""
+        with self.lock:
+            return self.runs.get(run_id or self.latest_run_id)
+
+    def list_runs(self, states=None):
+        """Runs newest first, optionally limited to some states."""
+        with self.lock:
+            runs = [r for r in self.runs.values() if not states or r.status in states]
+        return sorted(runs, key=lambda r: r.created_at, reverse=True)
+
+    @property
+    def is_running(self):
+        with self.lock:
+            return any(r.status == RUNNING for r in self.runs.values())
+
+    # --- Backwards compatible single-run API ---
+    def start_execution(self, command, cwd, env, results_dir="allure-results", priority=0, label=None):
+        return self.submit([{"command": command}], cwd, env, results_dir, priority, label)
+
+    def start_parallel_execution(self, shards, cwd, env, results_dir="allure-results", priority=0, label=None):
+        """Runs one behave process per shard and merges their allure results into `results_dir`."""
+        return self.submit(shards, cwd, env, results_dir, priority, label, merge_results=True)
+
+    # --- Cancel ---
+    def cancel(self, run_id):
+        """Cancels a queued run, or stops a running one. Returns True if something was cancelled."""
+        with self.lock:
+            run = self.runs.get(run_id)
+            if run is None:
+                return False
+            if run.status == QUEUED:
+                run.status = CANCELLED
+                run.finished_at = time.time()
+                run.logs.append("\n[INFO] Cancelled before it started.\n")
+                run.logs.close()
                 return True
+        if run.status == RUNNING:
+            return self._stop_run(run)
+        return False
+
+    def stop_execution(self, run_id=None):
+        """Terminates the given run, or every running run."""
+        runs = [self.get_run(run_id)] if run_id else self.list_runs(states=(RUNNING,))
+        stopped = [self.cancel(r.run_id) for r in runs if r]
+        return bool(stopped) and all(stopped)
+
+    def _stop_run(self, run):
+        """
+        Terminates the running process tree of every worker of the run, then stops its
+        remote grid sessions concurrently in the background so Stop returns immediately.
+        """
+        processes = [w['process'] for w in run.workers if w['process']]
+        remote = [w['remote'] for w in run.workers if w['remote']]
+        if (processes or remote) and run.is_running:
+            run.cancel_requested = True
+            started = time.perf_counter()
+            try:
+                run.logs.append("\n[INFO] Stopping execution...\n")
+                for process in processes:
+                    if os.name == 'nt': # Windows
+                        # /F = Force, /T = Tree (kill children like behave.exe)
+                        subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)])
+                    else: # Linux/Mac
+                        # Kill the process group
+                        os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+                for job in remote:
+                    if not job.stop():
+                        run.logs.append(f"[WARN] Agent {job.agent} did not confirm stopping {job.job_id}\n")
             except Exception as e:
-                self.full_logs += f"\n[ERROR] Failed to stop: {e}\n"
+                run.logs.append(f"\n[ERROR] Failed to stop: {e}\n")
                 return False
+            kill_seconds = time.perf_counter() - started
+
+            def teardown():
+                # Best-effort attempt to free the cloud sessions the killed processes leave behind
+                try:
+                    run.teardown_reports = teardown_run_sessions(run.lt_session_ids, run.bs_session_ids, run.env, log=run.logs.append)
+                except Exception as e:
+                    run.logs.append(f"[ERROR] Error stopping remote sessions: {e}\n")
+                for report in run.teardown_reports:
+                    run.logs.append(f"[INFO] {report.summary()}\n")
+                self.stop_metrics.append({
+                    "run_id": run.run_id, "kill_seconds": kill_seconds,
+                    "teardown_seconds": sum(r.elapsed for r in run.teardown_reports),
+                    "stopped": sum(r.stopped for r in run.teardown_reports),
+                    "failed": sum(r.failed for r in run.teardown_reports),
+                })
+                run.logs.close()
+
+            threading.Thread(target=teardown, daemon=True).start()
+            return True
         return False
 
-    def get_new_logs(self):
-        new_lines = ""
-        while not self.output_queue.empty():
-            try:
-                new_lines += self.output_queue.get_nowait()
-            except queue.Empty:
-                break
-        return new_lines
+    def subscribe(self, run_id=None, offset=0):
+        """A cursor into a run's output and state, starting at `offset` (see run_stream.Subscription)."""
+        from run_stream import Subscription
+        run = self.get_run(run_id)
+        return Subscription(run, offset) if run else None
@@ -0,0 +1,213 @@
+import re
+
+# --- Tag expressions ---
+# Same grammar behave uses for --tags: "@smoke and not (@slow or @wip)"
+TOKEN_RE = re.compile(r"\s*(\(|\)|[^\s()]+)")
+OPERATORS = ("and", "or", "not")
+
+
+class TagExpressionError(ValueError):
+    pass
+
+
+def _tag_name(tag):
+    # Tags are case-sensitive in behave: @Smoke does not select @smoke
+    return tag.lstrip("@")
+
+
+def _tokenize(text):
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            raise TagExpressionError(f"Unexpected character at {pos}")
+        tokens.append(m.group(1))
+        pos = m.end()
+    return tokens
+
+
+class TagExpression:
+    """A parsed tag expression. Evaluates against a list of tags or against a tag → ids index."""
+
+    def __init__(self, text):
+        self.text = text.strip()
+        self.tokens = _tokenize(self.text)
+        self.pos = 0
+        self.tree = self._parse_or() if self.tokens else None
+        if self.pos < len(self.tokens):
+            raise TagExpressionError(f"Unexpected '{self.tokens[self.pos]}'")
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _parse_or(self):
+        node = self._parse_and()
+        while self._peek() == "or":
+            self.pos += 1
+            node = ("or", node, self._parse_and())
+        return node
+
+    def _parse_and(self):
+        node = self._parse_not()
+        while self._peek() == "and":
+            self.pos += 1
+            node = ("and", node, self._parse_not())
+        return node
+
+    def _parse_not(self):
+        token = self._peek()
+        if token is None:
+            raise TagExpressionError("Expression ends unexpectedly")
+        self.pos += 1
+        if token == "not":
+            return ("not", self._parse_not())
+        if token == "(":
+            node = self._parse_or()
+            if self._peek() != ")":
+                raise TagExpressionError("Missing ')'")
+            self.pos += 1
+            return node
+        if token == ")" or token in OPERATORS:
+            raise TagExpressionError(f"Expected a tag but found '{self.tokens[self.pos - 1]}'")
+        return ("tag", _tag_name(token))
+
+    def __bool__(self):
+        return self.tree is not None
+
+    def tags(self):
+        """Every tag the expression mentions, without the @."""
+        found, stack = set(), [self.tree] if self.tree else []
+        while stack:
+            node = stack.pop()
+            if node[0] == "tag":
+                found.add(node[1])
+            else:
+                stack.extend(node[1:])
+        return found
+
+    def matches(self, tags):
+        """True when a scenario carrying `tags` (with or without @) is selected. An empty expression selects everything."""
+        if self.tree is None:
+            return True
+        names = {_tag_name(t) for t in tags}
+
+        def ev(node):
+            op = node[0]
+            if op == "tag": return node[1] in names
+            if op == "not": return not ev(node[1])
+            if op == "and": return ev(node[1]) and ev(node[2])
+            return ev(node[1]) or ev(node[2])
+        return ev(self.tree)
+
+    def select(self, postings, universe):
+        """Evaluates the expression as set operations over `postings` ({tag: set(ids)})."""
+        if self.tree is None:
+            return set(universe)
+
+        def ev(node):
+            op = node[0]
+            if op == "tag": return postings.get(node[1], set())
+            if op == "not": return universe - ev(node[1])
+            if op == "and": return ev(node[1]) & ev(node[2])
+            return ev(node[1]) | ev(node[2])
+        return ev(self.tree)
+
+
+def parse_tag_expression(text):
+    """Parses `text`; raises TagExpressionError when it is not a valid expression."""
+    return TagExpression(text or "")
+
+
+def tags_to_expression(tags):
+    """The expression selecting scenarios that carry any of `tags` (what the old comma list meant)."""
+    return " or ".join(t if t.startswith("@") else f"@{t}" for t in tags)
+
+
+def combine_expressions(*parts):
+    parts = [p.strip() for p in parts if p and p.strip()]
+    if len(parts) == 1:
+        return parts[0]
+    return " and ".join(f"({p})" for p in parts)
+
+
+# --- Search index ---
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FeatureIndex:
+    """
+    Lookup structures built once per scan:
+      - a trigram index over each feature's searchable text (name, filename, tags, scenario names),
+      - an inverted tag index from tag to the runnable scenarios carrying it.
+    Search candidates come from intersecting trigram postings and are then confirmed with a
+    plain substring check, so results are the same as scanning every feature.
+    """
+
+    def __init__(self, features):
+        self.features = features
+        self.texts = []
+        self.trigrams = {}
+        self.words = {}
+        self.items = []
+        self.tag_postings = {}
+        for fid, feat in enumerate(features):
+            parts = [feat['feature_name'], feat['filename']] + list(feat['tags'])
+            parts += [i['name'] for i in feat.get('items', []) if i['kind'] != "example"]
+            text = "\n".join(parts).lower()
+            self.texts.append(text)
+            for gram in _trigrams(text):
+                self.trigrams.setdefault(gram, set()).add(fid)
+            for word in re.split(r"[\s:/\\._-]+", text):
+                if word:
+                    self.words.setdefault(word, set()).add(fid)
+            for item in feat.get('items', []):
+                if item['kind'] == "outline":
+                    continue
+                iid = len(self.items)
+                self.items.append((fid, item))
+                # Heuristic fallback models only know the file's tags, not each scenario's
+                tags = feat['tags'] if feat.get('error') else set(item['tags']) | set(feat.get('feature_tags', []))
+                for tag in tags:
+                    self.tag_postings.setdefault(_tag_name(tag), set()).add(iid)
+        self.all_items = set(range(len(self.items)))
+
+    def search(self, query):
+        """Returns the features whose name, filename, tags or scenario names contain `query`."""
+        query = (query or "").lower()
+        if not query:
+            return list(self.features)
+        if len(query) >= 3:
+            postings = [self.trigrams.get(g) for g in _trigrams(query)]
+            if not all(postings):
+                return []
+            candidates = set.intersection(*sorted(postings, key=len))
+        elif query.strip() == query and query.isalnum():
+            # Too short for trigrams: scan the (much smaller) word vocabulary instead
+            candidates = set()
+            for word, ids in self.words.items():
+                if query in word:
+                    candidates |= ids
+        else:
+            candidates = range(len(self.features))
+        return [self.features[fid] for fid in sorted(candidates) if query in self.texts[fid]]
+
+    def match_items(self, expression):
+        """Returns [(feature, item)] of every runnable scenario `expression` selects."""
+        if isinstance(expression, str):
+            expression = parse_tag_expression(expression)
+        ids = expression.select(self.tag_postings, self.all_items)
+        return [(self.features[self.items[i][0]], self.items[i][1]) for i in sorted(ids)]
+
+    def filter_features(self, expression):
+        """Copies of the features narrowed to the scenarios `expression` selects; features without any are dropped."""
+        matched = {}
+        for feat, item in self.match_items(expression):
+            matched.setdefault(feat['path'], (feat, []))[1].append(item)
+        return [dict(feat, items=items) for feat, items in matched.values()]
+
+    def count(self, expression):
+        """Returns (scenarios, features) matched by `expression`."""
+        pairs = self.match_items(expression)
+        return len(pairs), len({f['path'] for f, _ in pairs})
@@ -0,0 +1,216 @@
+import os
+import glob
+import json
+import hashlib
+import threading
+import time
+from runner_paths import runner_home
+from gherkin_model import parse_feature_text
+from feature_index import FeatureIndex
+
+# Bump when the parsed feature format changes so stale caches are re-parsed
+CACHE_VERSION = 4
+
+
+def parse_feature_file(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return parse_feature_text(f.read(), file_path)
+    except:
+        return parse_feature_text("", file_path)
+
+
+def find_feature_files(project_path):
+    features_dir = os.path.join(project_path, "features")
+    found = []
+    for root, _, files in os.walk(features_dir):
+        for name in files:
+            if name.endswith(".feature"):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def find_caps_files(project_path):
+    """
+    Caps files anywhere in the project, by file name. Files whose name is shared by another
+    caps file in a different folder are listed by their path relative to the project instead.
+    """
+    c_path = os.path.join(project_path, "**", "*caps*.json")
+    found = glob.glob(c_path, recursive=True)
+    names = [os.path.basename(c) for c in found]
+    return [name if names.count(name) == 1 else os.path.relpath(c, project_path).replace(os.sep, "/")
+            for c, name in zip(found, names)]
+
+
+class FeatureScanCache:
+    """
+    Process-wide cache of parsed feature files, persisted to disk per project.
+    Entries are keyed by path and validated by mtime and size; when those change the
+    content hash decides whether the file really has to be parsed again.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FeatureScanCache, cls).__new__(cls)
+            cls._instance.projects = {}
+            cls._instance.lock = threading.RLock()
+            cls._instance.watchers = {}
+        return cls._instance
+
+    def _cache_file(self, project_path):
+        key = hashlib.sha1(os.path.abspath(project_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(runner_home("scan_cache"), f"{key}.json")
+
+    def _load(self, project_path):
+        project_path = os.path.abspath(project_path)
+        if project_path in self.projects:
+            return self.projects[project_path]
+        entry = None
+        try:
+            with open(self._cache_file(project_path), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get("version") != CACHE_VERSION or entry.get("project") != project_path:
+                entry = None
+        except Exception:
+            entry = None
+        if entry is None:
+            entry = {"version": CACHE_VERSION, "project": project_path, "files": {}, "caps": [], "scanned_at": None}
+        # A cache loaded from disk is usable straight away
+        entry["revision"] = 1 if entry["scanned_at"] else 0
+        entry["result"] = None
+        entry["index"] = None
+        self.projects[project_path] = entry
+        return entry
+
+    def _save(self, entry):
+        data = {k: v for k, v in entry.items() if k not in ("result", "revision", "index")}
+        path = self._cache_file(entry["project"])
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"Scan cache write failed: {e}")
+
+    def _build_result(self, entry):
+        parsed = [entry["files"][p]["data"] for p in sorted(entry["files"])]
+        all_tags = set()
+        for d in parsed: all_tags.update(d['tags'])
+        entry["result"] = (parsed, entry["caps"], sorted(list(all_tags)))
+        entry["index"] = FeatureIndex(parsed)
+        return entry["result"]
+
+    def get(self, project_path):
+        """Returns the cached (features, caps, tags) without touching the disk tree, or (None, None, None)."""
+        if not os.path.isdir(project_path): return None, None, None
+        with self.lock:
+            entry = self._load(project_path)
+            if entry["scanned_at"] is None:
+                return None, None, None
+            return entry["result"] or self._build_result(entry)
+
+    def index(self, project_path):
+        """The FeatureIndex of the last scan (search + tag lookups), or None before the first scan."""
+        with self.lock:
+            entry = self._load(project_path)
+            if entry["scanned_at"] is None:
+                return None
+            if entry["result"] is None:
+                self._build_result(entry)
+            return entry["index"]
+
+    def revision(self, project_path):
+        """Increases every time a scan finds added, changed or deleted feature files."""
+        with self.lock:
+            return self._load(project_path)["revision"]
+
+    def scan(self, project_path):
+        """
+        Incrementally rescans the project. Only new or modified feature files are parsed.
+        Returns (features, caps, tags) like the original full scan.
+        The tree is walked, stat'ed and parsed without holding the lock, which is only taken to
+        read the previous scan and to swap the new one in.
+        """
+        if not os.path.isdir(project_path): return None, None, None
+        project_path = os.path.abspath(project_path)
+        with self.lock:
+            entry = self._load(project_path)
+            previous = dict(entry["files"])
+        files = {}
+        changed = touched = False
+        for path in find_feature_files(project_path):
+            cached = previous.get(path)
+            try:
+                st_ = os.stat(path)
+            except OSError:
+                continue
+            if cached and cached["mtime"] == st_.st_mtime and cached["size"] == st_.st_size:
+                files[path] = cached
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha1(raw).hexdigest()
+            if cached and cached["sha1"] == digest:
+                # Touched but not modified, keep the parsed data
+                files[path] = dict(cached, mtime=st_.st_mtime, size=st_.st_size)
+                touched = True
+            else:
+                data = parse_feature_text(raw.decode('utf-8', errors='replace'), path)
+                files[path] = {"mtime": st_.st_mtime, "size": st_.st_size, "sha1": digest, "data": data}
+                changed = True
+        if any(p not in files for p in previous):
+            changed = True
+        caps = find_caps_files(project_path)
+        with self.lock:
+            entry["files"] = files
+            if caps != entry["caps"]:
+                entry["caps"] = caps
+                changed = True
+            first_scan = entry["scanned_at"] is None
+            entry["scanned_at"] = time.time()
+            if changed or first_scan or entry["result"] is None:
+                entry["revision"] += 1
+                self._build_result(entry)
+            if changed or touched or first_scan:
+                self._save(entry)
+            return entry["result"]
+
+    def start_watching(self, project_path, interval=5.0):
+        """Keeps the cache of `project_path` current by rescanning it in the background."""
+        project_path = os.path.abspath(project_path)
+        with self.lock:
+            if project_path in self.watchers:
+                return False
+            stop_event = threading.Event()
+
+            def watch():
+                while not stop_event.is_set():
+                    try:
+                        self.scan(project_path)
+                    except Exception as e:
+                        print(f"Scan watcher error: {e}")
+                    stop_event.wait(interval)
+
+            thread = threading.Thread(target=watch, daemon=True)
+            self.watchers[project_path] = stop_event
+            thread.start()
+            return True
+
+    def stop_watching(self, project_path):
+        with self.lock:
+            stop_event = self.watchers.pop(os.path.abspath(project_path), None)
+        if stop_event:
+            stop_event.set()
+        return stop_event is not None
+
+    def is_watching(self, project_path):
+        return os.path.abspath(project_path) in self.watchers
+
+
+def scan_project(project_path):
+    return FeatureScanCache().scan(project_path)
@@ -0,0 +1,120 @@
+import os
+
+# Item kinds in the compact model
+SCENARIO = "scenario"
+OUTLINE = "outline"
+EXAMPLE = "example"
+
+# Kinds behave runs as one scenario each
+RUNNABLE_KINDS = (SCENARIO, EXAMPLE)
+
+
+def _tags(tags):
+    return sorted("@" + str(t) for t in tags)
+
+
+def _steps(steps, seen, out):
+    """Adds steps not seen yet to `out`; returns the position in `out` of every step (background included)."""
+    refs = []
+    for step in steps:
+        key = (step.line, step.name)
+        if key not in seen:
+            seen[key] = len(out)
+            out.append([step.step_type, step.keyword, step.name, step.line])
+        refs.append(seen[key])
+    return refs
+
+
+def _scenario_items(scenarios, rule, items, steps, seen):
+    for sc in scenarios:
+        # Outlines carry their template line plus one runnable item per example row
+        expanded = list(getattr(sc, "scenarios", None) or [])
+        if hasattr(sc, "examples"):
+            items.append({"kind": OUTLINE, "name": sc.name, "line": sc.line, "tags": _tags(sc.effective_tags),
+                          "rule": rule, "outline_line": None, "examples": None, "step_refs": []})
+            # Example rows know their line; map them back to the name of their Examples block
+            examples_by_line = {row.line: examples.name for examples in sc.examples
+                                for row in (examples.table.rows if examples.table else [])}
+            for ex in expanded:
+                examples = examples_by_line.get(ex.line)
+                row = getattr(ex, "_row", None)
+                items.append({"kind": EXAMPLE, "name": ex.name, "line": ex.line, "tags": _tags(ex.effective_tags),
+                              "rule": rule, "outline_line": sc.line, "examples": examples,
+                              "params": [[h, c] for h, c in zip(row.headings, row.cells)] if row else None,
+                              "step_refs": _steps(ex.all_steps, seen, steps)})
+        else:
+            items.append({"kind": SCENARIO, "name": sc.name, "line": sc.line, "tags": _tags(sc.effective_tags),
+                          "rule": rule, "outline_line": None, "examples": None,
+                          "step_refs": _steps(sc.all_steps, seen, steps)})
+
+
+def build_model(feature, file_path):
+    """Builds the compact, JSON-serialisable model of a parsed behave Feature."""
+    items, steps, seen = [], [], {}
+    _scenario_items(feature.scenarios, None, items, steps, seen)
+    for rule in getattr(feature, "rules", None) or []:
+        _scenario_items(rule.scenarios, rule.name, items, steps, seen)
+    all_tags = set(_tags(feature.tags))
+    for item in items:
+        all_tags.update(item['tags'])
+    templates = [i for i in items if i['kind'] != EXAMPLE]
+    return {
+        "feature_name": feature.name or os.path.basename(file_path),
+        "gherkin_name": feature.name,
+        "line": feature.line,
+        "feature_tags": _tags(feature.tags),
+        "tags": sorted(all_tags),
+        "scenarios": [i['name'] for i in templates],
+        "scenario_lines": [i['line'] for i in templates],
+        "items": items,
+        "steps": steps,
+        "error": None,
+        "path": file_path,
+        "filename": os.path.basename(file_path),
+    }
+
+
+def parse_heuristic(text, file_path, error=None):
+    """Line based fallback used when behave is missing or the file does not parse."""
+    feature_name = os.path.basename(file_path)
+    items = []; tags = set()
+    for line_no, line in enumerate(text.splitlines(), 1):
+        s = line.strip()
+        if s.startswith("@"):
+            for t in s.split():
+                if t.startswith("@"): tags.add(t)
+        if s.startswith("Feature:"): feature_name = s.replace("Feature:", "").strip()
+        elif s.startswith("Scenario:") or s.startswith("Scenario Outline:"):
+            items.append({"kind": SCENARIO, "name": s.split(":", 1)[1].strip(), "line": line_no, "tags": [],
+                          "rule": None, "outline_line": None, "examples": None, "step_refs": []})
+    return {
+        "feature_name": feature_name, "line": 1, "feature_tags": [], "tags": sorted(tags),
+        "scenarios": [i['name'] for i in items], "scenario_lines": [i['line'] for i in items],
+        "items": items, "steps": [], "error": error,
+        "path": file_path, "filename": os.path.basename(file_path),
+    }
+
+
+def parse_feature_text(text, file_path):
+    """Parses a .feature file with behave's own Gherkin parser into the compact model."""
+    try:
+        from behave.parser import parse_feature
+    except ImportError:
+        return parse_heuristic(text, file_path, "behave is not installed, using line heuristics")
+    try:
+        feature = parse_feature(text, filename=file_path)
+    except Exception as e:
+        return parse_heuristic(text, file_path, f"Parse error: {e}")
+    if feature is None:
+        return parse_heuristic(text, file_path)
+    return build_model(feature, file_path)
+
+
+def runnable_items(feat):
+    """Scenarios and example rows, each of which behave runs as one scenario."""
+    return [i for i in feat.get('items', []) if i['kind'] in RUNNABLE_KINDS]
+
+
+def location(rel_path, item):
+    """The file:line argument that makes behave run just this item."""
+    return f"{rel_path}:{item['line']}"
@@ -0,0 +1,68 @@
+import os
+import time
+import threading
+from allure_store import get_store, STATUSES
+
+# Statuses listed in the "failures so far" panel
+FAILURE_STATUSES = ("failed", "broken")
+
+
+class LiveResults:
+    """
+    Tails allure-results folders while a run is active.
+    New result files are ingested into the AllureStore as they land, and the counters and
+    failure list only cover results that started after `since_ms`.
+    """
+
+    def __init__(self, results_dirs, since_ms=None, interval=2.0):
+        self.results_dirs = list(results_dirs)
+        self.since_ms = since_ms or int(time.time() * 1000)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counts = {"Total": 0, **{s.title(): 0 for s in STATUSES}}
+        self.failures = []
+        self.updated_at = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def stop(self, final_dirs=None):
+        """Stops tailing and takes one last snapshot, e.g. of the merged results folder."""
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.interval * 2)
+        if final_dirs is not None:
+            self.results_dirs = list(final_dirs)
+        self.refresh()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Live results error: {e}")
+
+    def refresh(self):
+        counts = {"Total": 0, **{s.title(): 0 for s in STATUSES}}
+        failures = []
+        for results_dir in self.results_dirs:
+            if not os.path.isdir(results_dir):
+                continue
+            store = get_store(results_dir)
+            store.ingest()
+            for key, value in store.counts(since=self.since_ms).items():
+                counts[key] += value
+            failures.extend(store.list_results(status=FAILURE_STATUSES, since=self.since_ms))
+        failures.sort(key=lambda r: r['start'] or 0)
+        with self.lock:
+            self.counts = counts
+            self.failures = failures
+            self.updated_at = time.time()
+
+    def snapshot(self):
+        """Returns (counts, failures) as of the last refresh."""
+        with self.lock:
+            return dict(self.counts), list(self.failures)
@@ -0,0 +1,111 @@
+import re
+from collections import namedtuple
+
+# Event kinds
+LT_SESSION = "lt_session"
+BS_SESSION = "bs_session"
+SCENARIO_START = "scenario_start"
+SCENARIO_END = "scenario_end"
+STEP_FAILED = "step_failed"
+TRACEBACK = "traceback"
+SUMMARY = "summary"
+
+LogEvent = namedtuple("LogEvent", "kind value line_no")
+
+# Events recognised at the start of a line; tried once per line with match()
+LINE_SCANNER = re.compile(
+    r"\s*Scenario(?: Outline)?:\s*(?P<scenario>.*?)\s*(?:#.*)?$"
+    r"|\s*(?P<step>(?:Given|When|Then|And|But|\*)\s.*?)\s*\.\.\.\s*(?P<step_status>failed|error|undefined)\b"
+    r"|(?P<traceback>Traceback \(most recent call last\):)"
+    r"|(?P<summary>\d+ scenarios? passed, \d+ failed.*?)\s*$"
+)
+
+# Remote session ids can appear anywhere in a line. They are only tried at the positions
+# where str.find() located their literal prefix, instead of at every character.
+ID_SCANNERS = (
+    ("session", re.compile(r"session(?:id:\s*(?P<lt_sid>[a-zA-Z0-9-]+)|_id=(?P<lt_param>[a-zA-Z0-9-]+))", re.IGNORECASE)),
+    ("browserstack.com/", re.compile(r"browserstack\.com/\S*?sessions/(?P<bs_sid>[0-9a-f]{40})", re.IGNORECASE)),
+)
+
+# Maps a matched group to the kind of event it produces
+GROUP_KINDS = {"lt_sid": LT_SESSION, "lt_param": LT_SESSION, "bs_sid": BS_SESSION}
+
+
+class LogEventExtractor:
+    """
+    Turns a stream of output lines into typed events in one pass per line: a single
+    anchored match for line-start events, plus id matches only where their prefix occurs.
+    Feed every line of one process to the same extractor: tracebacks and scenario
+    boundaries span several lines.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.line_no = 0
+        self.scenario = None
+        self.scenario_failed = False
+        self.traceback = None
+
+    def subscribe(self, kind, callback):
+        """Calls `callback(event)` for events of `kind`, or for every event when kind is None."""
+        self.subscribers.setdefault(kind, []).append(callback)
+
+    def _emit(self, kind, value, events):
+        event = LogEvent(kind, value, self.line_no)
+        events.append(event)
+        for cb in self.subscribers.get(kind, ()):
+            cb(event)
+        for cb in self.subscribers.get(None, ()):
+            cb(event)
+
+    def _end_scenario(self, events):
+        if self.scenario is not None:
+            self._emit(SCENARIO_END, (self.scenario, "failed" if self.scenario_failed else "passed"), events)
+            self.scenario = None
+
+    def feed(self, line):
+        """Parses one line and returns the events it produced."""
+        self.line_no += 1
+        events = []
+        if self.traceback is not None:
+            # A traceback ends with the first non-indented line: the exception itself
+            self.traceback.append(line.rstrip("\n"))
+            if line[:1] not in (" ", "\t"):
+                self._emit(TRACEBACK, "\n".join(self.traceback), events)
+                self.traceback = None
+            return events
+        m = LINE_SCANNER.match(line)
+        if m:
+            group = m.lastgroup
+            if group == "scenario":
+                self._end_scenario(events)
+                self.scenario = m.group("scenario")
+                self.scenario_failed = False
+                self._emit(SCENARIO_START, self.scenario, events)
+            elif group == "step_status":
+                self.scenario_failed = True
+                self._emit(STEP_FAILED, (m.group("step"), m.group("step_status")), events)
+            elif group == "traceback":
+                self.scenario_failed = True
+                self.traceback = [m.group("traceback")]
+            elif group == "summary":
+                self._end_scenario(events)
+                self._emit(SUMMARY, m.group("summary"), events)
+        lowered = line.lower()
+        for prefix, scanner in ID_SCANNERS:
+            pos = lowered.find(prefix)
+            while pos >= 0:
+                m = scanner.match(line, pos)
+                if m:
+                    self._emit(GROUP_KINDS[m.lastgroup], m.group(m.lastgroup), events)
+                pos = lowered.find(prefix, m.end() if m else pos + 1)
+        return events
+
+    def close(self):
+        """Flushes state at the end of the stream. Returns the events it produced."""
+        events = []
+        if self.traceback is not None:
+            self._emit(TRACEBACK, "\n".join(self.traceback), events)
+            self.traceback = None
+        self._end_scenario(events)
+        return events
@@ -0,0 +1,147 @@
+import os
+import bisect
+import threading
+from collections import deque
+
+
+class LogStore:
+    """
+    Append-only run log made of fixed-size chunks.
+    Only the newest `max_memory_chars` are kept in memory; everything is also written to
+    `path` (when given) so older output stays readable and downloadable.
+    Offsets are character offsets from the start of the run.
+    """
+
+    def __init__(self, path=None, max_memory_chars=2_000_000, chunk_chars=64 * 1024):
+        self.path = path
+        self.max_memory_chars = max_memory_chars
+        self.chunk_chars = chunk_chars
+        self.lock = threading.Lock()
+        # Readers waiting for new output (see wait) are woken on every append
+        self.changed = threading.Condition(self.lock)
+        self.chunks = deque()        # sealed in-memory chunks: (char offset, text)
+        self.pieces = []             # pieces of the open chunk
+        self.open_start = 0          # char offset of the open chunk
+        self.open_len = 0
+        self.size = 0                # total chars appended
+        self.bytes_size = 0          # total bytes written to the spill file
+        self.mem_start = 0           # char offset of the oldest char still in memory
+        self.index_chars = [0]       # chunk start offsets in chars ...
+        self.index_bytes = [0]       # ... and the matching offsets in the spill file
+        self.file = None
+        # Set by close() once the writer is done; an append after that clears it again
+        self.closed = False
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.file = open(path, 'wb')
+
+    def __len__(self):
+        return self.size
+
+    def append(self, text):
+        if not text:
+            return
+        with self.lock:
+            if self.path:
+                encoded = text.encode('utf-8', errors='replace')
+                if self.file is None:
+                    self.file = open(self.path, 'ab')
+                self.file.write(encoded)
+                self.bytes_size += len(encoded)
+            self.closed = False
+            self.pieces.append(text)
+            self.open_len += len(text)
+            self.size += len(text)
+            if self.open_len >= self.chunk_chars:
+                self._seal()
+            self.changed.notify_all()
+
+    def _seal(self):
+        self.chunks.append((self.open_start, "".join(self.pieces)))
+        self.pieces = []
+        self.open_start = self.size
+        self.open_len = 0
+        self.index_chars.append(self.size)
+        self.index_bytes.append(self.bytes_size)
+        # Drop the oldest chunks once the in-memory tail is over budget
+        while self.chunks and self.size - self.chunks[0][0] > self.max_memory_chars:
+            self.chunks.popleft()
+            self.mem_start = self.chunks[0][0] if self.chunks else self.open_start
+
+    def _read_memory(self, offset, end):
+        parts = []
+        for start, text in self.chunks:
+            if start + len(text) <= offset:
+                continue
+            if start >= end:
+                break
+            parts.append(text[max(offset - start, 0):end - start])
+        if end > self.open_start:
+            open_text = "".join(self.pieces)
+            # Keep the joined piece so repeated reads of the open chunk stay cheap
+            self.pieces = [open_text] if open_text else []
+            parts.append(open_text[max(offset - self.open_start, 0):end - self.open_start])
+        return "".join(parts)
+
+    def _file_span(self, offset, end):
+        """Where spilled chars [offset, end) are on disk: (byte_start, byte_end, chars to skip, chars to keep)."""
+        if self.file:
+            self.file.flush()
+        first = bisect.bisect_right(self.index_chars, offset) - 1
+        last = bisect.bisect_left(self.index_chars, end)
+        byte_end = self.index_bytes[last] if last < len(self.index_bytes) else self.bytes_size
+        return self.index_bytes[first], byte_end, offset - self.index_chars[first], end - offset
+
+    def _read_file(self, span):
+        # The spill file is append-only, so this runs outside the lock and a reader far behind
+        # never holds up the writer or other readers while it goes to disk
+        byte_start, byte_end, skip, count = span
+        with open(self.path, 'rb') as f:
+            f.seek(byte_start)
+            text = f.read(byte_end - byte_start).decode('utf-8', errors='replace')
+        return text[skip:skip + count]
+
+    def read(self, offset=0, max_chars=None):
+        """
+        Returns (text, next_offset) for everything appended since `offset`.
+        Without a spill file, output that already left memory is skipped.
+        """
+        with self.lock:
+            end = self.size if max_chars is None else min(self.size, offset + max_chars)
+            if offset >= end:
+                return "", offset
+            if offset >= self.mem_start:
+                return self._read_memory(offset, end), end
+            if not self.path:
+                offset = self.mem_start
+                end = self.size if max_chars is None else min(self.size, offset + max_chars)
+                return self._read_memory(offset, end), end
+            split = min(end, self.mem_start)
+            span = self._file_span(offset, split)
+            recent = self._read_memory(split, end) if end > split else ""
+        return self._read_file(span) + recent, end
+
+    def wait(self, offset, timeout=None):
+        """Blocks until there is output past `offset`, the log is closed, or `timeout` seconds pass. Returns the current size."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.size > offset or self.closed, timeout)
+            return self.size
+
+    def tail(self, max_chars):
+        """Returns (text, next_offset) for the last `max_chars` chars."""
+        with self.lock:
+            size = self.size
+        return self.read(max(size - max_chars, 0))
+
+    def getvalue(self):
+        """Full history of the run."""
+        return self.read(0)[0]
+
+    def close(self):
+        """Closes the spill file and wakes waiting readers; the log stays readable and later appends reopen it."""
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+            self.closed = True
+            self.changed.notify_all()
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import quote, urlparse
+
+from runner_agent import TOKEN_HEADER, HEARTBEAT_SECONDS
+
+# Agents to use without them registering themselves: comma-separated base URLs
+STATIC_AGENTS = [u.strip().rstrip("/") for u in os.environ.get("BEHAVE_RUNNER_AGENTS", "").split(",") if u.strip()]
+AGENT_TOKEN = os.environ.get("BEHAVE_RUNNER_AGENT_TOKEN")
+# An agent not heard from for this long gets no new work
+STALE_SECONDS = 3 * HEARTBEAT_SECONDS
+# Long-poll length for a remote worker's log, and how often its result files are copied back
+LOG_WAIT_SECONDS = 5.0
+RESULTS_SYNC_SECONDS = float(os.environ.get("BEHAVE_RUNNER_AGENT_SYNC_SECONDS", "2"))
+# A running job whose agent cannot be reached for this long is given up as an error
+UNREACHABLE_SECONDS = float(os.environ.get("BEHAVE_RUNNER_AGENT_UNREACHABLE", "30"))
+
+
+class AgentUnavailable(Exception):
+    """The agent is unreachable, or has no free slot for a new job."""
+
+
+def _request(url, method="GET", data=None, timeout=10, raw=False):
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    req = urllib.request.Request(url, data=body, method=method,
+                                 headers={"Content-Type": "application/json", TOKEN_HEADER: AGENT_TOKEN or ""})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        payload = resp.read()
+    return payload if raw else json.loads(payload or b"null")
+
+
+def agent_url(url):
+    """An agent's base URL without the trailing slash; only http(s) URLs are accepted."""
+    url = (url or "").strip().rstrip("/")
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        raise ValueError(f"Not an http(s) agent URL: {url!r}")
+    return url
+
+
+class AgentRegistry:
+    """
+    Process-wide list of runner agents and their capacity. Agents register themselves through
+    the API (POST /agents, repeated as a heartbeat); agents from BEHAVE_RUNNER_AGENTS or added in
+    the UI are polled on /health instead.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AgentRegistry, cls).__new__(cls)
+            cls._instance.lock = threading.Lock()
+            cls._instance.agents = {}
+            cls._instance.poller = None
+            # Called with no arguments when an agent comes up or its capacity changes
+            cls._instance.listeners = []
+            for url in STATIC_AGENTS:
+                try:
+                    # First polled by the agent-poller thread, so creating the registry never waits on an agent
+                    cls._instance.add(url, poll_now=False)
+                except ValueError as e:
+                    # Listed with its error, like an agent that cannot be reached
+                    cls._instance.agents[url] = {"url": url, "name": url, "capacity": 0, "busy": 0, "project": None,
+                                                 "last_seen": None, "error": f"BEHAVE_RUNNER_AGENTS: {e}", "polled": False}
+        return cls._instance
+
+    def register(self, info):
+        """Heartbeat from an agent: { 'url', 'name', 'capacity', 'busy', 'project' }"""
+        url = agent_url(info['url'])
+        now = time.time()
+        with self.lock:
+            agent = self.agents.setdefault(url, {"url": url, "polled": False, "capacity": 0, "last_seen": None})
+            changed = not agent['last_seen'] or now - agent['last_seen'] >= STALE_SECONDS \
+                or agent['capacity'] != int(info.get('capacity') or 0)
+            agent.update(name=info.get('name') or url, capacity=int(info.get('capacity') or 0), busy=info.get('busy', 0),
+                         project=info.get('project'), last_seen=now, error=None)
+            agent = dict(agent)
+        if changed:
+            for listener in self.listeners:
+                listener()
+        return agent
+
+    def add(self, url, poll_now=True):
+        """Uses an agent that does not register itself; it is polled every heartbeat, and right away with `poll_now`."""
+        url = agent_url(url)
+        with self.lock:
+            self.agents.setdefault(url, {"url": url, "name": url, "capacity": 0, "busy": 0, "project": None,
+                                         "last_seen": None, "error": None})["polled"] = True
+        if poll_now:
+            self._poll(url)
+        with self.lock:
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._poll_loop, daemon=True, name="agent-poller")
+                self.poller.start()
+
+    def remove(self, url):
+        with self.lock:
+            return self.agents.pop(url.rstrip("/"), None) is not None
+
+    def _poll(self, url):
+        try:
+            info = _request(f"{url}/health", timeout=5)
+        except (OSError, ValueError) as e:
+            with self.lock:
+                if url in self.agents:
+                    self.agents[url]['error'] = str(e)
+            return
+        self.register(dict(info, url=url))
+
+    def _poll_loop(self):
+        while True:
+            with self.lock:
+                polled = [u for u, a in self.agents.items() if a.get('polled')]
+            for url in polled:
+                self._poll(url)
+            time.sleep(HEARTBEAT_SECONDS)
+
+    def list_agents(self):
+        now = time.time()
+        with self.lock:
+            return [dict(a, alive=bool(a.get('last_seen')) and now - a['last_seen'] < STALE_SECONDS)
+                    for a in self.agents.values()]
+
+    def available(self):
+        """Agents heard from recently, with their capacity."""
+        return [a for a in self.list_agents() if a['alive'] and a['capacity'] > 0]
+
+    def mark_unreachable(self, url, error):
+        with self.lock:
+            if url in self.agents:
+                self.agents[url].update(last_seen=None, error=str(error))
+
+
+class RemoteJob:
+    """A behave worker running on an agent, as seen from the runner."""
+
+    def __init__(self, agent_url, job_id):
+        self.agent = agent_url
+        self.job_id = job_id
+        self.url = f"{agent_url}/jobs/{quote(job_id)}"
+        self.synced = {}
+
+    def start(self, job, env):
+        """Starts the job on the agent: `job` is a behave_job() selection plus 'events' (add the event formatter)."""
+        try:
+            _request(f"{self.agent}/jobs", "POST", {"job_id": self.job_id, "job": job, "env": env})
+        except urllib.error.HTTPError as e:
+            if e.code == 409:
+                raise AgentUnavailable(f"{self.agent} has no free slot")
+            raise
+        except OSError as e:
+            AgentRegistry().mark_unreachable(self.agent, e)
+            raise AgentUnavailable(f"{self.agent} is unreachable: {e}")
+
+    def _retrying(self, call):
+        """Retries a call while the agent is unreachable, for up to UNREACHABLE_SECONDS."""
+        deadline = time.time() + UNREACHABLE_SECONDS
+        while True:
+            try:
+                return call()
+            except urllib.error.HTTPError:
+                raise
+            except OSError as e:
+                if time.time() >= deadline:
+                    AgentRegistry().mark_unreachable(self.agent, e)
+                    raise AgentUnavailable(f"Lost agent {self.agent}: {e}")
+                time.sleep(1.0)
+
+    def log(self, offset, wait=LOG_WAIT_SECONDS):
+        """Returns the job's { 'text', 'offset', 'status', 'returncode' } past `offset`, long-polling up to `wait` seconds."""
+        return self._retrying(lambda: _request(f"{self.url}/log?offset={offset}&wait={wait}", timeout=wait + 10))
+
+    def sync_results(self, target_dir):
+        """Copies new or changed result files into `target_dir`. Returns how many were copied."""
+        os.makedirs(target_dir, exist_ok=True)
+        copied = 0
+        for f in self._retrying(lambda: _request(f"{self.url}/results")):
+            # The name comes from the agent: never let it point outside the target folder
+            name = f.get('name')
+            if not isinstance(name, str) or not name or name.startswith(".") or os.path.basename(name) != name or "\\" in name:
+                raise ValueError(f"Agent {self.agent} sent an unsafe result file name: {name!r}")
+            key = (f['size'], f['mtime'])
+            if self.synced.get(name) == key:
+                continue
+            data = self._retrying(lambda: _request(f"{self.url}/files/{quote(name)}", raw=True, timeout=60))
+            # Written aside and renamed, so live results never read a half-copied file
+            tmp = os.path.join(target_dir, f".{name}.part")
+            with open(tmp, 'wb') as out:
+                out.write(data)
+            os.replace(tmp, os.path.join(target_dir, name))
+            self.synced[name] = key
+            copied += 1
+        return copied
+
+    def stop(self):
+        try:
+            return _request(self.url, "DELETE", timeout=5).get("stopped", False)
+        except (OSError, ValueError):
+            return False
+
+    def purge(self):
+        try:
+            _request(f"{self.url}?purge=1", "DELETE", timeout=5)
+        except (OSError, ValueError):
+            pass
@@ -0,0 +1,102 @@
+import os
+import re
+import hashlib
+from allure_store import get_store
+from gherkin_model import runnable_items, location
+
+FAILED_STATUSES = ("failed", "broken")
+# Files behave's rerun formatter is usually pointed at (-f rerun -o <file>)
+RERUN_FILES = ("rerun.txt", "rerun_failing.features", "rerun.features")
+LOCATION_RE = re.compile(r"(\S+\.feature):(\d+)")
+
+
+def history_id(feat, item):
+    """The historyId allure-behave gives this scenario: md5 of feature name, scenario name and example row."""
+    m = hashlib.md5()
+    parts = [feat.get('gherkin_name', feat['feature_name']), item['name']]
+    parts += [f"{name}={value}" for name, value in item.get('params') or []]
+    for part in parts:
+        m.update(part.encode("utf-8"))
+    return m.hexdigest()
+
+
+def failed_results(results_dir, since=None):
+    """Latest result per scenario in `results_dir` that failed or broke. `since` is epoch ms."""
+    if not os.path.isdir(results_dir):
+        return []
+    store = get_store(results_dir)
+    store.ingest()
+    return [r for r in store.latest_results(since=since) if r['status'] in FAILED_STATUSES]
+
+
+def read_rerun_file(project_path, since=None):
+    """
+    Locations listed by behave's rerun formatter, or None when no rerun file exists.
+    A file last written before `since` (epoch ms) belongs to an older run and is ignored.
+    """
+    for name in RERUN_FILES:
+        path = os.path.join(project_path, name)
+        if os.path.isfile(path):
+            if since and os.path.getmtime(path) * 1000 < since:
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                return [f"{m.group(1)}:{m.group(2)}" for m in LOCATION_RE.finditer(f.read())]
+    return None
+
+
+def newest_result_start(results_dir):
+    """Start (epoch ms) of the newest result in `results_dir`, or None."""
+    if not os.path.isdir(results_dir):
+        return None
+    store = get_store(results_dir)
+    store.ingest()
+    rows = store.list_results(limit=1)
+    return rows[0]['start'] if rows else None
+
+
+def failed_locations(project_path, features, results_dir, since=None):
+    """
+    Maps the failed / broken scenarios of the latest results back to file:line locations,
+    adding anything behave's rerun file lists (allure-behave does not report every scenario).
+    A rerun file older than `since` or than the newest result is left out: it is from an earlier run.
+    Returns (locations, unmatched results, source).
+    """
+    failed = failed_results(results_dir, since)
+    cutoff = max(since or 0, newest_result_start(results_dir) or 0)
+    rerun = read_rerun_file(project_path, cutoff or None) or []
+    if not failed:
+        return rerun, [], "rerun file" if rerun else None
+    by_history, by_name = {}, {}
+    for feat in features:
+        rel = os.path.relpath(feat['path'], project_path)
+        for item in runnable_items(feat):
+            loc = location(rel, item)
+            by_history[history_id(feat, item)] = loc
+            by_name.setdefault((feat['feature_name'], item['name']), loc)
+    locations, unmatched = [], []
+    for r in failed:
+        loc = by_history.get(r['history_id']) or by_name.get((r['feature'], r['name']))
+        if loc:
+            if loc not in locations:
+                locations.append(loc)
+        else:
+            unmatched.append(r)
+    known = {loc.replace(os.sep, "/") for loc in locations}
+    extra = [loc for loc in rerun if loc.replace(os.sep, "/") not in known]
+    return locations + extra, unmatched, "allure results + rerun file" if extra else "allure results"
+
+
+def failed_first(paths, failed):
+    """Orders feature paths / locations so the ones that failed last time come first (stable otherwise)."""
+    failed = set(failed)
+    failing_files = {}
+    for loc in failed:
+        file_part = loc.rsplit(":", 1)[0]
+        failing_files[file_part] = failing_files.get(file_part, 0) + 1
+
+    def key(path):
+        if path in failed:
+            return (0, 0)
+        hits = failing_files.get(path, 0)
+        return (1, -hits) if hits else (2, 0)
+    return sorted(paths, key=key)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from runner_paths import runner_home
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Seconds between samples; 0 turns the sampler off
+SAMPLE_INTERVAL = float(os.environ.get("BEHAVE_RUNNER_SAMPLE_INTERVAL", "2"))
+# Samples kept in memory for the footer timeline (every sample is also written to disk)
+MAX_SAMPLES = 900
+# Warn when the process tree of a run goes over these (cpu_percent is % of one core, summed over the tree)
+THRESHOLDS = {
+    "cpu_percent": float(os.environ.get("BEHAVE_RUNNER_WARN_CPU", str(90 * (os.cpu_count() or 1)))),
+    "rss_mb": float(os.environ.get("BEHAVE_RUNNER_WARN_RSS_MB", "4096")),
+    "processes": int(os.environ.get("BEHAVE_RUNNER_WARN_PROCESSES", "64")),
+    "fds": int(os.environ.get("BEHAVE_RUNNER_WARN_FDS", "4096")),
+    # RSS growth since the first sample, the usual sign of a leak
+    "rss_growth_mb": float(os.environ.get("BEHAVE_RUNNER_WARN_RSS_GROWTH_MB", "1024")),
+}
+
+
+def _fds(proc):
+    try:
+        return proc.num_fds() if hasattr(proc, "num_fds") else proc.num_handles()
+    except (psutil.Error, OSError):
+        return 0
+
+
+class ResourceSampler:
+    """
+    Samples the process trees of a run's workers in a background thread: CPU, RSS, threads,
+    open files (fds, or handles on Windows) and process count, in total and per process name
+    (behave, appium, chromedriver, ...). psutil.Process objects are kept between samples so
+    cpu_percent is a cheap delta, and each sample records its own cost in `overhead_ms`.
+    """
+
+    def __init__(self, run_id, get_processes, interval=None, log=None, path=None):
+        self.run_id = run_id
+        self.get_processes = get_processes
+        self.interval = SAMPLE_INTERVAL if interval is None else interval
+        self.log = log
+        self.path = path or os.path.join(runner_home("resources"), f"run-{run_id}.jsonl")
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.warnings = []
+        self.active_warnings = set()
+        self.peaks = {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": 0, "fds": 0, "processes": 0}
+        self.procs = {}
+        self.first_rss = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def enabled(self):
+        return psutil is not None and self.interval > 0
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.thread = threading.Thread(target=self._loop, daemon=True, name=f"sampler-{self.run_id}")
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=self.interval * 2)
+
+    def _loop(self):
+        with open(self.path, 'a', encoding='utf-8') as out:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    sample = self.sample()
+                except Exception as e:
+                    print(f"Resource sampler error: {e}")
+                    continue
+                if sample is not None:
+                    out.write(json.dumps(sample) + "\n")
+                    out.flush()
+
+    def _tree(self):
+        """Root processes of the workers plus all their descendants, reusing known Process objects."""
+        seen = {}
+        for popen in self.get_processes():
+            try:
+                root = self.procs.get(popen.pid) or psutil.Process(popen.pid)
+                seen[root.pid] = root
+                for child in root.children(recursive=True):
+                    seen[child.pid] = self.procs.get(child.pid) or child
+            except psutil.Error:
+                continue
+        self.procs = seen
+        return list(seen.values())
+
+    def sample(self):
+        """Takes one sample now. Returns it as a dict, or None when no worker process is alive."""
+        started = time.perf_counter()
+        procs = self._tree()
+        if not procs:
+            return None
+        totals = {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": 0, "fds": 0, "processes": 0}
+        by_name = {}
+        for proc in procs:
+            try:
+                with proc.oneshot():
+                    name = proc.name()
+                    cpu = proc.cpu_percent(None)
+                    rss = proc.memory_info().rss / 1048576
+                    threads = proc.num_threads()
+                    fds = _fds(proc)
+            except psutil.Error:
+                continue
+            totals["cpu_percent"] += cpu
+            totals["rss_mb"] += rss
+            totals["threads"] += threads
+            totals["fds"] += fds
+            totals["processes"] += 1
+            group = by_name.setdefault(name, {"cpu_percent": 0.0, "rss_mb": 0.0, "count": 0})
+            group["cpu_percent"] += cpu
+            group["rss_mb"] += rss
+            group["count"] += 1
+        if self.first_rss is None:
+            self.first_rss = totals["rss_mb"]
+        sample = {"t": round(time.time(), 2), **{k: round(v, 1) for k, v in totals.items()},
+                  "top": {n: {k: round(v, 1) for k, v in g.items()} for n, g in
+                          sorted(by_name.items(), key=lambda kv: kv[1]["cpu_percent"], reverse=True)[:5]},
+                  "overhead_ms": round((time.perf_counter() - started) * 1000, 2)}
+        with self.lock:
+            self.samples.append(sample)
+            for key in self.peaks:
+                self.peaks[key] = max(self.peaks[key], sample[key])
+        self._check(sample)
+        return sample
+
+    def _check(self, sample):
+        """Logs a warning when a threshold is crossed, and a note when it is back under it."""
+        values = dict(sample, rss_growth_mb=round(sample["rss_mb"] - (self.first_rss or 0), 1))
+        for key, limit in THRESHOLDS.items():
+            over = limit and values[key] > limit
+            if over and key not in self.active_warnings:
+                self.active_warnings.add(key)
+                top = ", ".join(f"{n} {g['cpu_percent']:.0f}%/{g['rss_mb']:.0f}MB" for n, g in sample["top"].items())
+                warning = {"t": sample["t"], "metric": key, "value": values[key], "limit": limit, "top": top}
+                with self.lock:
+                    self.warnings.append(warning)
+                if self.log:
+                    self.log(f"[WARN] Resources: {key} {values[key]:g} over {limit:g} ({top})\n")
+            elif not over and key in self.active_warnings:
+                self.active_warnings.discard(key)
+                if self.log:
+                    self.log(f"[INFO] Resources: {key} back under {limit:g}\n")
+
+    def snapshot(self):
+        """Returns (samples, warnings, peaks) for the UI."""
+        with self.lock:
+            return list(self.samples), list(self.warnings), dict(self.peaks)
+
+    def summary(self):
+        samples, warnings, peaks = self.snapshot()
+        overhead = [s["overhead_ms"] for s in samples]
+        return {"samples": len(samples), "peaks": peaks, "warnings": warnings, "path": self.path,
+                "avg_overhead_ms": round(sum(overhead) / len(overhead), 2) if overhead else None}
+
+
+def load_samples(path):
+    """Reads a run's samples back from disk."""
+    samples = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    samples.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return samples
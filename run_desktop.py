@@ -1,7 +1,10 @@
 import os
 import sys
+import startup_profile                      # set BEHAVE_RUNNER_PROFILE_STARTUP=1 to time the imports below
+startup_profile.install()
 import streamlit as st                      # important
 import streamlit.web.cli as stcli
+startup_profile.mark("streamlit imported")
 
 def resolve_path(path):
     if getattr(sys, "frozen", False):
@@ -0,0 +1,146 @@
+import json
+import time
+import socket
+import threading
+from collections import deque
+
+# Recent structured events kept per run, and step timings kept for the slowest-steps view
+MAX_EVENTS = 2000
+MAX_STEP_NAMES = 500
+
+
+class EventChannel:
+    """
+    Local TCP listener receiving the JSON-lines events that runner_formatter sends from each
+    behave worker. A connection is accepted only if its first event carries the run's token.
+    Every connection is read by its own thread, independently of the workers' stdout, so a
+    flood of log output never delays the events.
+    """
+
+    def __init__(self, token, on_event, host="127.0.0.1"):
+        self.token = token
+        self.on_event = on_event
+        self.server = socket.create_server((host, 0))
+        self.closed = False
+        self.threads = []
+
+    @property
+    def address(self):
+        host, port = self.server.getsockname()[:2]
+        return f"{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True, name="run-events").start()
+        return self
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            t = threading.Thread(target=self._read, args=(conn,), daemon=True)
+            self.threads.append(t)
+            t.start()
+
+    def _read(self, conn):
+        with conn, conn.makefile('rb') as stream:
+            first = True
+            for raw in stream:
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    continue
+                if first:
+                    if event.get("event") != "session_start" or event.get("token") != self.token:
+                        return
+                    first = False
+                try:
+                    self.on_event(event)
+                except Exception as e:
+                    print(f"Run event handler error: {e}")
+
+    def close(self, timeout=2.0):
+        """Stops accepting and waits briefly for connected workers to finish sending."""
+        self.closed = True
+        try:
+            self.server.close()
+        except OSError:
+            pass
+        deadline = time.time() + timeout
+        for t in self.threads:
+            t.join(timeout=max(0.0, deadline - time.time()))
+
+
+class RunProgress:
+    """
+    Exact progress of a run built from formatter events: finished scenarios per worker and status,
+    what each worker is running right now, and per-step timings.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.workers = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.steps = {}
+        self.hook_failures = []
+        self.latency = deque(maxlen=200)
+
+    def _worker(self, worker_id):
+        return self.workers.setdefault(str(worker_id), {"done": 0, "scenario": None, "step": None, "pid": None,
+                                                        "finished": False, "last_event": None})
+
+    def handle(self, event):
+        kind = event.get("event")
+        now = time.time()
+        with self.lock:
+            self.events.append(event)
+            if event.get("t"):
+                self.latency.append(now - event["t"])
+            w = self._worker(event.get("worker"))
+            w["last_event"] = now
+            if kind == "session_start":
+                w["pid"] = event.get("pid")
+            elif kind == "scenario_start":
+                if event.get("selected", True):
+                    w["scenario"] = event.get("name")
+                w["step"] = None
+            elif kind == "step_start":
+                w["step"] = event.get("name")
+            elif kind == "step_end":
+                w["step"] = None
+                if event.get("duration") is not None:
+                    stats = self.steps.get(event["name"])
+                    if stats is None and len(self.steps) < MAX_STEP_NAMES:
+                        stats = self.steps[event["name"]] = {"count": 0, "total": 0.0, "max": 0.0, "failed": 0}
+                    if stats is not None:
+                        stats["count"] += 1
+                        stats["total"] += event["duration"]
+                        stats["max"] = max(stats["max"], event["duration"])
+                        stats["failed"] += event.get("status") in ("failed", "error")
+            elif kind == "scenario_end":
+                if not event.get("selected", True):
+                    return
+                w["done"] += 1
+                w["scenario"] = None
+                status = event.get("status") or "unknown"
+                self.counts[status] = self.counts.get(status, 0) + 1
+            elif kind == "hook_failed":
+                self.hook_failures.append(event)
+            elif kind == "session_end":
+                w["finished"] = True
+
+    def done(self, worker_id):
+        """Scenarios a worker has finished, or None if it never sent an event."""
+        with self.lock:
+            w = self.workers.get(str(worker_id))
+            return w["done"] if w else None
+
+    def snapshot(self):
+        with self.lock:
+            slowest = sorted(self.steps.items(), key=lambda kv: kv[1]["max"], reverse=True)[:10]
+            return {"counts": dict(self.counts), "workers": {k: dict(v) for k, v in self.workers.items()},
+                    "slowest_steps": [dict(s, name=n, avg=s["total"] / s["count"]) for n, s in slowest],
+                    "hook_failures": list(self.hook_failures),
+                    "latency_ms": round(1000 * sum(self.latency) / len(self.latency), 1) if self.latency else None}
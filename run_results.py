@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+# Every run writes to <project>/allure-runs/<run id>; run ids start with a timestamp so names sort by age
+RUNS_ROOT = "allure-runs"
+LEGACY_RESULTS = "allure-results"
+MANIFEST = "run.json"
+# Content-addressed attachment store shared by the runs of a project (hard links into it)
+BLOBS = ".blobs"
+PER_RUN_RESULTS = os.environ.get("BEHAVE_RUNNER_PER_RUN_RESULTS", "1").lower() not in ("0", "false", "no")
+
+_lock = threading.Lock()
+
+
+class RetentionPolicy:
+    """
+    Limits applied after every run (environment overrides in brackets):
+    keep at most `keep_runs` runs [BEHAVE_RUNNER_KEEP_RUNS], none older than `max_age_days`
+    [BEHAVE_RUNNER_MAX_RUN_AGE_DAYS], at most `max_total_mb` on disk [BEHAVE_RUNNER_MAX_RESULTS_MB],
+    and drop the attachments of every run but the newest `compact_after` [BEHAVE_RUNNER_COMPACT_AFTER].
+    A limit of 0 is off; compaction deletes attachments, so it is off unless asked for.
+    """
+
+    def __init__(self, keep_runs=None, max_age_days=None, max_total_mb=None, compact_after=None):
+        env = os.environ.get
+        self.keep_runs = int(keep_runs if keep_runs is not None else env("BEHAVE_RUNNER_KEEP_RUNS", "30"))
+        self.max_age_days = float(max_age_days if max_age_days is not None else env("BEHAVE_RUNNER_MAX_RUN_AGE_DAYS", "30"))
+        self.max_total_mb = float(max_total_mb if max_total_mb is not None else env("BEHAVE_RUNNER_MAX_RESULTS_MB", "2048"))
+        self.compact_after = int(compact_after if compact_after is not None else env("BEHAVE_RUNNER_COMPACT_AFTER", "0"))
+
+
+def run_results_dir(run_id):
+    """Results folder of a run, relative to the project."""
+    return os.path.join(RUNS_ROOT, run_id)
+
+
+def is_attachment(name):
+    return not name.endswith((".json", ".properties")) and name != MANIFEST
+
+
+def _walk_files(folder):
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            yield os.path.join(root, name)
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def dedupe_attachments(run_dir, blobs_dir):
+    """
+    Replaces every attachment of a run with a hard link to a content-addressed copy in `blobs_dir`,
+    so identical screenshots and videos are stored once across runs. Attachment names stay the same,
+    so the folder is still a normal allure-results folder. Returns the bytes saved.
+    Falls back to leaving files alone where hard links are not supported.
+    """
+    saved = 0
+    for path in _walk_files(run_dir):
+        name = os.path.basename(path)
+        if not is_attachment(name):
+            continue
+        st_ = os.stat(path)
+        if st_.st_nlink > 1:
+            continue  # already linked
+        digest = _sha1(path)
+        blob = os.path.join(blobs_dir, digest[:2], digest + os.path.splitext(name)[1])
+        try:
+            if os.path.exists(blob):
+                tmp = path + ".dedupe"
+                os.link(blob, tmp)
+                os.replace(tmp, path)
+                saved += st_.st_size
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.link(path, blob)
+        except OSError:
+            continue
+    return saved
+
+
+def prune_blobs(blobs_dir):
+    """Removes blobs no run links to any more. Returns the bytes freed."""
+    freed = 0
+    if not os.path.isdir(blobs_dir):
+        return 0
+    for path in list(_walk_files(blobs_dir)):
+        st_ = os.stat(path)
+        if st_.st_nlink <= 1:
+            os.remove(path)
+            freed += st_.st_size
+    return freed
+
+
+def _strip_attachments(node):
+    node.pop("attachments", None)
+    for step in node.get("steps", []):
+        _strip_attachments(step)
+
+
+def compact_run(run_dir):
+    """
+    Drops the attachments of a run but keeps its results (statuses, steps, durations), so history,
+    reruns and duration-based sharding keep working. Returns the bytes freed.
+    """
+    freed = 0
+    for path in list(_walk_files(run_dir)):
+        name = os.path.basename(path)
+        if is_attachment(name):
+            st_ = os.stat(path)
+            os.remove(path)
+            # Linked only from here and the blob store: the blob goes with the next prune_blobs
+            if st_.st_nlink <= 2:
+                freed += st_.st_size
+        elif name.endswith(("-result.json", "-container.json")):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                _strip_attachments(data)
+                for fixture in data.get("befores", []) + data.get("afters", []):
+                    _strip_attachments(fixture)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+            except (OSError, ValueError):
+                continue
+    update_manifest(run_dir, compacted=True)
+    return freed
+
+
+def read_manifest(run_dir):
+    try:
+        with open(os.path.join(run_dir, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_manifest(run_dir, **values):
+    manifest = read_manifest(run_dir)
+    manifest.update(values)
+    with open(os.path.join(run_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def run_disk_usage(run_dir):
+    """Returns a dict: { 'results', 'bytes', 'attachment_bytes', 'shared_bytes' } (shared = hard-linked attachments)."""
+    usage = {"results": 0, "bytes": 0, "attachment_bytes": 0, "shared_bytes": 0}
+    for path in _walk_files(run_dir):
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            continue
+        name = os.path.basename(path)
+        usage["bytes"] += st_.st_size
+        if name.endswith("-result.json"):
+            usage["results"] += 1
+        elif is_attachment(name):
+            usage["attachment_bytes"] += st_.st_size
+            if st_.st_nlink > 2:  # the blob plus more than this run
+                usage["shared_bytes"] += st_.st_size
+    return usage
+
+
+def _created_at(run_id, run_dir):
+    try:
+        return time.mktime(time.strptime(run_id[:15], "%Y%m%d-%H%M%S"))
+    except ValueError:
+        return os.path.getmtime(run_dir)
+
+
+def list_runs(project_path):
+    """
+    Result folders of a project's runs, newest first:
+    [{ 'run_id', 'path', 'created_at', 'label', 'status', 'compacted', 'results', 'bytes', ... }]
+    """
+    root = os.path.join(project_path, RUNS_ROOT)
+    if not os.path.isdir(root):
+        return []
+    runs = []
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        manifest = read_manifest(path)
+        run = {"label": None, "status": None, "compacted": False, "created_at": None}
+        run.update(manifest)
+        run.update(run_id=name, path=path, created_at=run['created_at'] or _created_at(name, path))
+        runs.append(run)
+    return sorted(runs, key=lambda r: (r['created_at'], r['run_id']), reverse=True)
+
+
+def latest_results_dir(project_path):
+    """Newest run folder with results, or the legacy shared allure-results folder."""
+    for run in list_runs(project_path):
+        if run.get("results") or any(n.endswith("-result.json") for n in os.listdir(run['path'])):
+            return run['path']
+    return os.path.join(project_path, LEGACY_RESULTS)
+
+
+def results_dirs(project_path):
+    """Every results folder of a project for pickers: [(label, path)], newest run first, legacy folder last."""
+    choices = []
+    for run in list_runs(project_path):
+        label = f"{run['run_id']}" + (f" · {run['label']}" if run.get('label') and run['label'] != run['run_id'] else "")
+        choices.append((label + (" · compacted" if run.get('compacted') else ""), run['path']))
+    legacy = os.path.join(project_path, LEGACY_RESULTS)
+    if os.path.isdir(legacy):
+        choices.append((f"{LEGACY_RESULTS} (shared)", legacy))
+    return choices
+
+
+def finalize_run(project_path, run_dir, **manifest):
+    """Dedupes the attachments of a finished run and records its manifest with its disk usage."""
+    if not os.path.isdir(run_dir):
+        return None
+    with _lock:
+        saved = dedupe_attachments(run_dir, os.path.join(project_path, RUNS_ROOT, BLOBS))
+    return update_manifest(run_dir, deduped_bytes=saved, **manifest, **run_disk_usage(run_dir))
+
+
+def _remove_run(run):
+    from allure_store import drop_store
+    shutil.rmtree(run['path'], ignore_errors=True)
+    drop_store(run['path'])
+
+
+def apply_retention(project_path, policy=None, active=()):
+    """
+    Deletes and compacts old runs of a project according to `policy`. Runs whose folders are in
+    `active` are never touched. Returns a list of actions: [{ 'run_id', 'action', 'reason', 'bytes' }]
+    """
+    policy = policy or RetentionPolicy()
+    active = {os.path.abspath(p) for p in active}
+    actions = []
+    with _lock:
+        runs = [r for r in list_runs(project_path) if os.path.abspath(r['path']) not in active]
+        now = time.time()
+        kept = []
+        for i, run in enumerate(runs):
+            size = run.get('bytes') or run_disk_usage(run['path'])['bytes']
+            reason = None
+            if policy.keep_runs and i >= policy.keep_runs:
+                reason = f"more than {policy.keep_runs} runs"
+            elif policy.max_age_days and now - run['created_at'] > policy.max_age_days * 86400:
+                reason = f"older than {policy.max_age_days:g} days"
+            if reason:
+                _remove_run(run)
+                actions.append({"run_id": run['run_id'], "action": "deleted", "reason": reason, "bytes": size})
+                continue
+            if policy.compact_after and i >= policy.compact_after and not run.get('compacted'):
+                freed = compact_run(run['path'])
+                update_manifest(run['path'], **run_disk_usage(run['path']))
+                actions.append({"run_id": run['run_id'], "action": "compacted", "reason": f"beyond newest {policy.compact_after}", "bytes": freed})
+                size -= freed
+            kept.append((run, size))
+        blobs_dir = os.path.join(project_path, RUNS_ROOT, BLOBS)
+        prune_blobs(blobs_dir)
+        if policy.max_total_mb:
+            limit = policy.max_total_mb * 1024 * 1024
+            total = total_disk_usage(project_path)
+            # Oldest first, always keeping the newest run
+            for run, size in reversed(kept[1:]):
+                if total <= limit:
+                    break
+                _remove_run(run)
+                prune_blobs(blobs_dir)
+                total = total_disk_usage(project_path)
+                actions.append({"run_id": run['run_id'], "action": "deleted", "reason": f"over {policy.max_total_mb:g} MB", "bytes": size})
+    return actions
+
+
+def total_disk_usage(project_path):
+    """Bytes used by every run of a project, counting hard-linked attachments once."""
+    seen, total = set(), 0
+    for path in _walk_files(os.path.join(project_path, RUNS_ROOT)):
+        try:
+            st_ = os.stat(path)
+        except OSError:
+            continue
+        if (st_.st_dev, st_.st_ino) not in seen:
+            seen.add((st_.st_dev, st_.st_ino))
+            total += st_.st_size
+    return total
@@ -0,0 +1,68 @@
+import time
+from execution_manager import ACTIVE_STATES
+
+# Largest slice of output one update carries; a viewer far behind catches up over several updates
+MAX_UPDATE_CHARS = 256_000
+# Idle updates are sent this often so long-poll and SSE clients can tell the stream is alive
+HEARTBEAT_SECONDS = 15.0
+# After waking up for new output, a waiting viewer lets this much more accumulate before reading,
+# so a burst of small appends becomes one update instead of waking every viewer for each of them
+BATCH_SECONDS = 0.05
+
+
+class Subscription:
+    """
+    One viewer's cursor into a run. The run log is append-only and every viewer reads it at its
+    own offset, so nothing is taken away from other viewers, a new viewer can replay from any
+    offset, and a slow viewer only falls behind itself: nothing is buffered or dropped per viewer.
+    """
+
+    def __init__(self, run, offset=0, max_chars=MAX_UPDATE_CHARS):
+        self.run = run
+        self.offset = max(0, int(offset))
+        self.max_chars = max_chars
+        self.updates = 0
+        run.viewers.add(self)
+
+    @property
+    def finished(self):
+        # The log is closed after the run's last lines (results retention, "### Run ..."), not when its status changes
+        return self.run.status not in ACTIVE_STATES and self.run.logs.closed and self.offset >= len(self.run.logs)
+
+    def next(self, timeout=None):
+        """
+        Waits up to `timeout` seconds (0 = don't wait) for output past the cursor, then returns
+        { 'text', 'offset', 'status', 'progress', 'finished' } and moves the cursor.
+        """
+        if timeout and self.offset >= len(self.run.logs) and not self.finished:
+            if self.run.logs.wait(self.offset, timeout) > self.offset:
+                time.sleep(BATCH_SECONDS)
+        text, self.offset = self.run.logs.read(self.offset, self.max_chars)
+        self.updates += 1
+        return {"text": text, "offset": self.offset, "status": self.run.status,
+                "progress": self.run.worker_progress(), "finished": self.finished}
+
+    def __iter__(self):
+        """Updates until the run is over and its output fully read; idle updates every HEARTBEAT_SECONDS."""
+        while True:
+            update = self.next(HEARTBEAT_SECONDS)
+            yield update
+            if update["finished"]:
+                return
+
+    def close(self):
+        self.run.viewers.discard(self)
+
+
+def follow(run, offset=0, poll=1.0):
+    """Yields a run's output text from `offset` as it arrives, until the run is over (used by the CLI)."""
+    sub = Subscription(run, offset)
+    try:
+        while True:
+            update = sub.next(poll)
+            if update["text"]:
+                yield update["text"]
+            if update["finished"]:
+                return
+    finally:
+        sub.close()
@@ -0,0 +1,393 @@
+"""
+Runner agent: runs behave workers for a Behave Runner on another host.
+
+    python runner_agent.py --project /path/to/checkout [--capacity 2] [--host 127.0.0.1] [--port 8771]
+                           [--coordinator http://runner-host:8765] [--name NAME]
+
+The agent needs its own checkout of the project: feature paths and caps files in a job are
+relative to it. With --coordinator it registers itself (and its capacity) with the runner's API and
+keeps doing so as a heartbeat; otherwise list it in BEHAVE_RUNNER_AGENTS on the runner host.
+A job is a selection (caps file, tags, feature paths), never a command line: the agent builds the
+behave command itself and only for caps files of its own checkout. Every request must carry
+BEHAVE_RUNNER_AGENT_TOKEN, set to the same value on both sides; the agent does not start without it.
+
+HTTP API (JSON unless noted; POST and DELETE must send Content-Type application/json):
+  GET    /health                          name, capacity, busy jobs, project
+  POST   /jobs                            {job_id, job: {caps, tags, paths, events}, env} -> 201 | 409 when at capacity
+  GET    /jobs/<id>                       status and return code
+  GET    /jobs/<id>/log?offset=0&wait=0   {text, offset, status, returncode}; wait=N long-polls
+  GET    /jobs/<id>/results               [{name, size, mtime}] of the job's allure results
+  GET    /jobs/<id>/files/<name>          one result file (raw bytes)
+  DELETE /jobs/<id>                       stop the job; with ?purge=1 forget it and delete its files
+"""
+import os
+import re
+import hmac
+import sys
+import json
+import time
+import shutil
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+from log_store import LogStore
+from stream_reader import read_line_batches
+from runner_paths import runner_home
+
+RUNNER_DIR = os.path.dirname(os.path.abspath(__file__))
+TOKEN_HEADER = "X-Runner-Token"
+AGENT_TOKEN = os.environ.get("BEHAVE_RUNNER_AGENT_TOKEN")
+# Seconds between registrations with the coordinator; it drops agents silent for 3 heartbeats
+HEARTBEAT_SECONDS = float(os.environ.get("BEHAVE_RUNNER_AGENT_HEARTBEAT", "5"))
+# Finished jobs nobody purged are deleted after this long
+JOB_TTL_SECONDS = float(os.environ.get("BEHAVE_RUNNER_AGENT_JOB_TTL", str(24 * 3600)))
+# How long a purge waits for a stopped job to end before leaving the folder for the job to delete
+JOB_STOP_SECONDS = 3.0
+MAX_LOG_CHARS = 256_000
+MAX_WAIT_SECONDS = 30.0
+# Job ids become folder names
+JOB_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$")
+
+
+class Job:
+    """One behave process started for the coordinator, with its log and results folder."""
+
+    def __init__(self, job_id, command, cwd, env, folder):
+        self.job_id = job_id
+        self.cwd = cwd
+        self.env = env
+        self.folder = folder
+        self.results_dir = os.path.join(folder, "results")
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.command = command
+        self.logs = LogStore(os.path.join(folder, "job.log"))
+        self.status = "running"
+        self.returncode = None
+        self.process = None
+        self.stop_requested = False
+        self.purged = False
+        self.started_at = time.time()
+        self.finished_at = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"job-{self.job_id}")
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            preexec = os.setsid if os.name == 'posix' else None
+            self.process = subprocess.Popen(self.command, cwd=self.cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                            env=self.env, preexec_fn=preexec)
+            if self.stop_requested:
+                # Stopped while the process was starting
+                self.stop()
+            for lines in read_line_batches(self.process.stdout):
+                self.logs.append("\n".join(lines) + "\n")
+            self.returncode = self.process.wait()
+            self.status = "passed" if self.returncode == 0 else "failed"
+        except Exception as e:
+            self.logs.append(f"\n[ERROR] Agent process exception: {e}\n")
+            self.status = "error"
+        finally:
+            self.process = None
+            self.finished_at = time.time()
+            self.logs.close()
+            if self.purged:
+                # Purged while still running: nothing writes to the folder any more
+                shutil.rmtree(self.folder, ignore_errors=True)
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    def stop(self):
+        if self.finished_at is not None:
+            return False
+        self.stop_requested = True
+        process = self.process
+        if process is None:
+            return False
+        if os.name == 'nt':
+            subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)])
+        else:
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        return True
+
+    def result_files(self):
+        files = []
+        for name in sorted(os.listdir(self.results_dir)):
+            path = os.path.join(self.results_dir, name)
+            if os.path.isfile(path):
+                st_ = os.stat(path)
+                files.append({"name": name, "size": st_.st_size, "mtime": st_.st_mtime})
+        return files
+
+    def summary(self):
+        return {"job_id": self.job_id, "status": self.status, "returncode": self.returncode, "started_at": self.started_at,
+                "finished_at": self.finished_at, "log_size": len(self.logs), "stop_requested": self.stop_requested}
+
+
+class RunnerAgent:
+    """Jobs of this agent process, limited to `capacity` at a time."""
+
+    def __init__(self, project, capacity=1, name=None):
+        self.project = os.path.abspath(project)
+        self.capacity = max(1, int(capacity))
+        self.name = name or socket.gethostname()
+        self.url = None
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self):
+        return sum(1 for j in self.jobs.values() if j.running)
+
+    def health(self):
+        return {"name": self.name, "url": self.url, "capacity": self.capacity, "busy": self.busy, "project": self.project,
+                "jobs": len(self.jobs)}
+
+    def _env(self, overrides):
+        """This host's environment plus what the coordinator set for the run; the formatter is imported from here."""
+        env = dict(os.environ)
+        env.update(overrides or {})
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (RUNNER_DIR, os.environ.get("PYTHONPATH")) if p)
+        env.setdefault("PYTHONIOENCODING", "utf-8")
+        return env
+
+    def _command(self, selection, results_dir):
+        """
+        The behave command of a job { 'caps', 'tags', 'paths', 'events' }, built here from checked
+        values: a caps file of this checkout, tags as text, relative feature paths inside it.
+        """
+        from execution_manager import build_behave_command, with_event_formatter, with_rule_results
+        from feature_scanner import find_caps_files
+        caps, tags, paths = selection.get("caps"), selection.get("tags"), selection.get("paths") or []
+        if caps not in find_caps_files(self.project):
+            raise ValueError(f"Unknown caps file {caps!r}")
+        if tags is not None and not isinstance(tags, str) and not (isinstance(tags, list) and all(isinstance(t, str) for t in tags)):
+            raise ValueError("'tags' must be a tag expression or a list of tags")
+        if not isinstance(paths, list):
+            raise ValueError("'paths' must be a list")
+        for path in paths:
+            if not isinstance(path, str) or not path or path.startswith("-") or os.path.isabs(path) \
+                    or os.path.normpath(path).split(os.sep)[0] == "..":
+                raise ValueError(f"Not a feature path of the project: {path!r}")
+        command = with_rule_results(build_behave_command(caps, tags, paths, results_dir))
+        return with_event_formatter(command) if selection.get("events") else command
+
+    def submit(self, job_id, selection, env=None):
+        """Starts a job, or returns None when every slot is taken."""
+        if not isinstance(job_id, str) or not JOB_ID.match(job_id):
+            raise ValueError(f"Bad job id {job_id!r}")
+        if not isinstance(selection, dict):
+            raise ValueError("'job' must be an object")
+        if env is not None and not (isinstance(env, dict) and all(isinstance(k, str) and isinstance(v, str) for k, v in env.items())):
+            raise ValueError("'env' must map names to strings")
+        folder = os.path.join(runner_home("agent-jobs"), job_id)
+        command = self._command(selection, os.path.join(folder, "results"))
+        with self.lock:
+            self._expire()
+            if job_id in self.jobs:
+                raise ValueError(f"Job {job_id} already exists")
+            if self.busy >= self.capacity:
+                return None
+            job = Job(job_id, command, self.project, self._env(env), folder)
+            self.jobs[job_id] = job
+        return job.start()
+
+    def purge(self, job_id):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job:
+            job.purged = True
+            job.stop()
+            # The job thread writes the log and results until its process ends
+            if job.thread:
+                job.thread.join(JOB_STOP_SECONDS)
+            if not (job.thread and job.thread.is_alive()):
+                shutil.rmtree(job.folder, ignore_errors=True)
+        return job is not None
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and now - job.finished_at > JOB_TTL_SECONDS:
+                self.jobs.pop(job_id)
+                shutil.rmtree(job.folder, ignore_errors=True)
+
+    def heartbeat(self, coordinator, stop):
+        """Registers with the coordinator's API until `stop` is set."""
+        url = coordinator.rstrip("/") + "/agents"
+        while True:
+            req = urllib.request.Request(url, data=json.dumps(self.health()).encode("utf-8"), method="POST",
+                                         headers={"Content-Type": "application/json", TOKEN_HEADER: AGENT_TOKEN or ""})
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except OSError as e:
+                print(f"[WARN] Could not register with {coordinator}: {e}", file=sys.stderr)
+            if stop.wait(HEARTBEAT_SECONDS):
+                return
+
+
+class AgentHandler(BaseHTTPRequestHandler):
+    server_version = "BehaveRunnerAgent/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def agent(self):
+        return self.server.agent
+
+    def _send(self, status, data):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        query = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(url.query).items()}
+        return parts, query
+
+    def _allowed(self):
+        if not AGENT_TOKEN or not hmac.compare_digest(self.headers.get(TOKEN_HEADER) or "", AGENT_TOKEN):
+            self._send(401, {"error": "Bad or missing token"})
+            return False
+        if self.command in ("POST", "DELETE") and \
+                (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return False
+        return True
+
+    def _job(self, job_id):
+        job = self.agent.jobs.get(job_id)
+        if job is None:
+            self._send(404, {"error": f"Unknown job {job_id}"})
+        return job
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        parts, query = self._route()
+        if parts == ["health"]:
+            self._send(200, self.agent.health())
+        elif parts == ["jobs"]:
+            self._send(200, [j.summary() for j in list(self.agent.jobs.values())])
+        elif len(parts) >= 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if not job:
+                return
+            if len(parts) == 2:
+                self._send(200, job.summary())
+            elif parts[2:] == ["log"]:
+                offset = int(query.get("offset", 0))
+                deadline = time.time() + min(float(query.get("wait", 0)), MAX_WAIT_SECONDS)
+                while job.running and len(job.logs) <= offset and time.time() < deadline:
+                    job.logs.wait(offset, min(0.5, deadline - time.time()))
+                status, returncode = job.status, job.returncode
+                text, offset = job.logs.read(offset, MAX_LOG_CHARS)
+                self._send(200, {"text": text, "offset": offset, "status": status, "returncode": returncode})
+            elif parts[2:] == ["results"]:
+                self._send(200, job.result_files())
+            elif len(parts) == 4 and parts[2] == "files":
+                path = os.path.join(job.results_dir, os.path.basename(parts[3]))
+                if not os.path.isfile(path):
+                    self._send(404, {"error": "No such file"})
+                    return
+                with open(path, 'rb') as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send(404, {"error": "Not found"})
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if not self._allowed():
+            return
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            data = json.loads(self.rfile.read(length) or b"{}")
+            job = self.agent.submit(data["job_id"], data["job"], data.get("env"))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        if job is None:
+            self._send(409, {"error": "Agent is at capacity", "capacity": self.agent.capacity})
+        else:
+            self._send(201, job.summary())
+
+    def do_DELETE(self):
+        if not self._allowed():
+            return
+        parts, query = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send(404, {"error": "Not found"})
+        elif query.get("purge"):
+            self._send(200, {"purged": self.agent.purge(parts[1])})
+        else:
+            job = self._job(parts[1])
+            if job:
+                self._send(200, {"stopped": job.stop()})
+
+
+def make_agent_server(agent, host="127.0.0.1", port=8771):
+    if not AGENT_TOKEN:
+        raise SystemExit("Set BEHAVE_RUNNER_AGENT_TOKEN (the same value as on the runner host) before starting an agent")
+    server = ThreadingHTTPServer((host, port), AgentHandler)
+    server.agent = agent
+    agent.url = f"http://{host if host not in ('0.0.0.0', '') else socket.gethostname()}:{server.server_port}"
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="runner_agent", description="Behave Runner remote agent")
+    parser.add_argument("--project", default=os.getcwd(), help="This host's checkout of the project")
+    parser.add_argument("--capacity", type=int, default=int(os.environ.get("BEHAVE_RUNNER_AGENT_CAPACITY", "1")),
+                        help="behave processes this host can run at once")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8771, help="0 picks a free port")
+    parser.add_argument("--coordinator", default=os.environ.get("BEHAVE_RUNNER_COORDINATOR"),
+                        help="Runner API to register with, e.g. http://runner-host:8765")
+    parser.add_argument("--name")
+    args = parser.parse_args(argv)
+    agent = RunnerAgent(args.project, args.capacity, args.name)
+    server = make_agent_server(agent, args.host, args.port)
+    stop = threading.Event()
+    if args.coordinator:
+        threading.Thread(target=agent.heartbeat, args=(args.coordinator, stop), daemon=True).start()
+    print(f"Runner agent {agent.name} ({agent.capacity} slots) listening on {agent.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for job in list(agent.jobs.values()):
+            job.stop()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import os
+import hmac
+import json
+import secrets
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from execution_manager import ExecutionManager
+from run_stream import Subscription, HEARTBEAT_SECONDS
+from behave_runner import scan, plan_shards, plan_run, submit, check_caps
+from runner_agent import TOKEN_HEADER
+from runner_paths import runner_home
+
+# Largest log slice returned by one /runs/<id>/log call
+MAX_LOG_CHARS = 256_000
+# Longest a /runs/<id>/log?wait=... call may block waiting for new output
+MAX_WAIT_SECONDS = 60.0
+# How often /runs/<id>/stream checks for run state changes when no output arrives
+STREAM_STATE_SECONDS = 1.0
+# Token POST, DELETE and project-reading GET calls send in X-Runner-Token; without it one is generated
+# and kept in the data folder
+API_TOKEN = os.environ.get("BEHAVE_RUNNER_API_TOKEN")
+
+
+def api_token():
+    """BEHAVE_RUNNER_API_TOKEN, or the token generated on first use in <runner home>/api-token."""
+    if API_TOKEN:
+        return API_TOKEN
+    path = os.path.join(runner_home(), "api-token")
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    token = secrets.token_urlsafe(32)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    return token
+
+
+class RunnerAPIHandler(BaseHTTPRequestHandler):
+    """
+    Small JSON API over the ExecutionManager. POST and DELETE calls must send Content-Type
+    application/json and the API token (see api_token) in X-Runner-Token; GET calls that read a
+    project folder (/scan, /results, /matrix) need the token too:
+      GET    /scan?project=...                       features, caps and tags
+      GET    /runs                                   every run, newest first
+      POST   /runs                                   {project, caps, tags, paths, workers, strategy, priority, label,
+                                                      failed_first, rerun_failed} -> {run_id}
+      GET    /runs/<id>                              run summary and worker progress
+      GET    /runs/<id>/log?offset=0&wait=0          {text, offset, status}; with wait=N blocks up to N seconds
+                                                     for output past `offset` (long poll)
+      GET    /runs/<id>/stream?offset=0              server-sent events: `log` {text, offset} as output arrives,
+                                                     `state` {status, progress} on changes, `end` when done
+      DELETE /runs/<id>                              cancel
+      GET    /results?project=...&status=failed      counts and latest results; results_dir=... picks a
+                                                     results folder inside the project
+      POST   /runs with a list of caps files         a capabilities matrix: one run per caps file, at most
+                                                     `max_parallel` at once -> {matrix_id, runs: {caps: run_id}}
+      GET    /matrix?project=...                     matrix runs of a project, newest first
+      GET    /matrix/<id>?project=...                scenario x caps statuses {columns, rows, totals}
+      POST   /agents                                 runner agent heartbeat {url, name, capacity, busy, project};
+                                                     needs BEHAVE_RUNNER_AGENT_TOKEN instead of the API token
+      GET    /agents                                 known runner agents, their capacity and whether they are alive
+    """
+    server_version = "BehaveRunnerAPI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v if len(v) > 1 else v[0] for k, v in parse_qs(url.query).items()}
+        return parts, query
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _allowed(self, token):
+        """Rejects a changing call without a JSON content type or without the right token."""
+        if (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return False
+        return self._has_token(token)
+
+    def _has_token(self, token):
+        if not token or not hmac.compare_digest(self.headers.get(TOKEN_HEADER) or "", token):
+            self._send(401, {"error": "Bad or missing token"})
+            return False
+        return True
+
+    def _run(self, run_id):
+        run = ExecutionManager().get_run(run_id)
+        if run is None:
+            self._send(404, {"error": f"Unknown run {run_id}"})
+        return run
+
+    def _event(self, name, data):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream(self, run, offset):
+        """Server-sent events for one viewer; each connection reads the run at its own cursor."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        sub = Subscription(run, offset, MAX_LOG_CHARS)
+        state, idle = None, 0.0
+        try:
+            while True:
+                update = sub.next(STREAM_STATE_SECONDS)
+                if update["text"]:
+                    self._event("log", {"text": update["text"], "offset": update["offset"]})
+                if (update["status"], update["progress"]) != state:
+                    state = (update["status"], update["progress"])
+                    self._event("state", {"status": update["status"], "progress": update["progress"]})
+                    idle = 0.0
+                elif not update["text"]:
+                    idle += STREAM_STATE_SECONDS
+                    if idle >= HEARTBEAT_SECONDS:
+                        self.wfile.write(b": keep-alive\n\n"); self.wfile.flush()
+                        idle = 0.0
+                if update["finished"]:
+                    self._event("end", {"status": update["status"], "offset": update["offset"]})
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            sub.close()
+
+    def do_GET(self):
+        parts, query = self._route()
+        if parts and parts[0] in ("scan", "results", "matrix") and not self._has_token(api_token()):
+            return
+        try:
+            if parts == ["scan"]:
+                features, caps, tags = scan(query.get("project") or os.getcwd())
+                self._send(200, {"features": features, "caps": caps, "tags": tags})
+            elif parts == ["runs"]:
+                self._send(200, [r.summary() for r in ExecutionManager().list_runs()])
+            elif len(parts) == 2 and parts[0] == "runs":
+                run = self._run(parts[1])
+                if run:
+                    self._send(200, dict(run.summary(), progress=run.worker_progress()))
+            elif len(parts) == 3 and parts[0] == "runs" and parts[2] == "log":
+                run = self._run(parts[1])
+                if run:
+                    sub = Subscription(run, int(query.get("offset", 0)), MAX_LOG_CHARS)
+                    try:
+                        update = sub.next(min(float(query.get("wait", 0)), MAX_WAIT_SECONDS))
+                    finally:
+                        sub.close()
+                    self._send(200, {"text": update["text"], "offset": update["offset"], "status": update["status"]})
+            elif len(parts) == 3 and parts[0] == "runs" and parts[2] == "stream":
+                run = self._run(parts[1])
+                if run:
+                    self._stream(run, int(query.get("offset", 0)))
+            elif parts and parts[0] == "matrix" and len(parts) <= 2:
+                from caps_matrix import list_matrices, matrix_table
+                matrices = list_matrices(query.get("project") or os.getcwd())
+                if len(parts) == 1:
+                    self._send(200, [dict(m, runs=[{k: v for k, v in r.items() if k != "workers"} for r in m['runs']])
+                                     for m in matrices])
+                    return
+                matrix = next((m for m in matrices if m['matrix'] == parts[1]), None)
+                if matrix is None:
+                    self._send(404, {"error": f"Unknown matrix {parts[1]}"})
+                    return
+                columns, rows, totals = matrix_table(matrix)
+                self._send(200, {"matrix_id": matrix['matrix'], "columns": columns, "rows": rows, "totals": totals})
+            elif parts == ["agents"]:
+                from remote_agents import AgentRegistry
+                self._send(200, AgentRegistry().list_agents())
+            elif parts == ["results"]:
+                from allure_store import get_store
+                project = query.get("project") or os.getcwd()
+                if query.get("results_dir"):
+                    relative = os.path.normpath(query["results_dir"])
+                    if os.path.isabs(relative) or os.path.splitdrive(relative)[0] or relative.split(os.sep)[0] == "..":
+                        self._send(400, {"error": "'results_dir' must be a folder inside the project"})
+                        return
+                    results_dir = os.path.join(project, relative)
+                else:
+                    from run_results import latest_results_dir
+                    results_dir = latest_results_dir(project)
+                if not os.path.isdir(results_dir):
+                    self._send(404, {"error": f"No results folder: {results_dir}"})
+                    return
+                store = get_store(results_dir)
+                store.ingest()
+                self._send(200, {"counts": store.counts(),
+                                 "results": store.list_results(status=query.get("status"), limit=int(query.get("limit", 100)))})
+            else:
+                self._send(404, {"error": "Not found"})
+        except SystemExit as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts == ["agents"]:
+            self._register_agent()
+            return
+        if not self._allowed(api_token()):
+            return
+        if parts != ["runs"]:
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            data = self._body()
+            project = os.path.abspath(data.get("project") or os.getcwd())
+            if not data.get("caps"):
+                self._send(400, {"error": "'caps' is required"})
+                return
+            check_caps(project, data["caps"])
+            if isinstance(data["caps"], list):
+                self._submit_matrix(project, data)
+                return
+            shards = plan_run(project, data["caps"], data.get("tags"), data.get("paths"), data.get("workers", 1),
+                              data.get("strategy", "file"), data.get("failed_first", False), data.get("rerun_failed", False))
+            if not shards:
+                self._send(200, {"run_id": None, "message": "Nothing to run"})
+                return
+            run_id = submit(project, shards, int(data.get("priority", 0)), data.get("label"))
+            self._send(201, {"run_id": run_id, "workers": len(shards)})
+        except (ValueError, SystemExit) as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+    def _register_agent(self):
+        from remote_agents import AgentRegistry, AGENT_TOKEN
+        # Without BEHAVE_RUNNER_AGENT_TOKEN on this host no agent can register
+        if not self._allowed(AGENT_TOKEN):
+            return
+        try:
+            data = self._body()
+            agent = AgentRegistry().register(data)
+        except (KeyError, TypeError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(200, agent)
+
+    def _submit_matrix(self, project, data):
+        from caps_matrix import submit_matrix, MATRIX_MAX_PARALLEL
+        shards, tags = plan_shards(project, data.get("tags"), data.get("paths"), data.get("workers", 1), data.get("strategy", "file"),
+                             data.get("failed_first", False), data.get("rerun_failed", False))
+        if not shards:
+            self._send(200, {"matrix_id": None, "message": "Nothing to run"})
+            return
+        matrix_id, run_ids = submit_matrix(project, shards, data["caps"], tags, int(data.get("priority", 0)),
+                                           data.get("label"), int(data.get("max_parallel", MATRIX_MAX_PARALLEL)))
+        self._send(201, {"matrix_id": matrix_id, "runs": run_ids})
+
+    def do_DELETE(self):
+        if not self._allowed(api_token()):
+            return
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == "runs" and self._run(parts[1]):
+            self._send(200, {"cancelled": bool(ExecutionManager().cancel(parts[1]))})
+        elif not (len(parts) == 2 and parts[0] == "runs"):
+            self._send(404, {"error": "Not found"})
+
+
+def make_server(host="127.0.0.1", port=8765):
+    return ThreadingHTTPServer((host, port), RunnerAPIHandler)
+
+
+def serve(host="127.0.0.1", port=8765):
+    server = make_server(host, port)
+    print(f"Behave Runner API listening on http://{host}:{server.server_port}")
+    if not API_TOKEN:
+        print(f"POST, DELETE, /scan, /results and /matrix calls need the token in {os.path.join(runner_home(), 'api-token')} (header {TOKEN_HEADER})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
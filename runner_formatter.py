@@ -0,0 +1,152 @@
+"""
+behave formatter that streams the run as JSON lines to the Behave Runner over a local socket,
+next to (not instead of) the human-readable output:
+
+    behave -f allure_behave.formatter:AllureFormatter -o allure-results -f runner_formatter:RunnerEventFormatter
+
+The runner passes its address in BEHAVE_RUNNER_EVENTS (host:port) together with a per-run token
+and the worker id. Without them, or when the runner cannot be reached, the formatter does nothing.
+Events: session_start, feature_start, scenario_start, step_start, step_end, hook_failed,
+scenario_end, feature_end, session_end.
+
+RuleAllureFormatter is allure-behave's formatter reporting the scenarios inside `Rule:` blocks too;
+the runner uses it in place of allure-behave's own at launch.
+"""
+import os
+import json
+import time
+import socket
+from behave.formatter.base import Formatter
+try:
+    from allure_behave.formatter import AllureFormatter
+except ImportError:
+    AllureFormatter = None
+
+EVENTS_ENV = "BEHAVE_RUNNER_EVENTS"
+TOKEN_ENV = "BEHAVE_RUNNER_EVENT_TOKEN"
+WORKER_ENV = "BEHAVE_RUNNER_WORKER"
+
+
+def _location(element):
+    location = getattr(element, "location", None)
+    return f"{location.filename}:{location.line}" if location else None
+
+
+def _status(element):
+    status = getattr(element, "status", None)
+    return getattr(status, "name", str(status) if status is not None else None)
+
+
+def _error(step):
+    exception = getattr(step, "exception", None)
+    if exception is not None:
+        return f"{type(exception).__name__}: {exception}"[:500]
+    return step.error_message.strip().splitlines()[0][:500] if step.error_message else None
+
+
+class RunnerEventFormatter(Formatter):
+    name = "runner_events"
+    description = "JSON-lines run events for the Behave Runner"
+
+    def __init__(self, stream_opener, config):
+        super(RunnerEventFormatter, self).__init__(stream_opener, config)
+        self.worker = os.environ.get(WORKER_ENV)
+        self.sock = None
+        self.current_feature = None
+        self.current_scenario = None
+        self.steps = []
+        self.next_step = 0
+        self.selected = True
+        address = os.environ.get(EVENTS_ENV)
+        if address:
+            host, _, port = address.rpartition(":")
+            try:
+                self.sock = socket.create_connection((host, int(port)), timeout=5)
+                self.sock.settimeout(None)
+            except (OSError, ValueError):
+                self.sock = None
+        self._send("session_start", token=os.environ.get(TOKEN_ENV), pid=os.getpid())
+
+    def _send(self, event, **data):
+        if self.sock is None:
+            return
+        data.update(event=event, t=time.time(), worker=self.worker)
+        try:
+            self.sock.sendall((json.dumps(data, default=str) + "\n").encode("utf-8"))
+        except OSError:
+            # The runner went away; keep the test run going without events
+            self.sock = None
+
+    # --- Scenario and feature ends are only known when the next one starts ---
+    def _end_scenario(self):
+        scenario, self.current_scenario = self.current_scenario, None
+        if scenario is None:
+            return
+        if getattr(scenario, "hook_failed", False):
+            self._send("hook_failed", scope="scenario", name=scenario.name, location=_location(scenario),
+                       error=getattr(scenario, "error_message", None))
+        self._send("scenario_end", name=scenario.name, location=_location(scenario), status=_status(scenario),
+                   duration=scenario.duration, selected=self.selected)
+
+    def _end_feature(self):
+        self._end_scenario()
+        feature, self.current_feature = self.current_feature, None
+        if feature is None:
+            return
+        if getattr(feature, "hook_failed", False):
+            self._send("hook_failed", scope="feature", name=feature.name, location=_location(feature))
+        self._send("feature_end", name=feature.name, location=_location(feature), status=_status(feature),
+                   duration=feature.duration)
+
+    # --- IFormatter ---
+    def feature(self, feature):
+        self._end_feature()
+        self.current_feature = feature
+        self._send("feature_start", name=feature.name, location=_location(feature), tags=list(feature.tags))
+
+    def scenario(self, scenario):
+        self._end_scenario()
+        self.current_scenario = scenario
+        self.steps = list(scenario.all_steps)
+        self.next_step = 0
+        # Scenarios left out by tags or file:line locations are reported too, as skipped
+        self.selected = scenario.should_run(self.config)
+        self._send("scenario_start", name=scenario.name, location=_location(scenario), selected=self.selected,
+                   feature=self.current_feature.name if self.current_feature else None, tags=list(scenario.effective_tags))
+
+    def match(self, match):
+        # match() comes right before a step runs (step() is called for every step up front)
+        if self.next_step < len(self.steps):
+            step = self.steps[self.next_step]
+            self._send("step_start", name=f"{step.keyword} {step.name}", location=_location(step))
+
+    def result(self, step):
+        for i in range(self.next_step, len(self.steps)):
+            if self.steps[i] is step:
+                self.next_step = i + 1
+                break
+        self._send("step_end", name=f"{step.keyword} {step.name}", location=_location(step), status=_status(step),
+                   duration=step.duration, error=_error(step))
+
+    def eof(self):
+        self._end_feature()
+
+    def close(self):
+        self._end_feature()
+        self._send("session_end")
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+
+if AllureFormatter is not None:
+    class RuleAllureFormatter(AllureFormatter):
+        """allure-behave only wraps `feature.scenarios`, so scenarios of a Rule never got a result."""
+
+        def feature(self, feature):
+            super(RuleAllureFormatter, self).feature(feature)
+            for rule in getattr(feature, "rules", None) or []:
+                self._wrap_scenario(rule.scenarios)
@@ -0,0 +1,12 @@
+import os
+
+
+def runner_home(*parts):
+    """
+    Returns (and creates) a folder under the Behave Runner data directory.
+    Defaults to ~/.behave_runner, override with the BEHAVE_RUNNER_HOME environment variable.
+    """
+    base = os.environ.get("BEHAVE_RUNNER_HOME") or os.path.join(os.path.expanduser("~"), ".behave_runner")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+# (connect, read) timeout in seconds for every stop request
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_RETRIES = 2
+MAX_WORKERS = 16
+
+
+class SessionProvider(ABC):
+    """A cloud grid whose sessions can be stopped through its REST API."""
+    name = None
+    base_url = None
+
+    def __init__(self, username, access_key, base_url=None):
+        self.username = username
+        self.access_key = access_key
+        if base_url:
+            self.base_url = base_url.rstrip("/")
+
+    @abstractmethod
+    def stop_request(self, session_id):
+        """Returns (method, url) of the call that stops `session_id`."""
+
+
+class LambdaTestProvider(SessionProvider):
+    name = "LambdaTest"
+    base_url = "https://api.lambdatest.com"
+
+    def stop_request(self, session_id):
+        return "PUT", f"{self.base_url}/automation/api/v1/sessions/{session_id}/stop"
+
+    @classmethod
+    def from_env(cls, env=None):
+        env = os.environ if env is None else env
+        username = env.get('LT_USERNAME') or env.get('LAMBDA_USER_NAME')
+        access_key = env.get('LT_ACCESS_KEY') or env.get('LAMBDA_APIKEY')
+        if username and access_key:
+            return cls(username, access_key, env.get('LT_API_URL'))
+        return None
+
+
+class BrowserStackProvider(SessionProvider):
+    name = "BrowserStack"
+    base_url = "https://hub-cloud.browserstack.com"
+
+    def stop_request(self, session_id):
+        # Ending the WebDriver session frees the parallel slot straight away
+        return "DELETE", f"{self.base_url}/wd/hub/session/{session_id}"
+
+    @classmethod
+    def from_env(cls, env=None):
+        env = os.environ if env is None else env
+        username = env.get('BROWSERSTACK_USERNAME')
+        access_key = env.get('BROWSERSTACK_ACCESS_KEY')
+        if username and access_key:
+            return cls(username, access_key, env.get('BROWSERSTACK_HUB_URL'))
+        return None
+
+
+def make_http_session(pool_size=MAX_WORKERS, retries=DEFAULT_RETRIES):
+    """A pooled requests session that retries connection errors and 429/5xx responses."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=0.3,
+                  status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({"PUT", "DELETE"}),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    http = requests.Session()
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    return http
+
+
+class TeardownReport:
+    """Outcome and latency of stopping a batch of sessions."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.results = []
+        self.elapsed = 0.0
+
+    @property
+    def stopped(self):
+        return sum(1 for r in self.results if r['ok'])
+
+    @property
+    def failed(self):
+        return len(self.results) - self.stopped
+
+    def latency(self, quantile):
+        values = sorted(r['latency'] for r in self.results)
+        if not values:
+            return 0.0
+        return values[min(int(quantile * len(values)), len(values) - 1)]
+
+    def summary(self):
+        return (f"{self.provider} teardown: {self.stopped}/{len(self.results)} sessions stopped in {self.elapsed:.2f}s "
+                f"(p50 {self.latency(0.5):.2f}s, p95 {self.latency(0.95):.2f}s)")
+
+
+def stop_sessions(provider, session_ids, http=None, timeout=DEFAULT_TIMEOUT, max_workers=MAX_WORKERS, log=None):
+    """
+    Stops every session concurrently through one pooled HTTP session.
+    `log` is called with a line of text per session. Returns a TeardownReport.
+    """
+    report = TeardownReport(provider.name)
+    session_ids = sorted(session_ids)
+    if not session_ids:
+        return report
+    own_http = http is None
+    http = http or make_http_session(pool_size=min(max_workers, len(session_ids)))
+    lock = threading.Lock()
+
+    def stop_one(session_id):
+        method, url = provider.stop_request(session_id)
+        started = time.perf_counter()
+        result = {"session_id": session_id, "ok": False, "status": None, "error": None}
+        try:
+            response = http.request(method, url, auth=(provider.username, provider.access_key), timeout=timeout)
+            result['status'] = response.status_code
+            result['ok'] = 200 <= response.status_code < 300
+            if not result['ok']:
+                result['error'] = response.text[:300]
+        except Exception as e:
+            result['error'] = str(e)
+        result['latency'] = time.perf_counter() - started
+        with lock:
+            report.results.append(result)
+        if log:
+            if result['ok']:
+                log(f"[INFO] Successfully stopped {provider.name} session {session_id}\n")
+            else:
+                log(f"[WARN] Failed to stop {provider.name} session {session_id}: {result['error']}\n")
+        return result
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(session_ids))) as pool:
+            list(pool.map(stop_one, session_ids))
+    finally:
+        if own_http:
+            http.close()
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def teardown_run_sessions(lt_session_ids, bs_session_ids, env=None, log=None):
+    """
+    Stops the remote sessions of a run for every provider that has credentials.
+    Session ids printed as a plain "SessionId:" are handed to BrowserStack when LambdaTest is not configured.
+    Returns a list of TeardownReport.
+    """
+    lambdatest = LambdaTestProvider.from_env(env)
+    browserstack = BrowserStackProvider.from_env(env)
+    jobs = []
+    if lambdatest:
+        jobs.append((lambdatest, set(lt_session_ids)))
+    if browserstack:
+        jobs.append((browserstack, set(bs_session_ids) | (set() if lambdatest else set(lt_session_ids))))
+    reports = []
+    for provider, ids in jobs:
+        if not ids:
+            if log: log(f"\n[INFO] No {provider.name} Session IDs found in logs to stop.\n")
+            continue
+        if log: log(f"\n[INFO] Found {provider.name} Sessions to stop: {sorted(ids)}\n")
+        reports.append(stop_sessions(provider, ids, log=log))
+    return reports
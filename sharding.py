@@ -0,0 +1,113 @@
+import os
+from allure_store import get_store
+from gherkin_model import runnable_items
+
+# Strategies offered in the "4. Execution" section
+STRATEGIES = {
+    "file": "By feature file",
+    "scenario": "By scenario",
+    "duration": "By historical duration",
+}
+
+# Used when a feature has no recorded history yet
+DEFAULT_SCENARIO_SECONDS = 30.0
+
+
+def load_feature_durations(results_dir):
+    """
+    Sums the recorded duration (seconds) of every scenario in an allure-results folder.
+    Returns a dict: { 'feature name': seconds }
+    """
+    if not os.path.isdir(results_dir):
+        return {}
+    store = get_store(results_dir)
+    store.ingest()
+    return store.feature_durations()
+
+
+def _new_shards(workers):
+    return [{"paths": [], "expected": 0, "weight": 0.0} for _ in range(workers)]
+
+
+def _scenario_count(feat):
+    return max(len(runnable_items(feat)), 1)
+
+
+def shard_by_file(features, workers, project_path):
+    """Deals whole feature files out so every worker gets a similar number of scenarios."""
+    shards = _new_shards(workers)
+    ordered = sorted(features, key=lambda f: (-_scenario_count(f), f['path']))
+    for feat in ordered:
+        target = min(shards, key=lambda s: s['expected'])
+        target['paths'].append(os.path.relpath(feat['path'], project_path))
+        target['expected'] += _scenario_count(feat)
+    return shards
+
+
+def shard_by_scenario(features, workers, project_path):
+    """Deals individual scenarios and example rows (as file:line) out round-robin."""
+    shards = _new_shards(workers)
+    index = 0
+    for feat in sorted(features, key=lambda f: f['path']):
+        rel = os.path.relpath(feat['path'], project_path)
+        lines = [i['line'] for i in runnable_items(feat)]
+        if not lines:
+            # Nothing addressable by line, keep the file together
+            shards[index % workers]['paths'].append(rel)
+            shards[index % workers]['expected'] += 1
+            index += 1
+            continue
+        for line in lines:
+            shards[index % workers]['paths'].append(f"{rel}:{line}")
+            shards[index % workers]['expected'] += 1
+            index += 1
+    return shards
+
+
+def shard_by_duration(features, workers, project_path, durations):
+    """
+    Longest-processing-time-first packing using durations from previous runs.
+    Features without history are estimated from the average seconds per scenario.
+    """
+    known = [(durations[f['feature_name']], _scenario_count(f)) for f in features if f['feature_name'] in durations]
+    if known:
+        per_scenario = sum(d for d, _ in known) / sum(c for _, c in known)
+    else:
+        per_scenario = DEFAULT_SCENARIO_SECONDS
+
+    def estimate(feat):
+        return durations.get(feat['feature_name'], per_scenario * _scenario_count(feat))
+
+    shards = _new_shards(workers)
+    for feat in sorted(features, key=lambda f: (-estimate(f), f['path'])):
+        target = min(shards, key=lambda s: s['weight'])
+        target['paths'].append(os.path.relpath(feat['path'], project_path))
+        target['expected'] += _scenario_count(feat)
+        target['weight'] += estimate(feat)
+    return shards
+
+
+def shard_locations(locations, workers):
+    """Deals an explicit list of files and file:line locations out round-robin."""
+    shards = _new_shards(max(1, min(int(workers), len(locations))))
+    for index, loc in enumerate(locations):
+        shards[index % len(shards)]['paths'].append(loc)
+        shards[index % len(shards)]['expected'] += 1
+    return [s for s in shards if s['paths']]
+
+
+def build_shards(features, workers, strategy, project_path, durations=None):
+    """
+    Splits the selected features into at most `workers` non-empty shards.
+    Returns a list of dicts: { 'paths': [...], 'expected': <scenario count>, 'weight': <est. seconds> }
+    """
+    workers = max(1, min(int(workers), len(features) if strategy != "scenario" else sum(_scenario_count(f) for f in features)))
+    if not features:
+        return []
+    if strategy == "scenario":
+        shards = shard_by_scenario(features, workers, project_path)
+    elif strategy == "duration":
+        shards = shard_by_duration(features, workers, project_path, durations or {})
+    else:
+        shards = shard_by_file(features, workers, project_path)
+    return [s for s in shards if s['paths']]
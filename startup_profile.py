@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import threading
+
+# Set BEHAVE_RUNNER_PROFILE_STARTUP=1 to record import times and time-to-first-render
+ENABLED = os.environ.get("BEHAVE_RUNNER_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+BUDGET_FILE = "startup_budget.json"
+
+_started = time.perf_counter()
+_imports = {}
+_local = threading.local()
+_marks = []
+_reported = False
+_lock = threading.Lock()
+
+
+def _process_age():
+    """Seconds since the process was created (covers the interpreter / bootloader before this module loaded)."""
+    try:
+        import psutil
+        return max(0.0, time.time() - psutil.Process().create_time())
+    except Exception:
+        return None
+
+
+_age_at_import = _process_age() if ENABLED else None
+
+
+class _TimedLoader:
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec) if hasattr(self.loader, "create_module") else None
+
+    def exec_module(self, module):
+        name = module.__name__
+        stack = _local.__dict__.setdefault("stack", [])
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            _imports[name] = (total, total - children)
+
+
+class _TimingFinder:
+    """Meta path hook that times every module executed after install(); works for frozen imports too."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+def install():
+    """Starts recording import times. Call as early as possible (before importing streamlit)."""
+    if ENABLED and not any(isinstance(f, _TimingFinder) for f in sys.meta_path):
+        sys.meta_path.insert(0, _TimingFinder())
+
+
+def mark(label):
+    """Records a milestone, e.g. 'first render'."""
+    if ENABLED:
+        _marks.append((label, time.perf_counter() - _started))
+
+
+def load_budget(base_dir=None):
+    path = os.path.join(base_dir or os.path.dirname(os.path.abspath(__file__)), BUDGET_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def build_report(top=25):
+    """Returns the report as a dict: process age, milestones (ms), slowest imports, budget checks."""
+    offset = _age_at_import or 0.0
+    marks = {label: round((offset + t) * 1000, 1) for label, t in _marks}
+    slowest = sorted(_imports.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    report = {
+        "frozen": bool(getattr(sys, "frozen", False)),
+        "before_profiler_ms": round(offset * 1000, 1),
+        "marks_ms": marks,
+        "imports": [{"module": n, "cumulative_ms": round(c * 1000, 1), "self_ms": round(s * 1000, 1)} for n, (c, s) in slowest],
+        "modules_timed": len(_imports),
+        "budget": {},
+    }
+    budget = load_budget(getattr(sys, "_MEIPASS", None))
+    limits = budget.get("frozen" if report["frozen"] else "source", {})
+    for label, limit in limits.items():
+        value = marks.get(label)
+        if value is not None:
+            report["budget"][label] = {"ms": value, "limit_ms": limit, "ok": value <= limit}
+    return report
+
+
+def format_report(report):
+    lines = [f"Startup profile ({'frozen' if report['frozen'] else 'source'} build)",
+             f"  before profiler: {report['before_profiler_ms']:.0f}ms"]
+    for label, ms in report["marks_ms"].items():
+        lines.append(f"  {label}: {ms:.0f}ms")
+    for label, check in report["budget"].items():
+        lines.append(f"  budget {label}: {check['ms']:.0f}ms / {check['limit_ms']}ms {'OK' if check['ok'] else 'OVER BUDGET'}")
+    lines.append(f"  slowest imports (of {report['modules_timed']}):")
+    for row in report["imports"]:
+        lines.append(f"    {row['cumulative_ms']:8.1f}ms  self {row['self_ms']:7.1f}ms  {row['module']}")
+    return "\n".join(lines)
+
+
+def report_once(label="first render"):
+    """Marks `label` and, the first time it is called, writes the report to stderr and the runner home."""
+    global _reported
+    if not ENABLED:
+        return None
+    with _lock:
+        if _reported:
+            return None
+        _reported = True
+    mark(label)
+    report = build_report()
+    print(format_report(report), file=sys.stderr)
+    try:
+        from runner_paths import runner_home
+        path = os.path.join(runner_home("startup"), time.strftime("startup-%Y%m%d-%H%M%S.json"))
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    except Exception as e:
+        print(f"Startup profile write failed: {e}", file=sys.stderr)
+    return report
@@ -0,0 +1,244 @@
+import os
+import re
+import ast
+import threading
+
+# Decorator names behave registers steps with; "step" matches any step type
+STEP_DECORATORS = {"given": "given", "when": "when", "then": "then", "step": "step"}
+DEFAULT_MATCHER = "parse"
+# Leading text of a pattern up to the first placeholder / regex syntax
+PARSE_LITERAL = re.compile(r"^[^{}]*")
+REGEX_LITERAL = re.compile(r"^(?:[^\\^$.|?*+()\[\]{}]|\\[^\w])*")
+
+
+def find_step_files(project_path):
+    """Python files of the steps directory, including nested step packages."""
+    for base in (os.path.join(project_path, "features", "steps"), os.path.join(project_path, "steps")):
+        if not os.path.isdir(base):
+            continue
+        found = []
+        for root, dirs, files in os.walk(base):
+            dirs[:] = [d for d in dirs if not d.startswith(('.', '__pycache__'))]
+            found.extend(os.path.join(root, f) for f in files if f.endswith(".py"))
+        return sorted(found)
+    return []
+
+
+def _call_name(node):
+    """'given' for given(...), behave.given(...) and Given(...)."""
+    func = node.func if isinstance(node, ast.Call) else node
+    if isinstance(func, ast.Attribute): return func.attr.lower()
+    if isinstance(func, ast.Name): return func.id.lower()
+    return None
+
+
+def _string_arg(call):
+    if call.args and isinstance(call.args[0], ast.Constant) and isinstance(call.args[0].value, str):
+        return call.args[0].value
+    return None
+
+
+def parse_step_file(path):
+    """
+    Reads step definitions with the ast module, so multi-line decorators and implicitly
+    concatenated strings are handled. Tracks use_step_matcher() calls and register_type() names.
+    Returns (definitions, type_names, error).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except Exception as e:
+        return [], [], str(e)
+    # behave resets the matcher to the default before loading each step module
+    matcher = DEFAULT_MATCHER
+    definitions, type_names = [], []
+    for node in tree.body:
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            name = _call_name(node.value)
+            if name == "use_step_matcher":
+                matcher = _string_arg(node.value) or matcher
+            elif name == "register_type":
+                type_names.extend(k.arg for k in node.value.keywords if k.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for dec in node.decorator_list:
+                if not isinstance(dec, ast.Call):
+                    continue
+                step_type = STEP_DECORATORS.get(_call_name(dec))
+                pattern = _string_arg(dec)
+                if step_type and pattern is not None:
+                    definitions.append({"step_type": step_type, "pattern": pattern, "matcher": matcher,
+                                        "function": node.name, "line": dec.lineno, "path": path})
+    return definitions, type_names, None
+
+
+def _regex_prefix(pattern):
+    """Literal text every match of `pattern` starts with ('' when that is not obvious)."""
+    if "|" in pattern:
+        return ""
+    pattern = pattern.lstrip("^")
+    literal = REGEX_LITERAL.match(pattern).group(0)
+    # A quantifier after the literal makes its last character optional
+    if pattern[len(literal):len(literal) + 1] in ("?", "*", "{"):
+        literal = literal[:-2] if literal.endswith("\\", 0, len(literal) - 1) else literal[:-1]
+    return literal.replace("\\", "")
+
+
+def _any_text(text):
+    return text
+_any_text.pattern = r".+?"
+
+
+class StepDefinition:
+    """A compiled step definition that can tell whether a step text uses it."""
+
+    def __init__(self, data, type_names=()):
+        self.__dict__.update(data)
+        self.error = None
+        self.regex = None
+        self.parser = None
+        self.anchored = True
+        try:
+            if self.matcher in ("re", "re0"):
+                # "re" is matched against the whole step text, "re0" (cucumber style) brings its own ^/$ markers
+                self.regex = re.compile(self.pattern)
+                self.anchored = self.matcher == "re"
+                self.prefix = _regex_prefix(self.pattern)
+            else:
+                import parse
+                # Custom types are only known at run time, accept any text for them
+                extra = {name: _any_text for name in type_names}
+                if self.matcher == "cfparse":
+                    extra.update({name + suffix: _any_text for name in type_names for suffix in ("?", "*", "+")})
+                self.parser = parse.compile(self.pattern, extra_types=extra, case_sensitive=True)
+                self.prefix = PARSE_LITERAL.match(self.pattern).group(0)
+        except Exception as e:
+            self.error = f"Pattern does not compile: {e}"
+            self.prefix = None
+
+    def matches(self, step_type, text):
+        if self.error or (self.step_type != "step" and self.step_type != step_type):
+            return False
+        if self.parser is not None:
+            # Whole-text match like behave's parse matchers; converters are not run
+            return self.parser.parse(text, evaluate_result=False) is not None
+        if self.anchored:
+            return self.regex.fullmatch(text) is not None
+        return self.regex.match(text) is not None
+
+    @property
+    def location(self):
+        return f"{os.path.basename(self.path)}:{self.line}"
+
+
+class StepRegistry:
+    """
+    Process-wide registry of step definitions per project. Each step file is parsed once and
+    re-parsed only when its mtime or size changes. Matching is bucketed by the literal first
+    word of each pattern, and results are memoised per (step type, text).
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(StepRegistry, cls).__new__(cls)
+            cls._instance.files = {}
+            cls._instance.projects = {}
+            cls._instance.lock = threading.RLock()
+        return cls._instance
+
+    def _file(self, path):
+        st_ = os.stat(path)
+        cached = self.files.get(path)
+        if cached and cached["stamp"] == (st_.st_mtime, st_.st_size):
+            return cached, False
+        definitions, type_names, error = parse_step_file(path)
+        cached = {"stamp": (st_.st_mtime, st_.st_size), "definitions": definitions, "types": type_names, "error": error}
+        self.files[path] = cached
+        return cached, True
+
+    def load(self, project_path):
+        """Returns the project's registry state, refreshed from any changed step files."""
+        project_path = os.path.abspath(project_path)
+        with self.lock:
+            paths = find_step_files(project_path)
+            entry = self.projects.get(project_path)
+            changed = entry is None or entry["paths"] != paths
+            files = {}
+            for path in paths:
+                try:
+                    files[path], fresh = self._file(path)
+                except OSError:
+                    continue
+                changed = changed or fresh
+            if not changed:
+                return entry
+            # register_type() is global in behave, so custom types apply across files
+            type_names = sorted({t for f in files.values() for t in f["types"]})
+            definitions = [StepDefinition(d, type_names) for f in files.values() for d in f["definitions"]]
+            buckets, wildcard = {}, []
+            for d in definitions:
+                if d.error:
+                    continue
+                first, sep, _ = (d.prefix or "").partition(" ")
+                if sep and first:
+                    buckets.setdefault(first, []).append(d)
+                else:
+                    wildcard.append(d)
+            entry = {"paths": paths, "files": files, "definitions": definitions,
+                     "buckets": buckets, "wildcard": wildcard, "memo": {}}
+            self.projects[project_path] = entry
+            return entry
+
+    def definitions(self, project_path):
+        return self.load(project_path)["definitions"]
+
+    def match(self, project_path, step_type, text, entry=None):
+        """Returns every definition matching the step, in load order."""
+        entry = entry or self.load(project_path)
+        key = (step_type, text)
+        found = entry["memo"].get(key)
+        if found is None:
+            first = text.split(" ", 1)[0]
+            candidates = entry["buckets"].get(first, []) + entry["wildcard"]
+            found = [d for d in candidates if d.matches(step_type, text)]
+            if len(found) > 1:
+                order = {id(d): i for i, d in enumerate(entry["definitions"])}
+                found.sort(key=lambda d: order[id(d)])
+            entry["memo"][key] = found
+        return found
+
+    def report(self, project_path, features):
+        """
+        Resolves every step of every feature. Returns a dict with:
+          'undefined': [(feature, step)], 'ambiguous': [(feature, step, [definitions])],
+          'unused': [definitions], 'usage': {id(definition): count}, 'broken': {feature path: {item lines}},
+          'errors': [(path, message)]
+        """
+        entry = self.load(project_path)
+        # The scan cache hands out the same list until the features change
+        cached = entry.get("report")
+        if cached and cached[0] is features:
+            return cached[1]
+        undefined, ambiguous, usage = [], [], {}
+        broken = {}
+        for feat in features:
+            bad_refs = set()
+            for ref, step in enumerate(feat.get('steps', [])):
+                step_type, _keyword, text, _line = step
+                found = self.match(project_path, step_type, text, entry)
+                if not found:
+                    undefined.append((feat, step))
+                    bad_refs.add(ref)
+                    continue
+                if len(found) > 1:
+                    ambiguous.append((feat, step, found))
+                usage[id(found[0])] = usage.get(id(found[0]), 0) + 1
+            if bad_refs:
+                broken[feat['path']] = {i['line'] for i in feat.get('items', []) if bad_refs & set(i.get('step_refs', []))}
+        unused = [d for d in entry["definitions"] if id(d) not in usage]
+        errors = [(p, f["error"]) for p, f in entry["files"].items() if f["error"]]
+        errors += [(d.path, f"{d.location}: {d.error}") for d in entry["definitions"] if d.error]
+        result = {"undefined": undefined, "ambiguous": ambiguous, "unused": unused, "usage": usage,
+                  "broken": broken, "errors": errors}
+        entry["report"] = (features, result)
+        return result
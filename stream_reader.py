@@ -0,0 +1,41 @@
+import codecs
+
+# Bytes asked from the pipe per read; a read returns whatever is available up to this
+CHUNK_SIZE = 64 * 1024
+# An unterminated line longer than this is passed on as-is instead of growing forever
+MAX_LINE_CHARS = 1024 * 1024
+
+
+def read_line_batches(stream, chunk_size=CHUNK_SIZE, encoding="utf-8", max_line=MAX_LINE_CHARS):
+    """
+    Reads a binary stream in chunks and yields lists of complete lines (without their newline).
+    Decoding is incremental, so a multi-byte character split across two reads is kept intact and
+    invalid bytes become U+FFFD instead of raising. Newlines are normalised like text mode does
+    ("\\r\\n" and "\\r" become "\\n"), a line split across reads is carried over to the next batch,
+    and the unterminated tail of the stream is yielded last.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    read = getattr(stream, "read1", None) or stream.read
+    pending = ""
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        text = pending + decoder.decode(chunk)
+        # A trailing "\r" may be the first half of "\r\n"; decide once the next chunk arrives
+        held = ""
+        if text.endswith("\r"):
+            text, held = text[:-1], "\r"
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        pending = lines.pop() + held
+        if len(pending) > max_line:
+            lines.append(pending)
+            pending = ""
+        if lines:
+            yield lines
+    tail = (pending + decoder.decode(b"", final=True)).replace("\r\n", "\n").replace("\r", "\n")
+    if tail:
+        lines = tail.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        yield lines
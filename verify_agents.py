@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import secrets
+import time
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+# Two runner agents on localhost register with an in-process runner API; a sharded run must be
+# spread over this host and both agents, stream every worker's output back, bring every result
+# file home, and a stop must reach the agents' processes.
+AGENTS = 2
+AGENT_CAPACITY = 2
+SCENARIOS = 12
+
+FEATURE = "Feature: Spread\n" + "".join(f"  Scenario: spread {i}\n    Given a short wait\n" for i in range(SCENARIOS)) + \
+    "  @long\n  Scenario: long one\n    Given a long wait\n"
+STEPS = '''
+import os, time
+from behave import given
+
+@given("a short wait")
+def step_short(context):
+    print(f"ran in {os.getcwd()} pid {os.getpid()}")
+    time.sleep(0.3)
+
+@given("a long wait")
+def step_long(context):
+    time.sleep(60)
+'''
+
+
+def make_project(root):
+    os.makedirs(os.path.join(root, "features", "steps"))
+    with open(os.path.join(root, "features", "spread.feature"), 'w') as f:
+        f.write(FEATURE)
+    with open(os.path.join(root, "features", "steps", "steps.py"), 'w') as f:
+        f.write(STEPS)
+    with open(os.path.join(root, "caps.json"), 'w') as f:
+        f.write("{}")
+
+
+def wait_for(predicate, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def status_of(url, data=None, method="GET", token=None, content_type="application/json"):
+    """HTTP status of one call (errors included)."""
+    headers = {"Content-Type": content_type}
+    if token:
+        headers["X-Runner-Token"] = token
+    req = urllib.request.Request(url, data=json.dumps(data).encode("utf-8") if data is not None else None,
+                                 method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def main():
+    base = tempfile.mkdtemp(prefix="agents-")
+    os.environ["BEHAVE_RUNNER_HOME"] = os.path.join(base, "runner-home")
+    os.environ["BEHAVE_RUNNER_AGENT_HEARTBEAT"] = "1"
+    # Agents and the runner share a token; agents refuse to start without one
+    os.environ["BEHAVE_RUNNER_AGENT_TOKEN"] = secrets.token_hex(16)
+    project = os.path.join(base, "project")
+    make_project(project)
+
+    from runner_api import make_server
+    from execution_manager import ExecutionManager, ACTIVE_STATES, CANCELLED
+    from remote_agents import AgentRegistry
+    from behave_runner import plan_run, submit
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    coordinator = f"http://127.0.0.1:{server.server_port}"
+
+    agents = []
+    for i in range(AGENTS):
+        # Each agent has its own checkout and data folder, as it would on another host
+        checkout = os.path.join(base, f"agent-{i}")
+        make_project(checkout)
+        env = dict(os.environ, BEHAVE_RUNNER_HOME=os.path.join(base, f"agent-home-{i}"))
+        agents.append(subprocess.Popen([sys.executable, "runner_agent.py", "--project", checkout, "--port", "0",
+                                        "--capacity", str(AGENT_CAPACITY), "--coordinator", coordinator, "--name", f"agent-{i}"],
+                                       env=env, cwd=os.path.dirname(os.path.abspath(__file__))))
+    ok = True
+    try:
+        registry = AgentRegistry()
+        if not wait_for(lambda: len(registry.available()) == AGENTS, 20):
+            print("agents did not register"); return 1
+        print(f"{AGENTS} agents registered: {[a['name'] + ' @ ' + a['url'] for a in registry.available()]}")
+        listed = json.load(urllib.request.urlopen(coordinator + "/agents"))
+        print(f"GET /agents lists {len(listed)}")
+
+        # Registration and agents only take token-carrying JSON calls with a selection, never a command
+        token = os.environ["BEHAVE_RUNNER_AGENT_TOKEN"]
+        heartbeat = {"url": "http://127.0.0.1:9", "name": "intruder", "capacity": 8}
+        agent_url = registry.available()[0]['url']
+        checks = {
+            "register without token": (status_of(coordinator + "/agents", heartbeat, "POST"), 401),
+            "register a file:// URL": (status_of(coordinator + "/agents", dict(heartbeat, url="file:///etc"), "POST", token), 400),
+            "job without token": (status_of(agent_url + "/jobs", {"job_id": "x", "job": {"caps": "caps.json"}}, "POST"), 401),
+            "job as text/plain": (status_of(agent_url + "/jobs", {"job_id": "x", "job": {"caps": "caps.json"}}, "POST", token,
+                                            "text/plain"), 415),
+            "job with a command": (status_of(agent_url + "/jobs", {"job_id": "x", "command": "echo INJECTED"}, "POST", token), 400),
+            "job with unknown caps": (status_of(agent_url + "/jobs", {"job_id": "x", "job": {"caps": "caps.json; id"}}, "POST",
+                                                token), 400),
+            "job with an option as path": (status_of(agent_url + "/jobs", {"job_id": "x", "job": {"caps": "caps.json",
+                                                     "paths": ["--format=json"]}}, "POST", token), 400),
+            "job id escaping its folder": (status_of(agent_url + "/jobs", {"job_id": "../x", "job": {"caps": "caps.json"}},
+                                                     "POST", token), 400),
+        }
+        for name, (got, expected) in checks.items():
+            print(f"{name}: {got} (expect {expected})")
+            ok &= got == expected
+
+        manager = ExecutionManager()
+        manager.set_max_concurrent(1)
+        workers = 1 + AGENTS * AGENT_CAPACITY
+        shards = plan_run(project, "caps.json", "not @long", None, workers, "scenario")
+        started = time.time()
+        run = manager.get_run(submit(project, shards, label="spread"))
+        wait_for(lambda: run.status not in ACTIVE_STATES, 120)
+        placement = {}
+        for w in run.workers:
+            placement[w['agent'] or "this host"] = placement.get(w['agent'] or "this host", 0) + 1
+        log = run.logs.getvalue()
+        # Every shard also reports the scenarios outside its selection as skipped; count what passed
+        results = []
+        for name in os.listdir(run.results_dir):
+            if name.endswith("-result.json"):
+                with open(os.path.join(run.results_dir, name), encoding="utf-8") as f:
+                    if json.load(f).get("status") == "passed":
+                        results.append(name)
+        remote_lines = sum(1 for line in log.splitlines() if "ran in " + base + "/agent-" in line)
+        print(f"run {run.status} in {time.time() - started:.1f}s with {workers} workers: {placement}")
+        print(f"{remote_lines} step lines printed on agents, {len(results)} passed results brought home (expect {SCENARIOS})")
+        ok &= run.status == "finished" and len(placement) == AGENTS + 1 and len(results) == SCENARIOS and remote_lines > 0
+
+        # Stop: the long scenario runs on an agent while this host is busy, then the run is cancelled
+        blocker = manager.get_run(submit(project, plan_run(project, "caps.json", "@long"), label="local blocker"))
+        long_run = manager.get_run(submit(project, plan_run(project, "caps.json", "@long"), label="on an agent"))
+        wait_for(lambda: any(w['remote'] for w in long_run.workers), 20)
+        agent_url = long_run.workers[0]['agent']
+        stop_started = time.time()
+        manager.cancel(long_run.run_id)
+        manager.cancel(blocker.run_id)
+        wait_for(lambda: long_run.status not in ACTIVE_STATES, 30)
+        jobs = json.load(urllib.request.urlopen(urllib.request.Request(
+            agent_url + "/jobs", headers={"X-Runner-Token": os.environ["BEHAVE_RUNNER_AGENT_TOKEN"]})))
+        print(f"remote run {long_run.status} {time.time() - stop_started:.1f}s after Stop; agent jobs left: {jobs}")
+        ok &= agent_url is not None and long_run.status == CANCELLED and not any(j['status'] == "running" for j in jobs)
+    finally:
+        for p in agents:
+            p.terminate()
+        server.shutdown()
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
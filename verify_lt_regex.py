@@ -1,35 +1,67 @@
+from log_events import LogEventExtractor, LT_SESSION, BS_SESSION, SCENARIO_START, SCENARIO_END, STEP_FAILED, TRACEBACK, SUMMARY
 
-import re
-
-lt_session_ids = set()
-
-def scan_line(line):
-    # Pattern 1: SessionId: <guid>
-    match = re.search(r"SessionId:\s*([a-zA-Z0-9-]+)", line, re.IGNORECASE)
-    if match: lt_session_ids.add(match.group(1))
-    
-    # Pattern 2: session_id=<guid> (e.g. in URLs)
-    match = re.search(r"session_id=([a-zA-Z0-9-]+)", line, re.IGNORECASE)
-    if match: lt_session_ids.add(match.group(1))
-
-# Test Cases
-logs = [
-    "Starting test execution...",
-    "SessionId: 53b53a47-3f3f-42b7-994c-someguid1234",
-    "Some random log line",
-    "https://automation.lambdatest.com/logs/?session_id=another-guid-5678",
-    "Mixed content SessionId:  third-guid-9012  end of line"
+# Test Cases: (log lines, expected (kind, value) events)
+CASES = [
+    ("LambdaTest session ids", [
+        "Starting test execution...",
+        "SessionId: 53b53a47-3f3f-42b7-994c-someguid1234",
+        "Some random log line",
+        "https://automation.lambdatest.com/logs/?session_id=another-guid-5678",
+        "Mixed content SessionId:  third-guid-9012  end of line",
+    ], [
+        (LT_SESSION, "53b53a47-3f3f-42b7-994c-someguid1234"),
+        (LT_SESSION, "another-guid-5678"),
+        (LT_SESSION, "third-guid-9012"),
+    ]),
+    ("BrowserStack session ids", [
+        "Dashboard: https://automate.browserstack.com/builds/abc123/sessions/0123456789abcdef0123456789abcdef01234567",
+        "https://app-automate.browserstack.com/dashboard/v2/builds/x/sessions/89abcdef0123456789abcdef0123456789abcdef?auth=1",
+    ], [
+        (BS_SESSION, "0123456789abcdef0123456789abcdef01234567"),
+        (BS_SESSION, "89abcdef0123456789abcdef0123456789abcdef"),
+    ]),
+    ("Scenario boundaries and failures", [
+        "  Scenario: Login works  # features/login.feature:5",
+        "    Given I open the app ... passed in 0.100s",
+        "  Scenario Outline: Search for <term> -- @1.1   # features/search.feature:9",
+        "    When I search ... failed in 1.002s",
+        "Traceback (most recent call last):",
+        '  File "steps/search.py", line 12, in step_impl',
+        "    assert False",
+        "AssertionError: no results",
+        "1 scenario passed, 1 failed, 0 skipped",
+    ], [
+        (SCENARIO_START, "Login works"),
+        (SCENARIO_END, ("Login works", "passed")),
+        (SCENARIO_START, "Search for <term> -- @1.1"),
+        (STEP_FAILED, ("When I search", "failed")),
+        (TRACEBACK, 'Traceback (most recent call last):\n  File "steps/search.py", line 12, in step_impl\n    assert False\nAssertionError: no results'),
+        (SCENARIO_END, ("Search for <term> -- @1.1", "failed")),
+        (SUMMARY, "1 scenario passed, 1 failed, 0 skipped"),
+    ]),
 ]
 
-print("Scanning logs...")
-for log in logs:
-    scan_line(log)
 
-print(f"Captured IDs: {lt_session_ids}")
+def verify(make_extractor=LogEventExtractor):
+    """Runs every case through a fresh extractor. Returns a list of failure messages."""
+    failures = []
+    for name, lines, expected in CASES:
+        extractor = make_extractor()
+        got = []
+        for line in lines:
+            got.extend((e.kind, e.value) for e in extractor.feed(line + "\n"))
+        got.extend((e.kind, e.value) for e in extractor.close())
+        if got != expected:
+            failures.append(f"{name}: expected {expected} but got {got}")
+    return failures
 
-expected = {"53b53a47-3f3f-42b7-994c-someguid1234", "another-guid-5678", "third-guid-9012"}
 
-if lt_session_ids == expected:
-    print("SUCCESS: Regex verification passed.")
-else:
-    print(f"FAILURE: Expected {expected} but got {lt_session_ids}")
+if __name__ == "__main__":
+    print("Scanning logs...")
+    failures = verify()
+    if not failures:
+        print("SUCCESS: Regex verification passed.")
+    else:
+        for f in failures:
+            print(f"FAILURE: {f}")
+        raise SystemExit(1)
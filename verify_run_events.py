@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import tempfile
+
+# Each step prints this many lines, so stdout is flooded while events must stay prompt
+LINES_PER_STEP = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+SCENARIOS = 10
+
+FEATURE = "Feature: Noisy\n" + "".join(f"  Scenario: noisy {i}\n    Given a noisy step\n    Then it passes\n" for i in range(SCENARIOS))
+STEPS = f'''
+from behave import given, then
+
+@given("a noisy step")
+def step_noisy(context):
+    for i in range({LINES_PER_STEP}):
+        print(f"log line {{i}} " + "x" * 80)
+
+@then("it passes")
+def step_pass(context):
+    pass
+'''
+
+
+def main():
+    project = tempfile.mkdtemp(prefix="events-")
+    os.environ["BEHAVE_RUNNER_HOME"] = os.path.join(project, ".home")
+    os.makedirs(os.path.join(project, "features", "steps"))
+    with open(os.path.join(project, "features", "noisy.feature"), 'w') as f:
+        f.write(FEATURE)
+    with open(os.path.join(project, "features", "steps", "noisy_steps.py"), 'w') as f:
+        f.write(STEPS)
+
+    from execution_manager import ExecutionManager, build_behave_command, ACTIVE_STATES
+    manager = ExecutionManager()
+    started = time.time()
+    run_id = manager.start_execution(build_behave_command("caps.json"), project, os.environ.copy())
+    run = manager.get_run(run_id)
+    first_event = None
+    while run.status in ACTIVE_STATES:
+        if first_event is None and run.progress and run.progress.done(1):
+            first_event = time.time() - started
+        time.sleep(0.05)
+    snap = run.progress.snapshot()
+    log_lines = run.logs.getvalue().count("\n")
+    print(f"run {run.status} in {time.time() - started:.1f}s, {log_lines} log lines")
+    print(f"first scenario reported after {first_event or 0:.2f}s, counts {snap['counts']}")
+    print(f"average event latency {snap['latency_ms']} ms")
+    ok = snap['counts'].get("passed") == SCENARIOS and run.worker_progress()[0]['done'] == SCENARIOS
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
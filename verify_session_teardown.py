@@ -0,0 +1,80 @@
+import time
+import base64
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from session_teardown import LambdaTestProvider, stop_sessions, teardown_run_sessions
+
+# Every stop call takes this long on the stub, so a sequential teardown of 40 sessions takes 8s+
+STUB_DELAY = 0.2
+calls = []
+flaky_seen = set()
+
+
+class StubGrid(BaseHTTPRequestHandler):
+    """Answers LambdaTest stop and BrowserStack WebDriver delete calls like the real APIs."""
+
+    def _handle(self):
+        time.sleep(STUB_DELAY)
+        expected = "Basic " + base64.b64encode(b"user:key").decode()
+        calls.append((self.command, self.path))
+        if self.headers.get("Authorization") != expected:
+            return self._reply(401, b'{"message": "Unauthorized"}')
+        session_id = self.path.rstrip("/").split("/")[-2 if self.path.endswith("/stop") else -1]
+        if session_id.startswith("flaky") and session_id not in flaky_seen:
+            flaky_seen.add(session_id)
+            return self._reply(503, b'{"message": "try again"}')
+        if session_id.startswith("missing"):
+            return self._reply(404, b'{"message": "session not found"}')
+        self._reply(200, b'{"status": "success"}')
+
+    def _reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_PUT = _handle
+    do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGrid)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    failures = []
+
+    # 1. LambdaTest: 40 sessions, two of them flaky (retried), one unknown
+    ids = [f"lt-{i}" for i in range(37)] + ["flaky-1", "flaky-2", "missing-1"]
+    report = stop_sessions(LambdaTestProvider("user", "key", base_url), ids)
+    print(report.summary())
+    if report.stopped != 39 or report.failed != 1:
+        failures.append(f"LambdaTest: expected 39 stopped / 1 failed, got {report.stopped} / {report.failed}")
+    if report.elapsed > len(ids) * STUB_DELAY / 4:
+        failures.append(f"LambdaTest: teardown not concurrent ({report.elapsed:.2f}s)")
+    if not all(m == "PUT" and p.endswith("/stop") for m, p in calls):
+        failures.append("LambdaTest: unexpected request shape")
+
+    # 2. BrowserStack through the environment, with plain "SessionId:" ids handed over
+    calls.clear()
+    env = {"BROWSERSTACK_USERNAME": "user", "BROWSERSTACK_ACCESS_KEY": "key", "BROWSERSTACK_HUB_URL": base_url}
+    reports = teardown_run_sessions({"plain-1"}, {"a" * 40, "b" * 40}, env=env, log=lambda line: None)
+    if len(reports) != 1 or reports[0].stopped != 3:
+        failures.append(f"BrowserStack: expected 3 stopped, got {[r.summary() for r in reports]}")
+    if not all(m == "DELETE" and p.startswith("/wd/hub/session/") for m, p in calls):
+        failures.append("BrowserStack: unexpected request shape")
+
+    # 3. Bad credentials are reported, not raised
+    report = stop_sessions(LambdaTestProvider("user", "wrong", base_url), ["lt-x"])
+    if report.failed != 1:
+        failures.append("Bad credentials: expected a failed stop")
+
+    server.shutdown()
+    if not failures:
+        print("SUCCESS: Session teardown verification passed.")
+    else:
+        for f in failures: print(f"FAILURE: {f}")
+        raise SystemExit(1)